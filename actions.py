@@ -0,0 +1,214 @@
+# actions.py - Declarative action table, compiled once into delta vectors and templates
+import copy
+import json
+import os
+
+from history import FLAG_RECOVERY, FLAG_BREAKTHROUGH, FLAG_FRIEND_HELP
+from player import STAT_NAMES, STAT_INDEX
+
+# Optional JSON file of balance overrides, merged over ACTION_TABLE at import
+BALANCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "balance.json")
+
+FLAG_NAMES = {
+    "recovery": FLAG_RECOVERY,
+    "breakthrough": FLAG_BREAKTHROUGH,
+    "friend_help": FLAG_FRIEND_HELP,
+}
+
+# Short stat labels used in the help text
+HELP_LABELS = {
+    "mental_health": "Mental",
+    "energy": "Energy",
+    "social_connections": "Social",
+    "academic_readiness": "Academic",
+}
+
+# Each action lists its stat deltas (in help-text order), how many actions it
+# costs ("day" ends the day instead), an optional argument, an optional random
+# special effect and the response templates. A special effect's message is
+# logged and shown; its note is only added to the response. Templates can use
+# the action's argument name and the signed stat deltas, e.g. {energy:+d}.
+ACTION_TABLE = {
+    "study": {
+        "deltas": {"academic_readiness": 15, "mental_health": -10, "energy": -10},
+        "cost": 1,
+        "argument": "subject",
+        "missing": "Please specify a subject to study. Example: 'study math'",
+        "special": {
+            "chance": 0.2,
+            "bonus": {"academic_readiness": 5},
+            "flag": "breakthrough",
+            "message": "Breakthrough! You had a moment of clarity that boosted your understanding.",
+        },
+        "response": "You spend time studying {subject}. Academic Readiness {academic_readiness:+d}, "
+                    "Mental Health {mental_health:+d}, Energy {energy:+d}.",
+    },
+    "rest": {
+        "deltas": {"energy": 15, "mental_health": 5},
+        "cost": 1,
+        "special": {
+            "chance": 0.1,
+            "bonus": {},
+            "flag": "recovery",
+            "message": "Rejuvenation! You feel completely refreshed.",
+        },
+        "response": "You take some time to rest and recharge. Energy {energy:+d}, Mental Health {mental_health:+d}.",
+    },
+    "eat": {
+        "deltas": {"energy": 10, "mental_health": 5},
+        "cost": 1,
+        "response": "You take time to eat a meal. Energy {energy:+d}, Mental Health {mental_health:+d}.",
+    },
+    "call": {
+        "deltas": {"social_connections": 15, "mental_health": 5, "energy": -5},
+        "cost": 1,
+        "argument": "friend",
+        "missing": "Please specify who to call. Example: 'call alex'",
+        "special": {
+            "chance": 0.3,
+            "bonus": {"academic_readiness": 5},
+            "flag": "friend_help",
+            "message": "{friend} shares some helpful study tips!",
+            "note": " Academic Readiness {academic_readiness:+d}.",
+        },
+        "response": "You call {friend} and chat for a while. Social Connections {social_connections:+d}, "
+                    "Mental Health {mental_health:+d}, Energy {energy:+d}.",
+    },
+    "meet": {
+        "deltas": {"social_connections": 20, "mental_health": 10, "energy": -10},
+        "cost": 2,
+        "argument": "friend",
+        "missing": "Please specify who to meet. Example: 'meet alex'",
+        "response": "You meet up with {friend}. Social Connections {social_connections:+d}, "
+                    "Mental Health {mental_health:+d}, Energy {energy:+d}.",
+    },
+    "exercise": {
+        "deltas": {"energy": 10, "mental_health": 5, "academic_readiness": -5},
+        "cost": 1,
+        "response": "You take time to exercise. Energy {energy:+d}, Mental Health {mental_health:+d}, "
+                    "Academic Readiness {academic_readiness:+d}.",
+    },
+    "sleep": {
+        "deltas": {"energy": 30, "mental_health": 15},
+        "cost": "day",
+        "response": "You get some sleep. Energy {energy:+d}, Mental Health {mental_health:+d}.\n\nA new day begins.",
+    },
+}
+
+# How each kind of argument is read from the command's words
+ARGUMENT_PARSERS = {
+    "subject": lambda args: " ".join(args),      # Join all words for multi-word subjects
+    "friend": lambda args: args[0].capitalize(),  # Properly capitalize friend name
+}
+
+# Help lines for commands that are not actions
+OTHER_HELP = [
+    "- status          (Check your current stats)",
+    "- time            (Check current time)",
+    "- undo            (Take back your last action)",
+    "- quit            (Exit the game)",
+]
+
+
+class KeepMissing(dict):
+    """Format mapping that leaves unknown placeholders for a later format call"""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class Action:
+    """An action compiled from the table into vectors and preformatted text"""
+    __slots__ = ("name", "cost", "ends_day", "argument", "missing", "deltas", "results",
+                 "chance", "special_deltas", "special_results", "flag", "special_effect",
+                 "response", "special_response", "help")
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.ends_day = spec["cost"] == "day"
+        self.cost = 0 if self.ends_day else spec["cost"]
+        self.argument = spec.get("argument")
+        self.missing = spec.get("missing")
+
+        deltas = spec["deltas"]
+        self.deltas = delta_vector(deltas)
+        self.results = dict(deltas)
+        self.response = preformat(spec["response"], deltas)
+
+        special = spec.get("special")
+        self.chance = special["chance"] if special else 0.0
+        self.flag = 0
+        self.special_effect = self.special_deltas = self.special_results = self.special_response = None
+        if special:
+            bonus = special["bonus"]
+            combined = dict(deltas)
+            for stat, value in bonus.items():
+                combined[stat] = combined.get(stat, 0) + value
+            self.special_deltas = delta_vector(combined)
+            self.special_results = combined
+            self.flag = FLAG_NAMES[special["flag"]] if special.get("flag") else 0
+            if self.flag == FLAG_RECOVERY:
+                # rest marks its results for the Phoenix ending
+                self.special_results = dict(combined, recovery=True)
+            self.special_effect = preformat(special["message"], bonus)
+            note = preformat(special.get("note", ""), bonus)
+            self.special_response = preformat(spec["response"], combined) + "\n" + self.special_effect + note
+
+        self.help = help_line(name, spec)
+
+
+def delta_vector(deltas):
+    """Turn a {stat: delta} dict into a tuple in STAT_NAMES order"""
+    vector = [0] * len(STAT_NAMES)
+    for stat, value in deltas.items():
+        vector[STAT_INDEX[stat]] += value
+    return tuple(vector)
+
+
+def preformat(template, values):
+    """Fill in stat values now, leaving argument placeholders like {friend}"""
+    return template.format_map(KeepMissing(values))
+
+
+def help_line(name, spec):
+    """Build the help text line for an action"""
+    usage = f"{name} [{spec['argument']}]" if spec.get("argument") else name
+    if spec["cost"] == "day":
+        uses = "Ends current day period"
+    else:
+        uses = f"Uses {spec['cost']} action" + ("s" if spec["cost"] != 1 else "")
+    effects = ", ".join(f"{value:+d} {HELP_LABELS[stat]}" for stat, value in spec["deltas"].items())
+    return f"- {usage:<15} ({uses}, {effects})"
+
+
+def merge_overrides(table, overrides):
+    """Return a copy of the table with nested override values applied"""
+    merged = copy.deepcopy(table)
+    for name, changes in overrides.items():
+        target = merged.setdefault(name, {})
+        for key, value in changes.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                target[key] = dict(target[key], **value)
+            else:
+                target[key] = value
+    return merged
+
+
+def load_action_table(path=BALANCE_FILE, table=ACTION_TABLE):
+    """Read balance overrides from a JSON file, if it exists, over the given table"""
+    if not os.path.exists(path):
+        return table
+    with open(path, encoding="utf-8") as f:
+        return merge_overrides(table, json.load(f))
+
+
+def compile_actions(table):
+    """Compile an action table into Action objects and the matching help text"""
+    actions = {name: Action(name, spec) for name, spec in table.items()}
+    help_text = "Available commands:\n" + "".join(
+        line + "\n" for line in [action.help for action in actions.values()] + OTHER_HELP
+    )
+    return actions, help_text
+
+
+ACTIONS, HELP_TEXT = compile_actions(load_action_table())
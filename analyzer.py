@@ -0,0 +1,214 @@
+# analyzer.py - Monte Carlo balance analysis across processes, with checkpoints for long runs
+import argparse
+import json
+import os
+import random
+import time
+
+from engine import Engine
+from metrics import stat_histogram
+from parallel import chunk_seed, run_tasks
+from player import ENDING_NAMES, STAT_NAMES, Stat
+
+ACTIONS = ["study math", "rest", "eat", "call alex", "meet alex", "exercise", "sleep"]
+
+# The action that raises each stat the most without ending the day
+BOOSTS = {
+    "mental_health": "rest",
+    "energy": "eat",
+    "social_connections": "call alex",
+    "academic_readiness": "study math",
+}
+
+
+def random_policy(game, rng):
+    """Any action, uniformly"""
+    return rng.choice(ACTIONS)
+
+
+def studious_policy(game, rng):
+    """Study whenever there is energy for it"""
+    stats = game.player.values
+    if stats[Stat.ENERGY] < 20:
+        return "eat"
+    if stats[Stat.MENTAL_HEALTH] < 20:
+        return "rest"
+    return "study math"
+
+
+def social_policy(game, rng):
+    """Spend time with friends, resting when tired"""
+    if game.player.values[Stat.ENERGY] < 20:
+        return "rest"
+    return "meet alex" if game.actions_remaining >= 2 else "call alex"
+
+
+def balanced_policy(game, rng):
+    """Always work on the lowest stat"""
+    stats = game.player.stats
+    return BOOSTS[min(STAT_NAMES, key=stats.__getitem__)]
+
+
+POLICIES = {
+    "random": random_policy,
+    "studious": studious_policy,
+    "social": social_policy,
+    "balanced": balanced_policy,
+}
+
+
+class Tally:
+    """Ending counts and final-stat histograms (one bin per value 0-100) for many games"""
+
+    def __init__(self):
+        self.games = 0
+        self.endings = dict.fromkeys(ENDING_NAMES, 0)
+        self.stats = {stat: stat_histogram() for stat in STAT_NAMES}
+
+    def add(self, game):
+        self.games += 1
+        self.endings[game.ending] += 1
+        for stat, value in game.player.stats.items():
+            self.stats[stat].observe(value)
+
+    def merge(self, other):
+        self.games += other.games
+        for ending, count in other.endings.items():
+            self.endings[ending] = self.endings.get(ending, 0) + count
+        for stat, histogram in other.stats.items():
+            self.stats[stat].merge(histogram)
+
+    def mean(self, stat):
+        return self.stats[stat].mean()
+
+    def percentile(self, stat, fraction):
+        """Smallest value with at least the given fraction of games at or below it"""
+        return self.stats[stat].quantile(fraction)
+
+    def to_dict(self):
+        return {"games": self.games, "endings": self.endings,
+                "stats": {stat: histogram.counts for stat, histogram in self.stats.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        tally = cls()
+        tally.games = data["games"]
+        tally.endings.update(data["endings"])
+        tally.stats.update((stat, stat_histogram(counts)) for stat, counts in data["stats"].items())
+        return tally
+
+
+def play_game(policy, rng):
+    """Play one headless game to the end with a policy, choosing event options at random"""
+    engine = Engine(seed=rng.getrandbits(64))
+    game = engine.game
+    while not game.game_over:
+        if game.pending:
+            engine.send_choice(rng.randrange(len(game.pending[0].options)))
+        else:
+            engine.send_command(policy(game, rng))
+    return game
+
+
+def run_chunk(policy_name, seed, games):
+    """Play a chunk of games in a worker and return their merged tally as a dict"""
+    policy = POLICIES[policy_name]
+    rng = random.Random(seed)
+    tally = Tally()
+    for _ in range(games):
+        tally.add(play_game(policy, rng))
+    return tally.to_dict()
+
+
+def load_checkpoint(path, config):
+    """Return (finished chunk indexes, tally) from a checkpoint made with the same config"""
+    if not path or not os.path.exists(path):
+        return set(), Tally()
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data["config"] != config:
+        raise ValueError(f"{path} was made with different settings: {data['config']}")
+    return set(data["done"]), Tally.from_dict(data["tally"])
+
+
+def save_checkpoint(path, config, done, tally):
+    """Write the checkpoint atomically, so an interrupted write never loses the last one"""
+    temporary = path + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "done": sorted(done), "tally": tally.to_dict()}, f)
+    os.replace(temporary, path)
+
+
+def analysis_config(games, policy, seed, chunk_size):
+    """The settings a checkpoint must have been made with to be resumed"""
+    return {"games": games, "policy": policy, "seed": seed, "chunk_size": chunk_size}
+
+
+def analyze(games, policy="random", seed=0, workers=None, chunk_size=2000, checkpoint=None,
+            checkpoint_every=10.0, progress=None):
+    """Play games across a process pool and return their merged Tally
+
+    Games are split into fixed chunks with their own seeds. With a checkpoint
+    path, finished chunks and the running tally are saved every
+    checkpoint_every seconds, and a rerun skips the chunks already done.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy '{policy}'")
+    config = analysis_config(games, policy, seed, chunk_size)
+    done, tally = load_checkpoint(checkpoint, config)
+
+    chunk_count = -(-games // chunk_size)
+    todo = [index for index in range(chunk_count) if index not in done]
+    workers = workers or os.cpu_count() or 1
+
+    seeds = {chunk_seed(seed, index): index for index in todo}
+    tasks = ((policy, chunk, min(chunk_size, games - index * chunk_size)) for chunk, index in seeds.items())
+
+    last_save = time.monotonic()
+    # Chunks are merged as they finish, so one slow chunk does not hold up the rest
+    for (_, chunk, _), result in run_tasks(run_chunk, tasks, workers, ordered=False):
+        tally.merge(Tally.from_dict(result))
+        done.add(seeds[chunk])
+        if progress:
+            progress(tally)
+        if checkpoint and time.monotonic() - last_save >= checkpoint_every:
+            save_checkpoint(checkpoint, config, done, tally)
+            last_save = time.monotonic()
+
+    if checkpoint:
+        save_checkpoint(checkpoint, config, done, tally)
+    return tally
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate ending rates and stat distributions by simulation")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="processes to use (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="games per task sent to a worker")
+    parser.add_argument("--checkpoint", help="JSON file to save progress to and resume from")
+    args = parser.parse_args()
+
+    # Games resumed from a checkpoint count towards the results but not the rate
+    config = analysis_config(args.games, args.policy, args.seed, args.chunk_size)
+    resumed = load_checkpoint(args.checkpoint, config)[1].games
+    start = time.perf_counter()
+    tally = analyze(args.games, args.policy, args.seed, args.workers, args.chunk_size, args.checkpoint)
+    elapsed = time.perf_counter() - start
+
+    played = tally.games - resumed
+    print(f"{tally.games:,} games with the {args.policy} policy ({resumed:,} resumed from the checkpoint); "
+          f"played {played:,} in {elapsed:.1f}s ({played / max(elapsed, 1e-9):,.0f} games/sec)")
+    print("\nEndings:")
+    for ending in ENDING_NAMES:
+        count = tally.endings.get(ending, 0)
+        print(f"  {ending:10} {count / max(tally.games, 1):7.2%}  ({count:,})")
+    print("\nFinal stats:       mean   p10   p50   p90")
+    for stat in STAT_NAMES:
+        print(f"  {stat:18} {tally.mean(stat):5.1f} {tally.percentile(stat, 0.1):5d} "
+              f"{tally.percentile(stat, 0.5):5d} {tally.percentile(stat, 0.9):5d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# batch.py - Run many command scripts as isolated headless games, one structured result per script
+import json
+import sys
+
+from campaign import load_campaign
+from engine import Engine
+from parallel import chunk_seed, chunks, run_tasks
+
+CHUNK_SIZE = 100   # Scripts sent to a worker at a time
+
+_campaigns = {}    # Campaigns compiled in this process, by (path, days)
+
+
+def get_campaign(options):
+    """Compile the campaign a batch asks for once per process"""
+    if options is None:
+        return None
+    key = (options.get("path"), options.get("days"))
+    if key not in _campaigns:
+        _campaigns[key] = load_campaign(*key)
+    return _campaigns[key]
+
+
+def run_script(script_id, lines, seed, campaign=None, transcript=False, error=None):
+    """Play one script like Engine.run and describe how it went
+
+    Blank lines and digits answer pending events, lines starting with # are
+    skipped, and lines after the game ends are counted as unused. A script
+    that could not be read comes with an error and is reported unplayed.
+    """
+    engine = Engine(capture=transcript, seed=seed, campaign=campaign, record=False)
+    game = engine.game
+    used = unused = 0
+    if error is not None:
+        lines = ()
+    try:
+        for line in lines:
+            if line.lstrip().startswith("#"):
+                continue
+            if game.game_over:
+                unused += 1
+                continue
+            engine.run([line])
+            used += 1
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    result = {
+        "id": script_id,
+        "ok": error is None,
+        "error": error,
+        "seed": seed,
+        "lines": used,
+        "unused_lines": unused,
+        "game_over": game.game_over,
+        "ending": game.ending,
+        "day": game.day,
+        "period": game.period,
+        "actions_remaining": game.actions_remaining,
+        "stats": game.player.stats.copy(),
+    }
+    if transcript:
+        result["transcript"] = engine.messages()
+    return result
+
+
+def run_chunk(items, campaign_options=None, transcript=False):
+    """Run a list of (id, lines, seed, error) scripts in a worker"""
+    campaign = get_campaign(campaign_options)
+    return [run_script(script_id, lines, seed, campaign, transcript, error)
+            for script_id, lines, seed, error in items]
+
+
+def read_script_file(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def parse_entry(line, default_id):
+    """The (id, lines, seed or None) of one JSONL entry; raises ValueError if it is malformed"""
+    entry = json.loads(line)
+    if not isinstance(entry, dict):
+        raise ValueError("expected a JSON object")
+    script_id = str(entry.get("id", default_id))
+    script = entry.get("script")
+    if isinstance(script, str):
+        lines = script.splitlines()
+    elif isinstance(script, list) and all(isinstance(line, str) for line in script):
+        lines = script
+    else:
+        raise ValueError("'script' must be a string or a list of strings")
+    seed = entry.get("seed")
+    if seed is not None and type(seed) is not int:
+        raise ValueError("'seed' must be a whole number")
+    return script_id, lines, seed
+
+
+def iter_scripts(paths, seed=0, stdin=None):
+    """Yield (id, lines, seed, error) for every script
+
+    A path ending in .jsonl, or "-" for stdin, is a stream of JSON objects,
+    one per line, like {"id": "a", "script": ["study math", "1"], "seed": 3}
+    ("script" may also be one string of newline-separated commands). Any
+    other path is a file holding one script. A file that cannot be read or a
+    malformed line is yielded with no lines and an error message, so the
+    rest of the batch still runs.
+    """
+    for path in paths:
+        if path != "-" and not path.endswith(".jsonl"):
+            try:
+                lines, error = read_script_file(path), None
+            except (OSError, ValueError) as e:
+                lines, error = [], f"{type(e).__name__}: {e}"
+            yield path, lines, chunk_seed(seed, path), error
+            continue
+
+        try:
+            stream = (stdin or sys.stdin) if path == "-" else open(path, encoding="utf-8")
+        except OSError as e:
+            yield path, [], chunk_seed(seed, path), f"{type(e).__name__}: {e}"
+            continue
+        try:
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                default_id = f"{path}:{number}"
+                try:
+                    script_id, lines, script_seed = parse_entry(line, default_id)
+                except ValueError as e:
+                    yield default_id, [], chunk_seed(seed, default_id), f"{type(e).__name__}: {e}"
+                    continue
+                yield script_id, lines, chunk_seed(seed, script_id) if script_seed is None else script_seed, None
+        finally:
+            if stream is not sys.stdin and stream is not stdin:
+                stream.close()
+
+
+def run_batch(scripts, workers=1, campaign_options=None, transcript=False, chunk_size=CHUNK_SIZE):
+    """Yield a result for every script, in input order
+
+    With several workers, chunks of scripts go to a process pool with only a
+    bounded window in flight, so memory does not grow with the corpus.
+    """
+    tasks = ((chunk, campaign_options, transcript) for chunk in chunks(scripts, chunk_size))
+    for _, results in run_tasks(run_chunk, tasks, workers):
+        yield from results
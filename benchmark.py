@@ -0,0 +1,271 @@
+# benchmark.py - Benchmark suite for game workloads, with JSON results and baseline comparison
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+
+from engine import Engine, HeadlessGame
+from player import Player
+from snapshot import SnapshotStore, load_game, save_game
+from timeline import bench_fork
+
+# Balance testing needs millions of playthroughs per hour (about 280 games/sec);
+# one core should manage well over an order of magnitude more than that.
+TARGET_GAMES_PER_SECOND = 5000
+
+ACTIONS = ["study math", "rest", "eat", "call alex", "meet alex", "exercise", "sleep"]
+
+# Commands timed one by one through CommandProcessor.process
+COMMANDS = ACTIONS + ["status", "time", "help", "dance", ""]
+
+# A fixed 3-day playthrough: commands, with digits answering event choices
+SCRIPT = [
+    "1", "study math", "rest", "call alex", "1", "study physics", "eat", "exercise",
+    "2", "meet alex", "study math", "1", "rest", "call sam", "study history",
+    "3", "study math", "eat", "sleep",
+]
+
+LONG_HISTORY = 50000   # Actions logged for the long-history ending check
+TOLERANCE = 0.10       # Allowed slowdown against the baseline before it counts as a regression
+
+
+def play_random_game(rng):
+    """Play one headless game with uniformly random actions and choices"""
+    engine = Engine(seed=rng.getrandbits(64))
+    game = engine.game
+    while not game.game_over:
+        if game.pending:
+            event = game.pending[0]
+            engine.choose(rng.randrange(len(event.options)))
+        else:
+            engine.command(rng.choice(ACTIONS))
+    return game
+
+
+def bench_headless_games(games=20000, seed=0):
+    """Time random headless playthroughs and return games per second"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(games):
+        play_random_game(rng)
+    elapsed = time.perf_counter() - start
+    return games / elapsed
+
+
+def bytes_per_object(factory, count=1000):
+    """Measure the average memory allocated by objects that factory creates"""
+    gc.collect()
+    tracemalloc.start()
+    objects = [factory() for _ in range(count)]
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / count
+
+
+def played_player(seed=0):
+    """Return the player left over from one finished random game"""
+    return play_random_game(random.Random(seed)).player
+
+
+def time_per_call(function, calls, repeat=1):
+    """Average seconds per call of a no-argument function, best of repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best
+
+
+def bench_commands(calls=20000):
+    """Microseconds per CommandProcessor.process call, for each command"""
+    results = {}
+    for command in COMMANDS:
+        game = HeadlessGame(seed=0)
+        game.total_days = 10 ** 9  # Keep the game running however many days pass
+        process = game.commands.process
+        results[command or "(empty)"] = time_per_call(lambda: process(command), calls, repeat=3) * 1e6
+    return results
+
+
+def bench_update_stat(calls=200000):
+    """Microseconds per Player.update_stat call"""
+    player = Player()
+    update = player.update_stat
+    deltas = [-7, 5, 3, -2]
+
+    def run():
+        for value in deltas:
+            update("energy", value)
+    return time_per_call(run, calls // len(deltas), repeat=3) / len(deltas) * 1e6
+
+
+def player_with_history(actions):
+    """A player who has logged the given number of actions"""
+    player = Player(history_limit=max(actions, 1))
+    rng = random.Random(0)
+    for _ in range(actions):
+        action = rng.choice(ACTIONS).split()[0]
+        player.log_action(action, {"results": {"energy": rng.randint(-10, 10)}})
+    return player
+
+
+def bench_check_ending(calls=50000):
+    """Microseconds per Player.check_ending call with a short and a very long history"""
+    return {
+        name: time_per_call(player_with_history(size).check_ending, calls, repeat=3) * 1e6
+        for name, size in (("short", 10), ("long", LONG_HISTORY))
+    }
+
+
+def bench_process_event(calls=20000):
+    """Microseconds per Game.process_event call for the day 1 morning event"""
+    game = HeadlessGame(seed=0)
+
+    def run():
+        game.process_event(1, "morning")
+        game.pending.clear()
+    return time_per_call(run, calls, repeat=3) * 1e6
+
+
+def play_script(seed=0):
+    """Play SCRIPT to the end of the game and return the engine"""
+    engine = Engine(seed=seed)
+    engine.run(SCRIPT)
+    return engine
+
+
+def bench_scripted_games(games=5000):
+    """Microseconds per complete scripted 3-day game"""
+    seeds = iter(range(games * 3))
+    return time_per_call(lambda: play_script(next(seeds)), games, repeat=3) * 1e6
+
+
+def bench_snapshots(calls=2000):
+    """Time saving and restoring a finished game, directly and through a SnapshotStore"""
+    game = play_random_game(random.Random(0))
+    data = save_game(game)
+    results = {
+        "snapshot_bytes": len(data),
+        "save_us": time_per_call(lambda: save_game(game), calls) * 1e6,
+        "load_us": time_per_call(lambda: load_game(data), calls) * 1e6,
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(os.path.join(directory, "sessions.bin"))
+        ids = [f"session-{i}" for i in range(calls)]
+        start = time.perf_counter()
+        for session_id in ids:
+            store.put(session_id, data)
+        results["store_put_us"] = (time.perf_counter() - start) / calls * 1e6
+        start = time.perf_counter()
+        for session_id in ids:
+            load_game(store.get(session_id))
+        results["store_restore_us"] = (time.perf_counter() - start) / calls * 1e6
+        store.close()
+    return results
+
+
+def run_suite(scale=1.0):
+    """Run every benchmark; returns {name: {"value", "unit", "better"}}"""
+    def n(count):
+        return max(1, int(count * scale))
+
+    results = {}
+
+    def add(name, value, unit, better="lower"):
+        results[name] = {"value": value, "unit": unit, "better": better}
+
+    add("headless_games", bench_headless_games(n(20000)), "games/sec", "higher")
+    for command, value in bench_commands(n(20000)).items():
+        add(f"command.{command}", value, "us")
+    add("update_stat", bench_update_stat(n(200000)), "us")
+    for name, value in bench_check_ending(n(50000)).items():
+        add(f"check_ending.{name}_history", value, "us")
+    add("process_event", bench_process_event(n(20000)), "us")
+    add("scripted_game", bench_scripted_games(n(5000)), "us")
+
+    add("memory.new_player", bytes_per_object(Player), "bytes")
+    add("memory.finished_player", bytes_per_object(played_player), "bytes")
+    add("memory.session", bytes_per_object(lambda: Engine().game), "bytes")
+    add("memory.finished_session", bytes_per_object(lambda: play_script().game, n(1000)), "bytes")
+
+    snapshots = bench_snapshots(n(2000))
+    add("snapshot.bytes", snapshots["snapshot_bytes"], "bytes")
+    for name in ("save_us", "load_us", "store_put_us", "store_restore_us"):
+        add(f"snapshot.{name[:-3]}", snapshots[name], "us")
+
+    for size, row in bench_fork((100,), n(200)).items():
+        for name, value in row.items():
+            add(f"fork.{name}", value, "us")
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Relative change of each result against a baseline, and the names that regressed"""
+    changes = {}
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or not old["value"]:
+            continue
+        change = result["value"] / old["value"] - 1
+        changes[name] = change
+        worse = -change if result["better"] == "higher" else change
+        if worse > tolerance:
+            regressions.append(name)
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Exam Hunters workloads")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved earlier with --output")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="fractional slowdown that counts as a regression (default 0.10)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts, e.g. 0.1 for a quick run")
+    args = parser.parse_args()
+
+    results = run_suite(args.scale)
+
+    changes, regressions = {}, []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            changes, regressions = compare(results, json.load(f)["results"], args.tolerance)
+
+    for name, result in results.items():
+        line = f"{name:32} {result['value']:>12,.2f} {result['unit']}"
+        if name in changes:
+            line += f"  ({changes[name]:+.1%}{' REGRESSION' if name in regressions else ''})"
+        print(line)
+
+    rate = results["headless_games"]["value"]
+    status = "OK" if rate >= TARGET_GAMES_PER_SECOND else "BELOW TARGET"
+    print(f"headless games: {rate:,.0f}/sec (target {TARGET_GAMES_PER_SECOND:,}/sec) {status}")
+
+    if args.output:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scale": args.scale,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# campaign.py - Semester-length campaigns with recurring and random events on a precomputed schedule
+import json
+import random
+import zlib
+from array import array
+
+from events import DEFAULT_EVENTS, PERIODS, PERIOD_INDEX, compile_event, parse_day_key
+
+# A campaign definition:
+#   days       - length of the campaign
+#   events     - fixed events, laid out like DEFAULT_EVENTS ("dayN" -> period -> events)
+#   finale     - the same, but "day1" is the first of the last len(finale) days
+#   recurring  - rules {"every", "start", "until", "period", "events"}; the k-th
+#                occurrence shows events[k % len(events)]
+#   random     - rules {"chance", "period", "events"}; each day, a slot with no other
+#                events gets one event from the pool with the given chance
+DEFAULT_CAMPAIGN = {
+    "days": 100,
+    "events": {
+        "day1": {
+            "morning": [
+                {
+                    "type": "introduction",
+                    "text": "A new semester begins! Finals are at the end of term, so pace yourself."
+                }
+            ]
+        }
+    },
+    "finale": DEFAULT_EVENTS,
+    "recurring": [
+        {
+            "every": 7,
+            "start": 6,
+            "period": "morning",
+            "events": [
+                {
+                    "type": "weekend",
+                    "text": "It's the weekend. Your friends are planning a trip to the lake.",
+                    "options": [
+                        "Go with them (Social ++, Academic -)",
+                        "Join for the afternoon (Social +)",
+                        "Stay in and catch up on reading (Academic +, Social -)"
+                    ]
+                },
+                {
+                    "type": "weekend",
+                    "text": "A quiet weekend. The library is nearly empty."
+                }
+            ]
+        },
+        {
+            "every": 30,
+            "start": 30,
+            "period": "day",
+            "events": [
+                {
+                    "type": "exam",
+                    "text": "Midterm results are posted.",
+                    "options": [
+                        {"text": "Go over every mistake", "effects": {"academic_readiness": 10, "mental_health": -5}},
+                        {"text": "Celebrate surviving it", "effects": {"mental_health": 10, "energy": -5}}
+                    ]
+                }
+            ]
+        }
+    ],
+    "random": [
+        {
+            "chance": 0.15,
+            "period": "day",
+            "events": [
+                {
+                    "type": "challenge",
+                    "text": "You catch a cold that's going around campus.",
+                    "options": [
+                        {"text": "Rest it off", "effects": {"energy": 5, "academic_readiness": -5}},
+                        {"text": "Push through", "effects": {"energy": -10}}
+                    ]
+                },
+                {
+                    "type": "social",
+                    "text": "A classmate invites you to join their study group.",
+                    "options": [
+                        "Join the group (Social +, Academic +)",
+                        "Politely decline (Social -)"
+                    ]
+                },
+                {
+                    "type": "news",
+                    "text": "The campus café is giving away free coffee today."
+                }
+            ]
+        }
+    ]
+}
+
+
+class CampaignSchedule:
+    """One game's events: the campaign's shared slots plus this game's random picks
+
+    Looks up like an EventCatalog, in constant time for any day.
+    """
+    __slots__ = ("slots", "pool", "picks")
+
+    def __init__(self, slots, pool, picks):
+        self.slots = slots   # slots[day][period index] -> tuple of events, shared by all games
+        self.pool = pool     # Random events, as 1-tuples
+        self.picks = picks   # Pool index for each day * len(PERIODS) + period, or -1
+
+    @property
+    def total_days(self):
+        return len(self.slots) - 1
+
+    def lookup(self, day, period):
+        """Return the events for a day and period ("morning" or "day")"""
+        if 0 < day < len(self.slots):
+            i = PERIOD_INDEX[period]
+            pick = self.picks[day * len(PERIODS) + i]
+            return self.slots[day][i] if pick < 0 else self.pool[pick]
+        return ()
+
+
+class Campaign:
+    """A compiled campaign; schedule(seed) lays out the events for one game"""
+
+    def __init__(self, days, slots, pool, chances, definition=None, finale_days=0):
+        self.days = days
+        self.finale_days = finale_days   # The finale's length: the campaign's closing exam days
+        self.slots = slots
+        self.pool = pool          # Every random event, as a 1-tuple
+        self.chances = chances    # (period index, chance, first and end pool index) per random rule
+        # Empty slots are the only ones that can hold a random event
+        self.empty = tuple(tuple(not events for events in day) for day in slots)
+        self.definition = definition   # The JSON-ready definition it was compiled from, for recordings
+        self.packed = None             # The definition as compressed JSON, made on first use
+
+    def pack(self):
+        """The definition as compressed JSON bytes, for snapshots; campaign_from_packed() reverses it"""
+        if self.packed is None:
+            if self.definition is None:
+                raise ValueError("This campaign was not compiled from a definition")
+            self.packed = zlib.compress(json.dumps(self.definition).encode("utf-8"))
+        return self.packed
+
+    def schedule(self, seed):
+        """The event schedule for a game, the same every time for the same seed"""
+        picks = array("h", [-1]) * (len(self.slots) * len(PERIODS))
+        if self.chances:
+            rng = random.Random(f"{seed}:schedule")
+            for day in range(1, len(self.slots)):
+                for period, chance, first, end in self.chances:
+                    slot = day * len(PERIODS) + period
+                    if self.empty[day][period] and picks[slot] < 0 and rng.random() < chance:
+                        picks[slot] = rng.randrange(first, end)
+        return CampaignSchedule(self.slots, self.pool, picks)
+
+
+def compile_slots(definitions, days, offset, compiled, where):
+    """Add fixed "dayN" events to compiled[(day, period)], shifting days by offset"""
+    for day_key, periods in definitions.items():
+        day = parse_day_key(day_key) + offset
+        if day > days:
+            raise ValueError(f"{where} {day_key}: past the last day ({days})")
+        for period, events in periods.items():
+            if period not in PERIOD_INDEX:
+                raise ValueError(f"{where} {day_key}: unknown period '{period}'")
+            compiled.setdefault((day, PERIOD_INDEX[period]), []).extend(
+                compile_event(event, f"{where} {day_key} {period} event {i}") for i, event in enumerate(events, 1)
+            )
+
+
+def rule_period(rule, where):
+    period = rule.get("period", "day")
+    if period not in PERIOD_INDEX:
+        raise ValueError(f"{where}: unknown period '{period}'")
+    return PERIOD_INDEX[period]
+
+
+def compile_campaign(definition):
+    """Validate a campaign definition and expand its fixed and recurring events into a schedule"""
+    days = definition.get("days")
+    if not isinstance(days, int) or days < 1:
+        raise ValueError("Campaign 'days' must be a whole number of at least 1")
+
+    compiled = {}
+    compile_slots(definition.get("events", {}), days, 0, compiled, "events")
+    finale = definition.get("finale", {})
+    if len(finale) > days:
+        raise ValueError(f"Campaign finale is longer than the campaign ({days} days)")
+    compile_slots(finale, days, days - len(finale), compiled, "finale")
+
+    for n, rule in enumerate(definition.get("recurring", []), 1):
+        where = f"recurring rule {n}"
+        every, start = rule.get("every"), rule.get("start", rule.get("every"))
+        if not isinstance(every, int) or every < 1 or not isinstance(start, int) or start < 1:
+            raise ValueError(f"{where}: 'every' and 'start' must be whole numbers of at least 1")
+        period = rule_period(rule, where)
+        events = [compile_event(event, f"{where} event {i}") for i, event in enumerate(rule.get("events", []), 1)]
+        if not events:
+            raise ValueError(f"{where}: needs at least one event")
+        for k, day in enumerate(range(start, min(rule.get("until", days), days) + 1, every)):
+            compiled.setdefault((day, period), []).append(events[k % len(events)])
+
+    pool = []
+    chances = []
+    for n, rule in enumerate(definition.get("random", []), 1):
+        where = f"random rule {n}"
+        chance = rule.get("chance")
+        if not isinstance(chance, (int, float)) or not 0 <= chance <= 1:
+            raise ValueError(f"{where}: 'chance' must be between 0 and 1")
+        events = [(compile_event(event, f"{where} event {i}"),) for i, event in enumerate(rule.get("events", []), 1)]
+        if not events:
+            raise ValueError(f"{where}: needs at least one event")
+        chances.append((rule_period(rule, where), chance, len(pool), len(pool) + len(events)))
+        pool.extend(events)
+
+    slots = tuple(tuple(tuple(compiled.get((day, i), ())) for i in range(len(PERIODS))) for day in range(days + 1))
+    return Campaign(days, slots, tuple(pool), tuple(chances), definition, len(finale))
+
+
+def load_campaign(path=None, days=None):
+    """Compile a campaign from a JSON file (or the default one), optionally changing its length"""
+    definition = DEFAULT_CAMPAIGN
+    if path:
+        with open(path, encoding="utf-8") as f:
+            definition = json.load(f)
+    if days is not None:
+        definition = dict(definition, days=days)
+    return compile_campaign(definition)
+
+
+_compiled = {}   # Campaigns compiled in this process, by their definition as JSON (key order matters)
+
+
+def campaign_for(definition):
+    """Compile a campaign definition once per process; None for exam week"""
+    if definition is None:
+        return None
+    key = json.dumps(definition)
+    if key not in _compiled:
+        _compiled[key] = compile_campaign(definition)
+    return _compiled[key]
+
+
+def campaign_from_packed(data):
+    """The campaign a snapshot's packed definition describes, compiled once per process"""
+    campaign = campaign_for(json.loads(zlib.decompress(data)))
+    campaign.packed = data
+    return campaign
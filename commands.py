@@ -1,20 +1,24 @@
 # commands.py - Command processor for handling player actions
-import random
+from time import perf_counter
+
+from actions import ACTIONS, HELP_TEXT, ARGUMENT_PARSERS
+from history import make_stamp
+from player import STAT_NAMES, STAT_TITLES
+
+STATUS_LABELS = {stat: f"- {title}: " for stat, title in STAT_TITLES.items()}
+
 
 class CommandProcessor:
-    def __init__(self, game):
+    def __init__(self, game, actions=None, help_text=None):
         self.game = game
+        # Compiled action table; pass a different one to try other balance values
+        self.actions = ACTIONS if actions is None else actions
+        self.help_text = HELP_TEXT if help_text is None else help_text
         self.commands = {
-            "study": self.study,
-            "rest": self.rest,
-            "eat": self.eat,
-            "call": self.call,
-            "meet": self.meet,
-            "exercise": self.exercise,
-            "sleep": self.sleep,
             "status": self.status,
             "time": self.check_time,
             "help": self.help,
+            "undo": self.undo,
             "quit": self.quit
         }
 
@@ -27,231 +31,91 @@ class CommandProcessor:
         command = parts[0]
         args = parts[1:] if len(parts) > 1 else []
 
+        action = self.actions.get(command)
+        metrics = self.game.metrics
+        if metrics is None:
+            return self.dispatch(command, action, args)
+
+        start = perf_counter()
+        response = self.dispatch(command, action, args)
+        known = action is not None or command in self.commands
+        metrics.record_command(command if known else "unknown", perf_counter() - start)
+        return response
+
+    def dispatch(self, command, action, args):
+        """Run a parsed command"""
+        if action is not None:
+            return self.perform(action, args)
         if command in self.commands:
             return self.commands[command](args)
         else:
             return f"Unknown command: '{command}'. Type 'help' for available commands."
 
-    def study(self, args):
-        """Study command: increases academic readiness at cost of energy and mental health"""
-        if not args:
-            return "Please specify a subject to study. Example: 'study math'"
+    def perform(self, action, args):
+        """Run an action from the table: pick its outcome, add its delta vector and log it"""
+        argument = None
+        if action.argument:
+            if not args:
+                return action.missing
+            argument = ARGUMENT_PARSERS[action.argument](args)
 
-        # Join all arguments to handle multi-word subjects
-        subject = " ".join(args)
-        player = self.game.player
+        # Keep the state from before each action the player asks for (auto-sleep
+        # runs with no actions left and belongs to the action before it)
+        timeline = self.game.timeline
+        if timeline is not None and self.game.actions_remaining > 0:
+            timeline.record(self.game, action.name)
 
-        # Apply the effects
-        results = {
-            "academic_readiness": 15,
-            "mental_health": -10,
-            "energy": -10
-        }
-
-        # Check for special effect (20% chance of breakthrough)
-        if random.random() < 0.2:
-            results["academic_readiness"] += 5
-            special_effect = "Breakthrough! You had a moment of clarity that boosted your understanding."
-        else:
-            special_effect = None
-
-        # Apply all stat changes
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        # Use up time
-        self.game.use_time(1)
-
-        # Log the action
-        player.log_action("study", {
-            "subject": subject,
-            "results": results,
-            "special_effect": special_effect
-        })
-
-        response = f"You spend time studying {subject}. "
-        response += f"Academic Readiness +{results['academic_readiness']}, "
-        response += f"Mental Health {results['mental_health']}, "
-        response += f"Energy {results['energy']}."
-
-        if special_effect:
-            response += f"\n{special_effect}"
-
-        return response
-
-    def rest(self, args):
-        """Rest command: increases energy and mental health"""
         player = self.game.player
+        status = player.effects
 
-        # Apply the effects
-        results = {
-            "energy": 15,
-            "mental_health": 5
-        }
-
-        # Check for special effect (10% chance of rejuvenation)
-        if random.random() < 0.1:
-            special_effect = "Rejuvenation! You feel completely refreshed."
-            # Add recovery flag for Phoenix ending
-            results["recovery"] = True
+        # Check for the action's special effect, if it has one
+        if action.special_effect is not None and self.game.rng.random() < action.chance:
+            deltas, results, response = action.special_deltas, action.special_results, action.special_response
+            special_effect, flags = action.special_effect, action.flag
         else:
-            special_effect = None
-
-        # Apply all stat changes
-        for stat, value in results.items():
-            if stat != "recovery":  # Skip non-stat keys
-                player.update_stat(stat, value)
-
-        # Use up time
-        self.game.use_time(1)
-
-        # Log the action
-        player.log_action("rest", {
-            "results": results,
-            "special_effect": special_effect
-        })
-
-        response = "You take some time to rest and recharge. "
-        response += f"Energy +{results['energy']}, "
-        response += f"Mental Health +{results['mental_health']}."
-
-        if special_effect:
-            response += f"\n{special_effect}"
-
-        return response
-
-    def eat(self, args):
-        """Eat command: increases energy and mental health"""
-        player = self.game.player
-
-        results = {
-            "energy": 10,
-            "mental_health": 5
-        }
-
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        self.game.use_time(1)
-        player.log_action("eat", {"results": results})
+            deltas, results, response = action.deltas, action.results, action.response
+            special_effect, flags = None, 0
 
-        return f"You take time to eat a meal. Energy +{results['energy']}, Mental Health +{results['mental_health']}."
+        # Status effects change the deltas of every action while they last
+        modified = status is not None and status.active
+        if modified:
+            deltas = status.modify(deltas)
+            response += "\n" + status.describe()
 
-    def call(self, args):
-        """Call a friend: increases social connections and mental health, decreases energy"""
-        if not args:
-            return "Please specify who to call. Example: 'call alex'"
-
-        # Properly capitalize friend name
-        friend = args[0].capitalize()
-        player = self.game.player
-
-        results = {
-            "social_connections": 15,
-            "mental_health": 5,
-            "energy": -5
-        }
+        # Apply all stat changes
+        player.apply_deltas(deltas)
 
-        # Check for special effect (friend offers help)
-        if random.random() < 0.3:
-            results["academic_readiness"] = 5
-            special_effect = f"{friend} shares some helpful study tips!"
+        # Use up time, noting when the action started for the history
+        stamp = make_stamp(self.game.day, self.game.period != "Morning")
+        if action.ends_day:
+            self.game.end_day()
         else:
-            special_effect = None
+            self.game.use_time(action.cost)
 
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        self.game.use_time(1)
-        player.log_action("call", {
-            "friend": friend,
-            "results": results,
-            "special_effect": special_effect
-        })
-
-        response = f"You call {friend} and chat for a while. "
-        response += f"Social Connections +{results['social_connections']}, "
-        response += f"Mental Health +{results['mental_health']}, "
-        response += f"Energy {results['energy']}."
-
-        if special_effect:
-            response += f"\n{special_effect}"
-            if "academic_readiness" in results:
-                response += f" Academic Readiness +{results['academic_readiness']}."
+        # Log the action
+        details = {}
+        if argument is not None:
+            details[action.argument] = argument
+            response = response.replace("{" + action.argument + "}", argument)
+            if special_effect:
+                special_effect = special_effect.replace("{" + action.argument + "}", argument)
+        details["results"] = results
+        if action.special_effect is not None:
+            details["special_effect"] = special_effect
+        if modified:
+            details["modifiers"] = dict(zip(STAT_NAMES, status.combined))
+        player.log_action(action.name, details, flags, stamp)
+
+        if status is not None:
+            for message in status.after_action(action.name, player.values):
+                response += "\n" + message
 
         return response
 
-    def meet(self, args):
-        """Meet a friend: significantly increases social connections and mental health, decreases energy"""
-        if not args:
-            return "Please specify who to meet. Example: 'meet alex'"
-
-        # Properly capitalize friend name
-        friend = args[0].capitalize()
-        player = self.game.player
-
-        results = {
-            "social_connections": 20,
-            "mental_health": 10,
-            "energy": -10
-        }
-
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        self.game.use_time(2)
-        player.log_action("meet", {
-            "friend": friend,
-            "results": results
-        })
-
-        return f"You meet up with {friend}. Social Connections +{results['social_connections']}, Mental Health +{results['mental_health']}, Energy {results['energy']}."
-
-    def exercise(self, args):
-        """Exercise: increases energy and mental health, slightly decreases academic readiness"""
-        player = self.game.player
-
-        results = {
-            "energy": 10,
-            "mental_health": 5,
-            "academic_readiness": -5
-        }
-
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        self.game.use_time(1)
-        player.log_action("exercise", {"results": results})
-
-        return f"You take time to exercise. Energy +{results['energy']}, Mental Health +{results['mental_health']}, Academic Readiness {results['academic_readiness']}."
-
-    def sleep(self, args):
-        """Sleep: ends the current day period, significantly increases energy and mental health"""
-        player = self.game.player
-
-        results = {
-            "energy": 30,
-            "mental_health": 15
-        }
-
-        for stat, value in results.items():
-            player.update_stat(stat, value)
-
-        self.game.end_day()
-        player.log_action("sleep", {"results": results})
-
-        return "You get some sleep. Energy +30, Mental Health +15.\n\nA new day begins."
-
     def status(self, args):
         """Check player stats"""
         stats = self.game.player.get_all_stats()
-
-        response = "CURRENT STATS:\n"
-        for stat, value in stats.items():
-            stat_name = stat.replace("_", " ").title()
-            response += f"- {stat_name}: {value}/100\n"
-
-        return response
+        return "CURRENT STATS:\n" + "".join(f"{STATUS_LABELS[stat]}{value}/100\n" for stat, value in stats.items())
 
     def check_time(self, args):
         """Check current game time"""
@@ -259,21 +123,19 @@ class CommandProcessor:
 
     def help(self, args):
         """Display available commands"""
-        response = "Available commands:\n"
-        response += "- study [subject]  (Uses 1 action, +15 Academic, -10 Mental, -10 Energy)\n"
-        response += "- rest            (Uses 1 action, +15 Energy, +5 Mental)\n"
-        response += "- eat             (Uses 1 action, +10 Energy, +5 Mental)\n"
-        response += "- call [friend]   (Uses 1 action, +15 Social, +5 Mental, -5 Energy)\n"
-        response += "- meet [friend]   (Uses 2 actions, +20 Social, +10 Mental, -10 Energy)\n"
-        response += "- exercise        (Uses 1 action, +10 Energy, +5 Mental, -5 Academic)\n"
-        response += "- sleep           (Ends current day period, +30 Energy, +15 Mental)\n"
-        response += "- status          (Check your current stats)\n"
-        response += "- time            (Check current time)\n"
-        response += "- quit            (Exit the game)\n"
-
-        return response
+        return self.help_text
+
+    def undo(self, args):
+        """Take back the last action"""
+        timeline = self.game.timeline
+        if timeline is None:
+            return "Undo is not available in this game."
+        state = timeline.undo(self.game)
+        if state is None:
+            return "There is nothing to undo."
+        return f"You take back '{state.label}'. It's {self.game.get_time_string()}."
 
     def quit(self, args):
         """Exit the game"""
         self.game.game_over = True
-        return "Thanks for playing Exam Hunters: Survive the Semester!"
\ No newline at end of file
+        return "Thanks for playing Exam Hunters: Survive the Semester!"
@@ -0,0 +1,274 @@
+# effects.py - Timed status effects that modify action deltas, expiring from a priority queue
+import heapq
+from collections import deque
+
+from actions import delta_vector
+from player import STAT_INDEX, STAT_NAMES, STAT_TITLES
+
+# Each effect adds its modifiers to the deltas of every action taken while it
+# lasts, for a duration counted in "actions" or "days". Stacking decides what
+# applying it again does: "refresh" restarts the duration, "extend" adds to it,
+# "stack" adds another copy (up to max_stacks) with its own duration, and
+# "ignore" keeps the running one. A trigger applies the effect after an action
+# when a stat is below (or above) a value.
+EFFECT_TABLE = {
+    "burnout": {
+        "title": "Burnout",
+        "modifiers": {"academic_readiness": -5, "mental_health": -5},
+        "duration": 2,
+        "unit": "days",
+        "stacking": "refresh",
+        "trigger": {"action": "study", "stat": "mental_health", "below": 25},
+        "start": "You're burning out. Studying feels like pushing through fog.",
+        "end": "The fog lifts. You feel like yourself again.",
+    },
+    "caffeine_crash": {
+        "title": "Caffeine Crash",
+        "modifiers": {"energy": -5},
+        "duration": 3,
+        "unit": "actions",
+        "stacking": "stack",
+        "max_stacks": 3,
+        "trigger": {"action": "study", "stat": "energy", "below": 20},
+        "start": "Too much coffee, not enough sleep. Your energy is crashing.",
+        "end": "The caffeine jitters wear off.",
+    },
+    "exam_anxiety": {
+        "title": "Exam Anxiety",
+        "modifiers": {"mental_health": -5},
+        "duration": 1,
+        "unit": "days",
+        "stacking": "extend",
+        "trigger": {"action": "sleep", "stat": "academic_readiness", "below": 40},
+        "start": "You lie awake worrying about how unprepared you are.",
+        "end": "Your nerves settle a little.",
+    },
+    "well_rested": {
+        "title": "Well Rested",
+        "modifiers": {"academic_readiness": 3},
+        "duration": 3,
+        "unit": "actions",
+        "stacking": "refresh",
+        "trigger": {"action": "sleep", "stat": "energy", "above": 90},
+        "start": "You wake up sharp and well rested.",
+        "end": "The morning freshness fades.",
+    },
+}
+
+UNITS = ("actions", "days")
+STACKING = ("refresh", "extend", "stack", "ignore")
+
+
+class Effect:
+    """An effect compiled from the table"""
+    __slots__ = ("name", "title", "modifiers", "vector", "duration", "unit", "stacking", "max_stacks",
+                 "start", "end", "trigger")
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.title = spec.get("title", name.replace("_", " ").title())
+        for stat in spec["modifiers"]:
+            if stat not in STAT_INDEX:
+                raise ValueError(f"Effect '{name}': unknown stat '{stat}'")
+        self.modifiers = dict(spec["modifiers"])
+        self.vector = delta_vector(self.modifiers)
+        self.duration = spec["duration"]
+        self.unit = UNITS.index(spec.get("unit", "actions"))
+        self.stacking = spec.get("stacking", "refresh")
+        if self.stacking not in STACKING:
+            raise ValueError(f"Effect '{name}': unknown stacking rule '{self.stacking}'")
+        self.max_stacks = spec.get("max_stacks", 1) if self.stacking == "stack" else 1
+        self.start = spec.get("start")
+        self.end = spec.get("end")
+
+        trigger = spec.get("trigger")
+        self.trigger = None
+        if trigger:
+            # (stat index, threshold, whether the stat must be above it)
+            above = "above" in trigger
+            self.trigger = (STAT_INDEX[trigger["stat"]], trigger["above" if above else "below"], above)
+
+
+def compile_effects(table):
+    """Compile an effect table, plus an index of triggered effects by action name"""
+    effects = {name: Effect(name, spec) for name, spec in table.items()}
+    triggers = {}
+    for name, spec in table.items():
+        trigger = spec.get("trigger")
+        if trigger:
+            triggers.setdefault(trigger.get("action"), []).append(effects[name])
+    return effects, triggers
+
+
+EFFECTS, TRIGGERS = compile_effects(EFFECT_TABLE)
+
+
+class StatusEffects:
+    """A player's active effects
+
+    Active modifiers are kept summed into one vector, and expiry times sit in
+    one heap per time unit, so each action costs O(log k) for k effects.
+    Replaced stacks are left in the heap and skipped when they come up. An
+    effect's stacks share one duration and unit, so they expire oldest first
+    and each effect keeps its stack ids in a deque.
+    """
+    __slots__ = ("effects", "triggers", "clocks", "heaps", "live", "stacks", "combined", "active", "serial",
+                 "note")
+
+    def __init__(self, effects=None, triggers=None):
+        self.effects = EFFECTS if effects is None else effects
+        self.triggers = TRIGGERS if triggers is None else triggers
+        self.clocks = [0, 1]         # Actions taken, current day
+        self.heaps = ([], [])        # (expiry time, stack id) per unit
+        self.live = {}               # Stack id -> (effect name, expiry time)
+        self.stacks = {}             # Effect name -> deque of live stack ids, oldest first
+        self.combined = (0,) * len(STAT_NAMES)
+        self.active = False          # Whether combined has any nonzero modifier
+        self.serial = 0
+        self.note = None             # describe() text, cached until the effects change
+
+    def modify(self, deltas):
+        """Add the combined modifiers to an action's delta vector"""
+        return tuple(a + b for a, b in zip(deltas, self.combined))
+
+    def add_vector(self, vector, sign):
+        self.combined = tuple(a + sign * b for a, b in zip(self.combined, vector))
+        self.active = any(self.combined)
+        self.note = None
+
+    def push(self, effect, expires):
+        self.serial += 1
+        stack = self.serial
+        self.live[stack] = (effect.name, expires)
+        running = self.stacks.get(effect.name)
+        if running is None:
+            running = self.stacks[effect.name] = deque()
+        running.append(stack)
+        heapq.heappush(self.heaps[effect.unit], (expires, stack))
+        return stack
+
+    def apply(self, name):
+        """Start an effect, or apply its stacking rule if it is running; returns its start message"""
+        effect = self.effects[name]
+        now = self.clocks[effect.unit]
+        running = self.stacks.get(name)
+        if not running:
+            self.push(effect, now + effect.duration)
+            self.add_vector(effect.vector, 1)
+            return effect.start
+
+        if effect.stacking == "stack":
+            if len(running) < effect.max_stacks:
+                self.push(effect, now + effect.duration)
+                self.add_vector(effect.vector, 1)
+                return effect.start
+            expires = now + effect.duration  # At the limit, the oldest stack is renewed
+        elif effect.stacking == "refresh":
+            expires = now + effect.duration
+        elif effect.stacking == "extend":
+            expires = self.live[running[-1]][1] + effect.duration
+        else:
+            return None
+        # Replace the oldest stack; its heap entry is skipped once it comes up
+        del self.live[running.popleft()]
+        self.push(effect, expires)
+        return None
+
+    def remove(self, name):
+        """End every stack of an effect now"""
+        running = self.stacks.pop(name, None)
+        if running:
+            for stack in running:
+                del self.live[stack]
+            self.add_vector(self.effects[name].vector, -len(running))
+
+    def expire(self, unit):
+        """Pop stacks whose time has come; returns the end messages of effects that stopped"""
+        heap = self.heaps[unit]
+        now = self.clocks[unit]
+        messages = []
+        while heap and heap[0][0] <= now:
+            _, stack = heapq.heappop(heap)
+            entry = self.live.pop(stack, None)
+            if entry is None:
+                continue  # Replaced or removed earlier
+            name = entry[0]
+            effect = self.effects[name]
+            running = self.stacks[name]
+            running.popleft()  # The oldest stack, which is this one
+            self.add_vector(effect.vector, -1)
+            if not running:
+                del self.stacks[name]
+                if effect.end:
+                    messages.append(effect.end)
+        return messages
+
+    def after_action(self, action, values):
+        """Count an action, expire what ran out and apply effects it triggered; returns messages"""
+        self.clocks[0] += 1
+        messages = self.expire(0) if self.heaps[0] else []
+        for effect in self.triggers.get(action, ()):
+            stat, threshold, above = effect.trigger
+            if values[stat] > threshold if above else values[stat] < threshold:
+                message = self.apply(effect.name)
+                if message:
+                    messages.append(message)
+        return messages
+
+    def advance_day(self, day):
+        """Move to a new day and expire day-long effects; returns messages"""
+        self.clocks[1] = day
+        return self.expire(1) if self.heaps[1] else []
+
+    def describe(self):
+        """Short text listing the active effects and their combined modifiers"""
+        if self.note is not None:
+            return self.note
+        names = ", ".join(self.effects[name].title + (f" x{len(stacks)}" if len(stacks) > 1 else "")
+                          for name, stacks in self.stacks.items())
+        changes = ", ".join(f"{STAT_TITLES[stat]} {value:+d}" for stat, value in zip(STAT_NAMES, self.combined)
+                            if value)
+        self.note = f"Status effects: {names} ({changes or 'no change'})"
+        return self.note
+
+    def active_effects(self):
+        """Active effects as dicts of name, stacks and when the latest stack expires"""
+        return [
+            {
+                "name": name,
+                "stacks": len(stacks),
+                "expires": max(self.live[stack][1] for stack in stacks),
+                "unit": UNITS[self.effects[name].unit],
+            }
+            for name, stacks in self.stacks.items()
+        ]
+
+    def copy(self):
+        """An independent copy, sharing only the compiled effects"""
+        other = StatusEffects(self.effects, self.triggers)
+        other.clocks = self.clocks[:]
+        other.heaps = (self.heaps[0][:], self.heaps[1][:])
+        other.live = dict(self.live)
+        other.stacks = {name: stacks.copy() for name, stacks in self.stacks.items()}
+        other.combined = self.combined
+        other.active = self.active
+        other.serial = self.serial
+        other.note = self.note
+        return other
+
+    def to_dict(self):
+        """Plain data for snapshots"""
+        return {
+            "clocks": self.clocks,
+            "stacks": [[name, self.live[stack][1]] for name, stacks in self.stacks.items() for stack in stacks],
+        }
+
+    @classmethod
+    def from_dict(cls, data, effects=None, triggers=None):
+        status = cls(effects, triggers)
+        status.clocks = list(data["clocks"])
+        for name, expires in data["stacks"]:
+            effect = status.effects[name]
+            status.push(effect, expires)
+            status.add_vector(effect.vector, 1)
+        return status
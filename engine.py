@@ -0,0 +1,119 @@
+# engine.py - Headless engine for running games without terminal I/O
+from game import Game
+from output import MemorySink, NullSink
+
+
+class HeadlessGame(Game):
+    """Game that never prints or reads input; event choices are left pending"""
+
+    def __init__(self, capture=False, seed=None, output=None, metrics=None, campaign=None, status_effects=None,
+                 leaderboard=None):
+        # Output is kept in memory when capture is on, otherwise dropped
+        if output is None:
+            output = MemorySink() if capture else NullSink()
+        super().__init__(seed, output, metrics, campaign, status_effects, leaderboard)
+        self.capture = capture
+        self.pending = []   # Events with options waiting for a choice
+
+    def ask_choice(self, event):
+        """Defer the choice until the caller answers it"""
+        self.pending.append(event)
+        return None
+
+
+class Engine:
+    """Drive a game through commands and event choices, returning structured results"""
+
+    def __init__(self, capture=False, seed=None, metrics=None, campaign=None, record=True, status_effects=None,
+                 leaderboard=None):
+        self.game = HeadlessGame(capture, seed, metrics=metrics, campaign=campaign, status_effects=status_effects,
+                                 leaderboard=leaderboard)
+        # Every command and choice, in order, for replay; turn off for long unrecorded runs
+        self.record = record
+        self.inputs = []
+        self.status_effects = self.game.player.effects is not None   # As set up, before any play
+        self.game.begin()
+
+    def send_command(self, text):
+        """Run a player command without building a result; None once the game is over"""
+        game = self.game
+        if game.game_over:
+            return None
+        if self.record:
+            self.inputs.append(("command", text))
+
+        # Like pressing Enter at the prompt, a new command skips open choices
+        game.pending.clear()
+        return game.handle_command(text)
+
+    def send_choice(self, option_index):
+        """Answer the oldest pending event without building a result; None if nothing is pending"""
+        game = self.game
+        if not game.pending:
+            return None
+        if self.record:
+            self.inputs.append(("choice", option_index))
+
+        event = game.pending.pop(0)
+        effects = ()
+        if option_index is not None and 0 <= option_index < len(event.options):
+            effects = game.choose_option(event, option_index)
+        return event, effects
+
+    def command(self, text):
+        """Run a player command and return the resulting state"""
+        response = self.send_command(text)
+        return self.result("The game is over." if response is None else response)
+
+    def choose(self, option_index):
+        """Answer the oldest pending event with a 0-based option index (None skips it)"""
+        outcome = self.send_choice(option_index)
+        if outcome is None:
+            return self.result("There is no choice to make.")
+        event, effects = outcome
+        return self.result(event.text, effects)
+
+    def run(self, script):
+        """Play a sequence of input lines, where digits answer pending events"""
+        result = None
+        for line in script:
+            if self.game.game_over:
+                break
+            line = line.strip()
+            if self.game.pending and (line.isdigit() or not line):
+                result = self.choose(int(line) - 1 if line else None)
+            else:
+                result = self.command(line)
+        return result
+
+    def result(self, response, effects=()):
+        """Build a structured snapshot of the game after a step"""
+        game = self.game
+        pending = game.pending[0] if game.pending else None
+        return {
+            "response": response,
+            "effects": list(effects),
+            "stats": game.player.stats.copy(),
+            "day": game.day,
+            "period": game.period,
+            "actions_remaining": game.actions_remaining,
+            "pending_event": pending and {"text": pending.text, "options": [option.text for option in pending.options]},
+            "game_over": game.game_over,
+            "ending": game.ending,
+        }
+
+    def recording(self):
+        """The seed, settings, inputs and outcome of this game, for replay.py"""
+        game = self.game
+        return {
+            "seed": game.seed,
+            "campaign": None if game.campaign is None else game.campaign.definition,
+            "status_effects": self.status_effects,
+            "inputs": [list(entry) for entry in self.inputs],
+            "stats": game.player.stats.copy(),
+            "ending": game.ending,
+        }
+
+    def messages(self):
+        """Return and clear the output collected so far (capture mode only)"""
+        return self.game.output.take()
@@ -0,0 +1,199 @@
+# events.py - Event catalog, compiled once and shared by every game
+import json
+import os
+
+from player import STAT_INDEX, STAT_COUNT
+
+# Optional JSON file of events, laid out like DEFAULT_EVENTS; each day and
+# period it lists replaces the built-in events for that slot
+EVENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events.json")
+
+PERIODS = ("morning", "day")
+PERIOD_INDEX = {period: i for i, period in enumerate(PERIODS)}
+
+# Built-in events. An option is either plain text, whose effects come from
+# markers like "(Social ++, Academic --)", or {"text": ..., "effects": {stat: value}}.
+DEFAULT_EVENTS = {
+    "day1": {
+        "morning": [
+            {
+                "type": "introduction",
+                "text": "Welcome to your final exam week! You have 3 days until your exams begin."
+            }
+        ],
+        "day": [
+            {
+                "type": "challenge",
+                "text": "Your laptop crashes while working on an assignment!",
+                "options": [
+                    "Take a deep breath and restart",
+                    "Call tech-savvy friend",
+                    "Panic and try random solutions"
+                ]
+            }
+        ]
+    },
+    "day2": {
+        "morning": [
+            {
+                "type": "news",
+                "text": "You receive an email: History exam has been moved up a day!"
+            }
+        ],
+        "day": [
+            {
+                "type": "social",
+                "text": "Your friend is having a crisis and needs support.",
+                "options": [
+                    "Be there for them (Social ++, Academic --)",
+                    "Offer brief support (Social +, Academic -)",
+                    "Focus on studying (Academic +, Social --)"
+                ]
+            }
+        ]
+    },
+    "day3": {
+        "morning": [
+            {
+                "type": "final",
+                "text": "This is your last day to prepare for exams!"
+            }
+        ],
+        "day": [
+            {
+                "type": "reflection",
+                "text": "As the day ends, you reflect on your preparation for tomorrow's exams."
+            }
+        ]
+    }
+}
+
+
+class EventOption:
+    """One choice of an event, with its effects worked out ahead of time"""
+    __slots__ = ("text", "effects", "deltas")
+
+    def __init__(self, text, effects):
+        self.text = text
+        self.effects = tuple(effects)  # (stat, value) pairs, in display order
+        deltas = [0] * STAT_COUNT
+        for stat, value in self.effects:
+            deltas[STAT_INDEX[stat]] += value
+        self.deltas = tuple(deltas)
+
+
+class Event:
+    """An event shown at a given day and period"""
+    __slots__ = ("type", "text", "options")
+
+    def __init__(self, type, text, options=()):
+        self.type = type
+        self.text = text
+        self.options = tuple(options)
+
+
+class EventCatalog:
+    """Compiled events, looked up by day number and period"""
+
+    def __init__(self, slots):
+        # slots[day][period index] is a tuple of events; day 0 is unused
+        self.slots = slots
+
+    @property
+    def total_days(self):
+        """Last day that has a slot in the catalog"""
+        return len(self.slots) - 1
+
+    def lookup(self, day, period):
+        """Return the events for a day and period ("morning" or "day")"""
+        if 0 < day < len(self.slots):
+            return self.slots[day][PERIOD_INDEX[period]]
+        return ()
+
+
+def get_option_effects(option):
+    """Derive (stat, value) changes from markers like 'Academic ++' in option text"""
+    option_text = option.lower()
+    effects = []
+
+    if "academic ++" in option_text:
+        effects.append(("academic_readiness", 10))
+    elif "academic +" in option_text:
+        effects.append(("academic_readiness", 5))
+    elif "academic --" in option_text:
+        effects.append(("academic_readiness", -10))
+    elif "academic -" in option_text:
+        effects.append(("academic_readiness", -5))
+
+    if "social ++" in option_text:
+        effects.append(("social_connections", 10))
+    elif "social +" in option_text:
+        effects.append(("social_connections", 5))
+    elif "social --" in option_text:
+        effects.append(("social_connections", -10))
+    elif "social -" in option_text:
+        effects.append(("social_connections", -5))
+
+    return effects
+
+
+def compile_option(option, where):
+    """Validate one event option and work out its effects"""
+    if isinstance(option, str):
+        return EventOption(option, get_option_effects(option))
+    if not isinstance(option, dict) or not isinstance(option.get("text"), str):
+        raise ValueError(f"{where}: option must be text or a dict with 'text'")
+
+    effects = option.get("effects", {})
+    for stat, value in effects.items():
+        if stat not in STAT_INDEX:
+            raise ValueError(f"{where}: unknown stat '{stat}'")
+        if not isinstance(value, int):
+            raise ValueError(f"{where}: effect for '{stat}' must be a whole number")
+    return EventOption(option["text"], effects.items())
+
+
+def compile_event(event, where):
+    """Validate one event definition and compile it"""
+    if not isinstance(event, dict) or not isinstance(event.get("text"), str):
+        raise ValueError(f"{where}: event must be a dict with 'text'")
+    options = [compile_option(option, f"{where} option {i}")
+               for i, option in enumerate(event.get("options", []), 1)]
+    return Event(event.get("type", "event"), event["text"], options)
+
+
+def parse_day_key(day_key):
+    """Turn a key like 'day3' into the day number"""
+    if not day_key.startswith("day") or not day_key[3:].isdigit() or int(day_key[3:]) < 1:
+        raise ValueError(f"Bad day key '{day_key}', expected 'day1', 'day2', ...")
+    return int(day_key[3:])
+
+
+def compile_events(definitions):
+    """Validate nested {"dayN": {period: [event, ...]}} definitions into a catalog"""
+    compiled = {}
+    for day_key, periods in definitions.items():
+        day = parse_day_key(day_key)
+        for period, events in periods.items():
+            if period not in PERIOD_INDEX:
+                raise ValueError(f"{day_key}: unknown period '{period}'")
+            compiled[day, PERIOD_INDEX[period]] = tuple(
+                compile_event(event, f"{day_key} {period} event {i}") for i, event in enumerate(events, 1)
+            )
+
+    last_day = max((day for day, _ in compiled), default=0)
+    slots = [tuple(compiled.get((day, i), ()) for i in range(len(PERIODS))) for day in range(last_day + 1)]
+    return EventCatalog(tuple(slots))
+
+
+def load_event_definitions(path=EVENTS_FILE, defaults=DEFAULT_EVENTS):
+    """Merge events from a JSON file, if it exists, over the built-in ones"""
+    definitions = {day_key: dict(periods) for day_key, periods in defaults.items()}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for day_key, periods in json.load(f).items():
+                definitions.setdefault(day_key, {}).update(periods)
+    return definitions
+
+
+EVENT_CATALOG = compile_events(load_event_definitions())
@@ -0,0 +1,282 @@
+# export.py - Streaming columnar export of player histories to CSV and a memory-mappable binary format
+import argparse
+import csv
+import json
+import mmap
+import random
+import struct
+import sys
+import time
+from array import array
+
+from history import FLAGS, split_stamp
+from player import ACTION_NAMES, ENDING_NAMES, STAT_INDEX, STAT_NAMES
+
+FLAG_COLUMNS = ("recovery", "breakthrough", "friend_help")  # In FLAGS order
+# What each action asked to change, status-effect modifiers included; the history
+# does not keep what was actually applied after the 0-100 clamp
+DELTA_COLUMNS = tuple(f"requested_{stat}" for stat in STAT_NAMES)
+
+# Binary columns: name and array typecode, in file order
+COLUMNS = (
+    ("session", "I"),   # Index into the chunk's session id table
+    ("day", "H"),
+    ("period", "B"),    # 0 morning, 1 day
+    ("action", "B"),    # Index into the action name table
+) + tuple((name, "h") for name in DELTA_COLUMNS) + (
+    ("flags", "B"),     # FLAG_* bits
+    ("ending", "b"),    # Index into ENDING_NAMES, -1 if the game had not ended
+)
+COLUMN_NAMES = tuple(name for name, _ in COLUMNS)
+
+CSV_HEADER = ("session_id", "day", "period", "action") + DELTA_COLUMNS + FLAG_COLUMNS + ("ending",)
+PERIOD_LABELS = ("morning", "day")
+
+# File layout, all little-endian: header; chunks of (row count, session table
+# size, session ids joined by newlines, each column's bytes); a JSON footer
+# (action names, chunk offsets, totals) and its offset
+MAGIC = b"EXHC"
+VERSION = 2   # 2: stat columns renamed to requested_<stat>
+FILE_HEADER = struct.Struct("<4sB")
+CHUNK_HEADER = struct.Struct("<II")
+TRAILER = struct.Struct("<Q4s")    # footer offset, magic again
+
+CHUNK_ROWS = 65536
+
+
+def entry_deltas(details):
+    """Stat deltas an action asked for, with any status-effect modifiers, in STAT_NAMES order"""
+    deltas = [0] * len(STAT_NAMES)
+    for source in (details.get("results", details), details.get("modifiers", {})):
+        for stat, value in source.items():
+            i = STAT_INDEX.get(stat)
+            if i is not None:
+                deltas[i] += value
+    return deltas
+
+
+class HistoryExporter:
+    """Write game histories row by row, buffering at most chunk_rows rows before flushing
+
+    Pass a csv_path, a binary_path or both. Rows are held in typed column
+    arrays and each chunk has its own session id table, so a full chunk of
+    65,536 rows needs well under 1 MB however many sessions are exported.
+    """
+
+    def __init__(self, csv_path=None, binary_path=None, chunk_rows=CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self.columns = {name: array(typecode) for name, typecode in COLUMNS}
+        self.session_ids = []   # Sessions in the current chunk
+        self.chunk_offsets = []
+        self.rows = 0
+        self.sessions = 0
+
+        self.csv_file = self.csv = None
+        if csv_path:
+            self.csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(CSV_HEADER)
+
+        self.binary = None
+        if binary_path:
+            self.binary = open(binary_path, "wb")
+            self.binary.write(FILE_HEADER.pack(MAGIC, VERSION))
+
+    def add_game(self, session_id, game):
+        """Queue every history entry of a game as rows"""
+        player = game.player
+        session_id = str(session_id)
+        session = len(self.session_ids)
+        self.session_ids.append(session_id)
+        self.sessions += 1
+        ending = -1 if game.ending is None else ENDING_NAMES.index(game.ending)
+
+        columns = self.columns
+        stat_columns = [columns[name] for name in DELTA_COLUMNS]
+        for stamp, code, flags, details in player.log.iter_stamped():
+            day, period = split_stamp(stamp)
+            columns["session"].append(session)
+            columns["day"].append(day)
+            columns["period"].append(period)
+            columns["action"].append(code)
+            for column, value in zip(stat_columns, entry_deltas(details)):
+                column.append(value)
+            columns["flags"].append(flags)
+            columns["ending"].append(ending)
+            if len(columns["session"]) >= self.chunk_rows:
+                self.flush()
+                # The rest of this game goes in the next chunk, under a new table entry
+                session = 0
+                self.session_ids.append(session_id)
+
+    def flush(self):
+        """Write the buffered rows out as one chunk"""
+        columns = self.columns
+        count = len(columns["session"])
+        if not count:
+            return
+
+        if self.csv is not None:
+            ids, names = self.session_ids, ACTION_NAMES
+            stats = [columns[name] for name in DELTA_COLUMNS]
+            for i in range(count):
+                flags = columns["flags"][i]
+                ending = columns["ending"][i]
+                self.csv.writerow(
+                    (ids[columns["session"][i]], columns["day"][i], PERIOD_LABELS[columns["period"][i]],
+                     names[columns["action"][i]])
+                    + tuple(column[i] for column in stats)
+                    + tuple(int(bool(flags & flag)) for flag in FLAGS)
+                    + ("" if ending < 0 else ENDING_NAMES[ending],)
+                )
+
+        if self.binary is not None:
+            table = "\n".join(self.session_ids).encode("utf-8")
+            self.chunk_offsets.append(self.binary.tell())
+            self.binary.write(CHUNK_HEADER.pack(count, len(table)) + table)
+            for name in COLUMN_NAMES:
+                column = columns[name]
+                if sys.byteorder == "big" and column.itemsize > 1:
+                    column.byteswap()
+                column.tofile(self.binary)
+
+        self.rows += count
+        self.session_ids = []
+        for column in columns.values():
+            del column[:]  # Cleared in place; add_game holds on to the arrays
+
+    def close(self):
+        """Flush the last chunk and finish the files"""
+        self.flush()
+        if self.csv_file is not None:
+            self.csv_file.close()
+        if self.binary is not None:
+            footer = {
+                "columns": COLUMNS,
+                "sessions": self.sessions,
+                "actions": ACTION_NAMES,
+                "endings": ENDING_NAMES,
+                "chunks": self.chunk_offsets,
+                "rows": self.rows,
+            }
+            offset = self.binary.tell()
+            self.binary.write(json.dumps(footer).encode("utf-8"))
+            self.binary.write(TRAILER.pack(offset, MAGIC))
+            self.binary.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HistoryReader:
+    """Memory-mapped reader for binary history exports; columns come back as zero-copy NumPy views"""
+
+    def __init__(self, path):
+        import numpy as np  # Only the reader needs NumPy
+        self.np = np
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = FILE_HEADER.unpack_from(self.map, 0)
+        offset, end_magic = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+        if magic != MAGIC or end_magic != MAGIC:
+            raise ValueError(f"{path} is not a complete history export")
+        if version != VERSION:
+            raise ValueError(f"Unsupported history export version {version}")
+
+        footer = json.loads(bytes(self.map[offset:len(self.map) - TRAILER.size]))
+        self.sessions = footer["sessions"]
+        self.actions = footer["actions"]
+        self.endings = footer["endings"]
+        self.chunk_offsets = footer["chunks"]
+        self.rows = footer["rows"]
+        self.dtypes = {name: np.dtype(typecode).newbyteorder("<") for name, typecode in footer["columns"]}
+
+    def chunks(self, session_ids=False):
+        """Yield each chunk as {column name: array}, viewing the mapped file directly
+
+        With session_ids, each chunk also has "session_ids", the list its
+        session column indexes into.
+        """
+        np = self.np
+        for offset in self.chunk_offsets:
+            count, table_size = CHUNK_HEADER.unpack_from(self.map, offset)
+            offset += CHUNK_HEADER.size
+            chunk = {}
+            if session_ids:
+                chunk["session_ids"] = bytes(self.map[offset:offset + table_size]).decode("utf-8").split("\n")
+            offset += table_size
+            for name, dtype in self.dtypes.items():
+                chunk[name] = np.frombuffer(self.map, dtype, count, offset)
+                offset += count * dtype.itemsize
+            yield chunk
+
+    def column(self, name):
+        """One column across every chunk"""
+        parts = [chunk[name] for chunk in self.chunks()]
+        return self.np.concatenate(parts) if parts else self.np.zeros(0, self.dtypes[name])
+
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # Column views are still in use; the map is released once they are freed
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def summarize(path):
+    """Per-action counts and mean requested stat deltas, aggregated chunk by chunk"""
+    with HistoryReader(path) as reader:
+        np = reader.np
+        size = len(reader.actions)
+        counts = np.zeros(size, dtype=np.int64)
+        sums = np.zeros((len(STAT_NAMES), size), dtype=np.int64)
+        for chunk in reader.chunks():
+            actions = chunk["action"]
+            counts += np.bincount(actions, minlength=size)
+            for i, name in enumerate(DELTA_COLUMNS):
+                sums[i] += np.bincount(actions, weights=chunk[name], minlength=size).astype(np.int64)
+        chunk = actions = None  # Drop the last views into the map so close() can release it
+        return reader.rows, reader.sessions, {
+            reader.actions[code]: {
+                "count": int(counts[code]),
+                **{stat: float(sums[i, code] / counts[code]) for i, stat in enumerate(STAT_NAMES)},
+            }
+            for code in range(size) if counts[code]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export simulated histories, or summarize an export")
+    parser.add_argument("output", help="path prefix: writes PREFIX.csv and PREFIX.exh")
+    parser.add_argument("--games", type=int, default=10000, help="random games to simulate and export")
+    parser.add_argument("--read", action="store_true", help="summarize PREFIX.exh instead of exporting")
+    args = parser.parse_args()
+
+    if not args.read:
+        from analyzer import play_game, random_policy
+        rng = random.Random(0)
+        start = time.perf_counter()
+        with HistoryExporter(args.output + ".csv", args.output + ".exh") as exporter:
+            for session in range(args.games):
+                exporter.add_game(session, play_game(random_policy, rng))
+        print(f"Exported {exporter.rows:,} rows from {args.games:,} games in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    rows, sessions, actions = summarize(args.output + ".exh")
+    print(f"Read {rows:,} rows from {sessions:,} sessions in {time.perf_counter() - start:.3f}s")
+    for name, summary in actions.items():
+        means = ", ".join(f"{stat} {summary[stat]:+.1f}" for stat in STAT_NAMES)
+        print(f"  {name:10} {summary['count']:>9,}  {means}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,77 @@
 # game.py - Main game class for Exam Hunters
-from player import Player
-from commands import CommandProcessor
 import random
+from time import perf_counter
+
+from player import Player, STAT_TITLES
+from commands import CommandProcessor
+from events import EVENT_CATALOG
+from output import TerminalSink
+from terminal import Terminal
+
+WELCOME_TEMPLATE = """
+===================================
+EXAM HUNTERS: SURVIVE THE SEMESTER
+===================================
+
+"Even under pressure, every decision can bring you closer to the person you're meant to be."
+
+{opening}
+Your choices will determine not just your grades, but who you become.
+"""
+WELCOME_TEXT = WELCOME_TEMPLATE.format(opening="Welcome to your final exam week! You have 3 days until your exams begin.")
+
+ENDINGS = {
+    "Pearl": """Like a pearl formed through pressure but maintaining its luster, you've emerged from exam week with a balanced approach to life. Your grades are solid, your relationships intact, and your wellbeing preserved. You've learned that success isn't just about academic achievement—it's about thriving as a whole person.""",
+
+    "Eagle": """Like an eagle soaring above the clouds, you've reached academic heights that few can match. Your laser focus on studies has paid off with exceptional exam results. While your social connections and mental health took a backseat, you've proven your ability to achieve excellence through dedication and sacrifice.""",
+
+    "Wolf": """Like a wolf who draws strength from the pack, you've prioritized your connections with others. Your exam results may not top the charts, but you've built a network of support that will last far beyond this semester. Your friends recognize you as someone who values people over perfection.""",
+
+    "Turtle": """Like a turtle who knows when to retreat into its shell, you recognized the importance of self-preservation. You paced yourself, protected your wellbeing, and made it through exams without burning out. Your balanced approach may not have maximized every opportunity, but you've learned sustainable success strategies that will serve you for life.""",
+
+    "Phoenix": """Like a phoenix rising from the ashes, you faced moments of near-collapse but found the strength to rebuild. Your journey through exam week wasn't smooth, but your resilience in the face of challenges revealed an inner strength you didn't know you had. This experience has transformed you.""",
+
+    "Survivor": """You made it through exam week. It wasn't pretty, and it wasn't perfect, but you survived. Sometimes that's enough."""
+}
+
+HELP_HINT = "\nType 'help' for a list of commands.\n"
+CHOICE_PROMPT = "\nEnter your choice (or press Enter to continue): "
+COMMAND_PROMPT = "> "
+OUT_OF_ACTIONS_TEXT = "\nYou've used all your actions for the day. Time to sleep."
+CLOSING_TEXT = "\nThank you for playing Exam Hunters: Survive the Semester!"
+
+
+def ending_screen(ending, title="EXAM WEEK COMPLETE"):
+    """The text shown when the game ends, up to the final stats"""
+    return (f"\n===================================\n{title}\n===================================\n\n"
+            f"Your journey has led you to the {ending} ending!\n\n"
+            f"{ENDINGS.get(ending, 'You completed your exams.')}\n\nFinal Stats:")
+
+
+ENDING_SCREENS = {ending: ending_screen(ending) for ending in ENDINGS}
+
+
+def campaign_welcome(campaign):
+    """The welcome for a campaign, with its length and when its finals start"""
+    opening = f"Welcome to a new semester! You have {campaign.days} days"
+    if campaign.finale_days:
+        first = campaign.days - campaign.finale_days + 1
+        opening += f", and your final exam week starts on day {first}."
+    else:
+        opening += " until the end of term."
+    return WELCOME_TEMPLATE.format(opening=opening)
+
+
+def campaign_title(campaign):
+    return f"{campaign.days}-DAY SEMESTER COMPLETE"
+
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, output=None, metrics=None, campaign=None, status_effects=None,
+                 leaderboard=None):
+        # All text goes through one sink, which sends a whole turn at a time
+        self.output = TerminalSink() if output is None else output
+        self.terminal = Terminal(self.output)
         self.player = Player()
         self.commands = CommandProcessor(self)
         self.day = 1
@@ -12,120 +79,107 @@ class Game:
         self.actions_remaining = 3
         self.total_days = 3
         self.game_over = False
-        self.events = self.get_default_events()
-
-    def get_default_events(self):
-        """Return default events for the game"""
-        return {
-            "day1": {
-                "morning": [
-                    {
-                        "type": "introduction",
-                        "text": "Welcome to your final exam week! You have 3 days until your exams begin."
-                    }
-                ],
-                "day": [
-                    {
-                        "type": "challenge",
-                        "text": "Your laptop crashes while working on an assignment!",
-                        "options": [
-                            "Take a deep breath and restart",
-                            "Call tech-savvy friend",
-                            "Panic and try random solutions"
-                        ]
-                    }
-                ]
-            },
-            "day2": {
-                "morning": [
-                    {
-                        "type": "news",
-                        "text": "You receive an email: History exam has been moved up a day!"
-                    }
-                ],
-                "day": [
-                    {
-                        "type": "social",
-                        "text": "Your friend is having a crisis and needs support.",
-                        "options": [
-                            "Be there for them (Social ++, Academic --)",
-                            "Offer brief support (Social +, Academic -)",
-                            "Focus on studying (Academic +, Social --)"
-                        ]
-                    }
-                ]
-            },
-            "day3": {
-                "morning": [
-                    {
-                        "type": "final",
-                        "text": "This is your last day to prepare for exams!"
-                    }
-                ],
-                "day": [
-                    {
-                        "type": "reflection",
-                        "text": "As the day ends, you reflect on your preparation for tomorrow's exams."
-                    }
-                ]
-            }
-        }
+        self.ending = None
+        self.events = EVENT_CATALOG  # Shared, read-only
+        # Each game has its own random stream, reproducible from its seed
+        self.seed = random.SystemRandom().getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        # Campaign mode swaps exam week for a longer schedule laid out from the seed
+        self.campaign = campaign
+        if campaign is not None:
+            self.total_days = campaign.days
+            self.events = campaign.schedule(self.seed)
+        # Status effects are opt-in; campaigns turn them on unless told otherwise
+        if status_effects if status_effects is not None else campaign is not None:
+            self.player.enable_status_effects()
+        # Optional metrics.Metrics, shared between games; None turns instrumentation off
+        self.metrics = metrics
+        self.player.metrics = metrics
+        # Optional leaderboard.Leaderboard that every finished game is added to
+        self.leaderboard = leaderboard
+        self.timeline = None  # timeline.Timeline of recent states, once undo is enabled
+
+    def enable_undo(self, limit=None):
+        """Keep the states from before recent actions, so the player can take them back with 'undo'"""
+        if self.timeline is None:
+            from timeline import Timeline  # timeline builds on this module
+            self.timeline = Timeline() if limit is None else Timeline(limit)
+        return self.timeline
+
+    def show(self, text):
+        """Display text to the player"""
+        self.output.write(text)
+
+    def ask_choice(self, event):
+        """Ask the player to pick an event option, returning its index or None"""
+        choice = self.terminal.read(CHOICE_PROMPT)
+        if choice.isdigit() and 1 <= int(choice) <= len(event.options):
+            return int(choice) - 1
+        return None
 
     def start(self):
         """Start the game"""
-        welcome_text = """
-===================================
-EXAM HUNTERS: SURVIVE THE SEMESTER
-===================================
+        self.begin()
 
-"Even under pressure, every decision can bring you closer to the person you're meant to be."
+        # Main game loop
+        self.game_loop()
+        self.output.flush()
 
-Welcome to your final exam week! You have 3 days until your exams begin.
-Your choices will determine not just your grades, but who you become.
-"""
-        print(welcome_text)
+    def begin(self):
+        """Show the introduction and the first morning event"""
+        self.show(WELCOME_TEXT if self.campaign is None else campaign_welcome(self.campaign))
 
         # Show initial stats
-        print(self.commands.process("status"))
+        self.show(self.commands.process("status"))
 
         # Show current time
-        print(self.commands.process("time"))
+        self.show(self.commands.process("time"))
 
         # Show help
-        print("\nType 'help' for a list of commands.\n")
+        self.show(HELP_HINT)
 
         # Process day 1 morning event
-        self.process_event("day1", "morning")
-
-        # Main game loop
-        self.game_loop()
+        self.process_event(1, "morning")
 
     def game_loop(self):
         """Main game loop"""
         while not self.game_over:
             # Get player command
-            command = input("> ").strip()
-
-            # Process command
-            result = self.commands.process(command)
-            print(result)
-
-            # Check if game should end
+            self.handle_command(self.terminal.read(COMMAND_PROMPT).strip())
+
+    def handle_command(self, command):
+        """Run one player command and advance the clock, returning the response"""
+        result = self.commands.process(command)
+        self.show(result)
+        self.advance()
+        return result
+
+    def advance(self):
+        """End the game or move to the next period once a command has used up the time"""
+        # Check if game should end
+        if self.day > self.total_days:
+            self.end_game()
+            return
+
+        # Check if we need to transition to next period or day
+        if self.actions_remaining <= 0:
+            self.end_period()
+
+    def end_period(self, sleep_text=OUT_OF_ACTIONS_TEXT):
+        """Move from Morning to Day, or sleep through to the next morning once the Day is over"""
+        if self.period == "Morning":
+            self.period = "Day"
+            self.actions_remaining = 3
+            self.show(f"\n--- DAY {self.day} DAY ---\n")
+            self.process_event(self.day, "day")
+        else:
+            # Auto-sleep at end of day
+            self.show(sleep_text)
+            self.show(self.commands.process("sleep"))
+
+            # Auto-sleep after the last day finishes the game
             if self.day > self.total_days:
                 self.end_game()
-                break
-
-            # Check if we need to transition to next period or day
-            if self.actions_remaining <= 0:
-                if self.period == "Morning":
-                    self.period = "Day"
-                    self.actions_remaining = 3
-                    print(f"\n--- DAY {self.day} DAY ---\n")
-                    self.process_event(f"day{self.day}", "day")
-                else:
-                    # Auto-sleep at end of day
-                    print("\nYou've used all your actions for the day. Time to sleep.")
-                    print(self.commands.process("sleep"))
 
     def use_time(self, actions=1):
         """Use up player actions"""
@@ -133,98 +187,80 @@ Your choices will determine not just your grades, but who you become.
 
     def end_day(self):
         """End the current day and start a new one"""
+        metrics = self.metrics
+        start = perf_counter() if metrics is not None else 0.0
+
         self.day += 1
         self.period = "Morning"
         self.actions_remaining = 3
 
         if self.day <= self.total_days:
-            print(f"\n--- DAY {self.day} MORNING ---\n")
-            self.process_event(f"day{self.day}", "morning")
+            self.show(f"\n--- DAY {self.day} MORNING ---\n")
+            status = self.player.effects
+            if status is not None:
+                for message in status.advance_day(self.day):
+                    self.show(message)
+            self.process_event(self.day, "morning")
+
+        if metrics is not None:
+            metrics.record_end_day(perf_counter() - start)
 
     def get_time_string(self):
         """Get a string representation of the current time"""
         return f"Day {self.day}, {self.period} ({self.actions_remaining} actions remaining)"
 
-    def process_event(self, day_key, period_key):
-        """Process an event for the current day and period"""
+    def process_event(self, day, period):
+        """Process the events for a day number and period ("morning" or "day")"""
+        metrics = self.metrics
+        start = perf_counter() if metrics is not None else 0.0
+        events = ()
         try:
-            events = self.events.get(day_key, {}).get(period_key, [])
-            if events:
-                for event in events:
-                    print(f"\n{event['text']}\n")
-
-                    if event.get("options"):
-                        print("Options:")
-                        for i, option in enumerate(event["options"], 1):
-                            print(f"{i}. {option}")
-
-                        # In a full implementation, we would handle player choice here
-                        choice = input("\nEnter your choice (or press Enter to continue): ")
-                        if choice.isdigit() and 1 <= int(choice) <= len(event["options"]):
-                            option_index = int(choice) - 1
-                            print(f"\nYou chose: {event['options'][option_index]}")
-
-                            # Apply some basic effects based on choice
-                            option_text = event["options"][option_index].lower()
-
-                            if "academic ++" in option_text:
-                                self.player.update_stat("academic_readiness", 10)
-                                print("Academic Readiness +10")
-                            elif "academic +" in option_text:
-                                self.player.update_stat("academic_readiness", 5)
-                                print("Academic Readiness +5")
-                            elif "academic --" in option_text:
-                                self.player.update_stat("academic_readiness", -10)
-                                print("Academic Readiness -10")
-                            elif "academic -" in option_text:
-                                self.player.update_stat("academic_readiness", -5)
-                                print("Academic Readiness -5")
-
-                            if "social ++" in option_text:
-                                self.player.update_stat("social_connections", 10)
-                                print("Social Connections +10")
-                            elif "social +" in option_text:
-                                self.player.update_stat("social_connections", 5)
-                                print("Social Connections +5")
-                            elif "social --" in option_text:
-                                self.player.update_stat("social_connections", -10)
-                                print("Social Connections -10")
-                            elif "social -" in option_text:
-                                self.player.update_stat("social_connections", -5)
-                                print("Social Connections -5")
+            events = self.events.lookup(day, period)
+            for event in events:
+                self.show(f"\n{event.text}\n")
 
-        except Exception as e:
-            print(f"Error processing event: {e}")
-
-    def end_game(self):
-        """End the game and show the player's ending"""
-        self.game_over = True
-
-        ending = self.player.check_ending()
+                if event.options:
+                    self.show("Options:")
+                    for i, option in enumerate(event.options, 1):
+                        self.show(f"{i}. {option.text}")
 
-        print("\n===================================")
-        print("EXAM WEEK COMPLETE")
-        print("===================================\n")
+                    option_index = self.ask_choice(event)
+                    if option_index is not None:
+                        self.choose_option(event, option_index)
 
-        print(f"Your journey has led you to the {ending} ending!\n")
+        except Exception as e:
+            self.show(f"Error processing event: {e}")
 
-        # Display ending text based on which ending was achieved
-        endings = {
-            "Pearl": """Like a pearl formed through pressure but maintaining its luster, you've emerged from exam week with a balanced approach to life. Your grades are solid, your relationships intact, and your wellbeing preserved. You've learned that success isn't just about academic achievement—it's about thriving as a whole person.""",
+        if metrics is not None:
+            metrics.record_event(period, perf_counter() - start, len(events))
 
-            "Eagle": """Like an eagle soaring above the clouds, you've reached academic heights that few can match. Your laser focus on studies has paid off with exceptional exam results. While your social connections and mental health took a backseat, you've proven your ability to achieve excellence through dedication and sacrifice.""",
+    def choose_option(self, event, option_index):
+        """Apply the chosen event option and return the stat changes it made"""
+        option = event.options[option_index]
+        self.show(f"\nYou chose: {option.text}")
 
-            "Wolf": """Like a wolf who draws strength from the pack, you've prioritized your connections with others. Your exam results may not top the charts, but you've built a network of support that will last far beyond this semester. Your friends recognize you as someone who values people over perfection.""",
+        self.player.apply_deltas(option.deltas)
+        for stat, value in option.effects:
+            self.show(f"{STAT_TITLES.get(stat) or stat.replace('_', ' ').title()} {value:+d}")
 
-            "Turtle": """Like a turtle who knows when to retreat into its shell, you recognized the importance of self-preservation. You paced yourself, protected your wellbeing, and made it through exams without burning out. Your balanced approach may not have maximized every opportunity, but you've learned sustainable success strategies that will serve you for life.""",
+        return option.effects
 
-            "Phoenix": """Like a phoenix rising from the ashes, you faced moments of near-collapse but found the strength to rebuild. Your journey through exam week wasn't smooth, but your resilience in the face of challenges revealed an inner strength you didn't know you had. This experience has transformed you.""",
+    def end_game(self):
+        """End the game and show the player's ending"""
+        self.game_over = True
 
-            "Survivor": """You made it through exam week. It wasn't pretty, and it wasn't perfect, but you survived. Sometimes that's enough."""
-        }
+        ending = self.player.check_ending()
+        self.ending = ending
+        if self.metrics is not None:
+            self.metrics.record_ending(ending)
+        if self.leaderboard is not None:
+            self.leaderboard.record(self)
 
-        print(endings.get(ending, "You completed your exams."))
-        print("\nFinal Stats:")
-        print(self.commands.process("status"))
+        # Display ending text based on which ending was achieved
+        if self.campaign is None:
+            self.show(ENDING_SCREENS.get(ending) or ending_screen(ending))
+        else:
+            self.show(ending_screen(ending, campaign_title(self.campaign)))
+        self.show(self.commands.process("status"))
+        self.show(CLOSING_TEXT)
 
-        print("\nThank you for playing Exam Hunters: Survive the Semester!")
\ No newline at end of file
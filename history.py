@@ -0,0 +1,155 @@
+# history.py - Bounded, columnar action history with per-flag counts
+from array import array
+
+# Flags recorded alongside each action
+FLAG_RECOVERY = 1       # rest: Rejuvenation
+FLAG_BREAKTHROUGH = 2   # study: Breakthrough
+FLAG_FRIEND_HELP = 4    # call: friend shares study tips
+FLAGS = (FLAG_RECOVERY, FLAG_BREAKTHROUGH, FLAG_FRIEND_HELP)
+FLAG_BITS = {flag: flag.bit_length() - 1 for flag in FLAGS}
+
+# How many recent actions a player keeps by default
+HISTORY_LIMIT = 256
+
+# Each entry is stamped with the game time it happened at, as day * 2 + period index
+PERIODS_PER_DAY = 2
+STAMP_MAX = 0xFFFF   # Stamps are 16-bit here and in snapshots; later times all share the last one
+
+
+def make_stamp(day, period):
+    """Pack a day number and period index (0 morning, 1 day) into a history stamp"""
+    return min(day * PERIODS_PER_DAY + period, STAMP_MAX)
+
+
+def split_stamp(stamp):
+    """Unpack a history stamp into (day, period index)"""
+    return divmod(stamp, PERIODS_PER_DAY)
+
+
+def detect_flags(action, details):
+    """Work out the special-effect flags from a logged action's details"""
+    results = details.get("results", details)
+    flags = 0
+    if "recovery" in results or "recovery" in details:
+        flags |= FLAG_RECOVERY
+    if action == "study" and details.get("special_effect"):
+        flags |= FLAG_BREAKTHROUGH
+    if action == "call" and "academic_readiness" in results:
+        flags |= FLAG_FRIEND_HELP
+    return flags
+
+
+class ActionHistory:
+    """Ring buffer of the most recent actions, stored as parallel columns
+
+    share() hands out another view of the same columns in O(1); whichever
+    view changes next copies them first, so game states can share history.
+    mark() and rewind() take back recent entries in place, without a copy.
+    """
+    __slots__ = ("capacity", "on_evict", "codes", "flags", "stamps", "details", "start", "total", "flag_counts",
+                 "shared")
+
+    def __init__(self, capacity=HISTORY_LIMIT, on_evict=None):
+        self.capacity = capacity
+        self.on_evict = on_evict  # Called with (code, flags, details) for each dropped entry
+        self.codes = array("B")
+        self.flags = array("B")
+        self.stamps = array("H")
+        self.details = []
+        self.start = 0   # Index of the oldest entry once the buffer wraps
+        self.total = 0   # Entries ever appended, including evicted ones
+        self.flag_counts = array("I", [0] * len(FLAGS))  # Per-flag totals, by bit
+        self.shared = False  # Whether another view may still use these columns
+
+    def share(self):
+        """Another history with the same entries, sharing the columns until either one changes"""
+        other = ActionHistory.__new__(ActionHistory)
+        for name in ActionHistory.__slots__:
+            setattr(other, name, getattr(self, name))
+        self.shared = other.shared = True
+        return other
+
+    def unshare(self):
+        """Take private copies of the columns before changing them"""
+        self.codes = self.codes[:]
+        self.flags = self.flags[:]
+        self.stamps = self.stamps[:]
+        self.details = self.details[:]
+        self.flag_counts = self.flag_counts[:]
+        self.shared = False
+
+    def mark(self):
+        """A cheap token for the entries so far, which rewind() returns to"""
+        return self.total, len(self.codes), self.flag_counts[:]
+
+    def rewind(self, mark):
+        """Drop every entry appended since mark, which must not have evicted any older ones"""
+        total, size, flag_counts = mark
+        if self.total - len(self.codes) != total - size:
+            raise ValueError("Entries have been evicted since the mark")
+        if self.shared:
+            self.unshare()
+        del self.codes[size:]
+        del self.flags[size:]
+        del self.stamps[size:]
+        del self.details[size:]
+        self.total = total
+        self.flag_counts = flag_counts[:]
+
+    def copy_to_mark(self, mark):
+        """A separate history holding the entries up to mark"""
+        shared = self.shared
+        other = self.share()
+        other.rewind(mark)   # Takes its own columns, so this one is not left sharing
+        self.shared = shared
+        return other
+
+    def append(self, code, flags, details, stamp=0):
+        """Record an action, evicting the oldest one when full"""
+        if self.shared:
+            self.unshare()
+        if len(self.codes) < self.capacity:
+            self.codes.append(code)
+            self.flags.append(flags)
+            self.stamps.append(stamp)
+            self.details.append(details)
+        else:
+            i = self.start
+            if self.on_evict is not None:
+                self.on_evict(self.codes[i], self.flags[i], self.details[i])
+            self.codes[i] = code
+            self.flags[i] = flags
+            self.stamps[i] = stamp
+            self.details[i] = details
+            self.start = (i + 1) % self.capacity
+
+        self.total += 1
+        if flags:
+            for flag, bit in FLAG_BITS.items():
+                if flags & flag:
+                    self.flag_counts[bit] += 1
+
+    def count(self, flag):
+        """How many actions ever logged carried a flag, evicted ones included"""
+        return self.flag_counts[FLAG_BITS[flag]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        """Yield (code, flags, details) from oldest to newest"""
+        size = len(self.codes)
+        for n in range(size):
+            i = (self.start + n) % size
+            yield self.codes[i], self.flags[i], self.details[i]
+
+    def iter_stamped(self):
+        """Yield (stamp, code, flags, details) from oldest to newest"""
+        size = len(self.codes)
+        for n in range(size):
+            i = (self.start + n) % size
+            yield self.stamps[i], self.codes[i], self.flags[i], self.details[i]
+
+    def clear(self):
+        """Drop all entries and counts"""
+        self.__init__(self.capacity, self.on_evict)
@@ -0,0 +1,173 @@
+# leaderboard.py - Running ending mix, final-stat quantiles and actions per ending over finished games
+import argparse
+import random
+import time
+
+from metrics import stat_histogram
+from parallel import chunk_seed, run_tasks
+from player import ENDING_NAMES, STAT_NAMES
+
+QUANTILES = (0.1, 0.5, 0.9, 0.99)
+CHUNK_SIZE = 2000   # Games per task; chunks are seeded by index, so results do not depend on --workers
+
+
+class Leaderboard:
+    """Outcomes of every finished game, updated in O(1) as each one ends
+
+    Pass it as Game(leaderboard=...) and end_game records the game. Boards
+    kept in different processes combine with merge() (or to_dict/from_dict
+    across a pipe), and snapshot() can be read at any time.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.endings = dict.fromkeys(ENDING_NAMES, 0)
+        self.actions = dict.fromkeys(ENDING_NAMES, 0)   # Total actions taken, by ending
+        self.days = dict.fromkeys(ENDING_NAMES, 0)      # Total days played, by ending
+        self.stats = [stat_histogram() for _ in STAT_NAMES]   # Final values, one bucket per value
+
+    def record(self, game):
+        """Add a finished game"""
+        ending = game.ending
+        self.endings[ending] = self.endings.get(ending, 0) + 1
+        self.actions[ending] = self.actions.get(ending, 0) + game.player.log.total
+        # The day counter has moved past the last day once the game is over
+        self.days[ending] = self.days.get(ending, 0) + min(game.day, game.total_days)
+        for histogram, value in zip(self.stats, game.player.values):
+            histogram.observe(value)
+        self.games += 1
+
+    def merge(self, other):
+        """Add everything another board has recorded"""
+        self.games += other.games
+        for ending in other.endings:
+            self.endings[ending] = self.endings.get(ending, 0) + other.endings[ending]
+            self.actions[ending] = self.actions.get(ending, 0) + other.actions[ending]
+            self.days[ending] = self.days.get(ending, 0) + other.days[ending]
+        for histogram, theirs in zip(self.stats, other.stats):
+            histogram.merge(theirs)
+
+    def snapshot(self):
+        """The dashboard as a plain, JSON-ready dict"""
+        games = self.games
+        return {
+            "games": games,
+            "endings": {
+                ending: {
+                    "games": count,
+                    "share": count / games if games else 0.0,
+                    "mean_actions": self.actions[ending] / count if count else 0.0,
+                    "mean_days": self.days[ending] / count if count else 0.0,
+                }
+                for ending, count in self.endings.items()
+            },
+            "stats": {
+                stat: {
+                    "mean": histogram.mean(),
+                    **{f"p{round(q * 100)}": histogram.quantile(q) for q in QUANTILES},
+                }
+                for stat, histogram in zip(STAT_NAMES, self.stats)
+            },
+        }
+
+    def prometheus(self, prefix="examhunters"):
+        """Ending counts and stat quantiles in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_leaderboard_games_total Finished games, by ending.",
+            f"# TYPE {prefix}_leaderboard_games_total counter",
+        ]
+        lines.extend(f'{prefix}_leaderboard_games_total{{ending="{ending}"}} {count}'
+                     for ending, count in self.endings.items())
+        lines.append(f"# HELP {prefix}_leaderboard_actions_total Actions taken in finished games, by ending.")
+        lines.append(f"# TYPE {prefix}_leaderboard_actions_total counter")
+        lines.extend(f'{prefix}_leaderboard_actions_total{{ending="{ending}"}} {count}'
+                     for ending, count in self.actions.items())
+        lines.append(f"# HELP {prefix}_final_stat Final stats of finished games.")
+        lines.append(f"# TYPE {prefix}_final_stat summary")
+        for stat, histogram in zip(STAT_NAMES, self.stats):
+            lines.extend(f'{prefix}_final_stat{{stat="{stat}",quantile="{q}"}} {histogram.quantile(q)}'
+                         for q in QUANTILES)
+            lines.append(f'{prefix}_final_stat_sum{{stat="{stat}"}} {histogram.total}')
+            lines.append(f'{prefix}_final_stat_count{{stat="{stat}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        return {
+            "games": self.games,
+            "endings": self.endings,
+            "actions": self.actions,
+            "days": self.days,
+            "stats": {stat: histogram.counts for stat, histogram in zip(STAT_NAMES, self.stats)},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        board = cls()
+        board.games = data["games"]
+        board.endings.update(data["endings"])
+        board.actions.update(data["actions"])
+        board.days.update(data["days"])
+        board.stats = [stat_histogram(data["stats"][stat]) for stat in STAT_NAMES]
+        return board
+
+
+def play_chunk(seed, games):
+    """Play random games in a worker, recording them on a fresh board; returns it as a dict"""
+    from analyzer import random_policy
+    from engine import Engine
+
+    rng = random.Random(seed)
+    board = Leaderboard()
+    for _ in range(games):
+        engine = Engine(seed=rng.getrandbits(64), record=False, leaderboard=board)
+        game = engine.game
+        while not game.game_over:
+            if game.pending:
+                engine.send_choice(rng.randrange(len(game.pending[0].options)))
+            else:
+                engine.send_command(random_policy(game, rng))
+    return board.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play random games and show the leaderboard they produce")
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1, help="processes; each chunk of games keeps its own board")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    tasks = ((chunk_seed(args.seed, index), min(CHUNK_SIZE, args.games - start_game))
+             for index, start_game in enumerate(range(0, args.games, CHUNK_SIZE)))
+    board = Leaderboard()
+    # Boards merge in any order, so chunks are taken as they finish
+    for _, part in run_tasks(play_chunk, tasks, args.workers, ordered=False):
+        board.merge(Leaderboard.from_dict(part))
+    elapsed = time.perf_counter() - start
+
+    # Cost of recording alone, against a finished game
+    sample = Leaderboard()
+    from engine import Engine
+    engine = Engine(record=False)
+    engine.game.end_game()
+    record_start = time.perf_counter()
+    for _ in range(100000):
+        sample.record(engine.game)
+    record_us = (time.perf_counter() - record_start) / 100000 * 1e6
+
+    snapshot_start = time.perf_counter()
+    dashboard = board.snapshot()
+    snapshot_ms = (time.perf_counter() - snapshot_start) * 1e3
+
+    print(f"{board.games:,} games on {args.workers} worker(s) in {elapsed:.1f}s; "
+          f"recording a game takes {record_us:.2f} us, a snapshot {snapshot_ms:.2f} ms")
+    print("\nEnding       share  mean actions  mean days")
+    for ending, row in dashboard["endings"].items():
+        print(f"  {ending:10} {row['share']:6.1%} {row['mean_actions']:13.1f} {row['mean_days']:10.1f}")
+    print("\nFinal stats:       mean   p10   p50   p90   p99")
+    for stat, row in dashboard["stats"].items():
+        print(f"  {stat:18} {row['mean']:5.1f} {row['p10']:5d} {row['p50']:5d} {row['p90']:5d} {row['p99']:5d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# loadtest.py - Load-test client for server.py measuring throughput and latency
+import argparse
+import asyncio
+import random
+import time
+
+from game import CHOICE_PROMPT, COMMAND_PROMPT
+
+ACTIONS = ["study math", "rest", "eat", "call alex", "meet alex", "exercise", "status", "time"]
+PROMPTS = (COMMAND_PROMPT.encode(), CHOICE_PROMPT.encode())
+
+
+async def read_response(reader):
+    """Read until the server prompts again or closes; return the text and whether it prompted"""
+    data = b""
+    while True:
+        chunk = await reader.read(4096)
+        if not chunk:
+            return data, False
+        data += chunk
+        if data.endswith(PROMPTS):
+            return data, True
+
+
+async def run_client(host, port, commands, seed, latencies):
+    """Play one session with random commands, recording each round-trip time"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    data, prompted = await read_response(reader)
+    for _ in range(commands):
+        if not prompted:
+            break
+        if data.endswith(PROMPTS[1]):
+            line = str(rng.randint(1, 3))
+        else:
+            line = rng.choice(ACTIONS)
+
+        start = time.perf_counter()
+        writer.write(line.encode() + b"\n")
+        await writer.drain()
+        data, prompted = await read_response(reader)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load_test(host, port, clients, commands):
+    """Run many clients at once and summarise commands/sec and latency"""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, commands, seed, latencies) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "clients": clients,
+        "commands": count,
+        "commands_per_sec": count / elapsed,
+        "p50_ms": latencies[count // 2] * 1000 if count else 0.0,
+        "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test an Exam Hunters server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--commands", type=int, default=50, help="commands per client")
+    args = parser.parse_args()
+
+    result = asyncio.run(load_test(args.host, args.port, args.clients, args.commands))
+    print(f"{result['clients']} clients, {result['commands']} commands: "
+          f"{result['commands_per_sec']:,.0f} commands/sec, "
+          f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,67 @@
 # main.py - Entry point for Exam Hunters game
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+from campaign import load_campaign
 from game import Game
 
+def run_batch_mode(args):
+    """Run command scripts headlessly and write one JSON result per line"""
+    from batch import iter_scripts, run_batch
+
+    campaign_options = None
+    if args.campaign is not None or args.days is not None:
+        campaign_options = {"path": args.campaign or None, "days": args.days}
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    endings = Counter()
+    failed = 0
+    start = time.perf_counter()
+    try:
+        results = run_batch(iter_scripts(args.batch, args.seed), args.workers, campaign_options, args.transcript)
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+            endings[result["ending"]] += 1
+            failed += not result["ok"]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    total = sum(endings.values())
+    summary = ", ".join(f"{ending or 'unfinished'} {count}" for ending, count in endings.most_common())
+    print(f"{total:,} scripts in {time.perf_counter() - start:.1f}s, {failed} failed; {summary}", file=sys.stderr)
+    return 1 if failed else 0
+
 def main():
     """Main entry point for the game"""
-    game = Game()
+    parser = argparse.ArgumentParser(description="Exam Hunters: Survive the Semester")
+    parser.add_argument("--campaign", nargs="?", const="", metavar="FILE",
+                        help="play a semester-long campaign (optionally from a JSON definition)")
+    parser.add_argument("--days", type=int, help="campaign length in days")
+    parser.add_argument("--batch", nargs="+", metavar="SCRIPT",
+                        help="run command scripts without a terminal: script files, .jsonl streams, or - for stdin")
+    parser.add_argument("--workers", type=int, default=1, help="processes for --batch")
+    parser.add_argument("--output", help="file for --batch results (default: stdout)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for --batch scripts")
+    parser.add_argument("--transcript", action="store_true", help="include each game's output in --batch results")
+    args = parser.parse_args()
+
+    # Load the campaign up front, so a bad file or length is a usage error in either mode
+    campaign = None
+    if args.campaign is not None or args.days is not None:
+        try:
+            campaign = load_campaign(args.campaign or None, args.days)
+        except (OSError, ValueError) as error:
+            parser.error(f"--campaign/--days: {error}")
+
+    if args.batch:
+        sys.exit(run_batch_mode(args))
+
+    game = Game(campaign=campaign)
+    game.enable_undo()
     game.start()
 
 if __name__ == "__main__":
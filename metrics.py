@@ -0,0 +1,174 @@
+# metrics.py - Optional counters, latency histograms and telemetry for the game's hot paths
+from bisect import bisect_left
+from collections import Counter
+
+from player import STAT_NAMES
+
+# Latency bucket upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2, float("inf"))
+STAT_BOUNDS = tuple(range(101))   # One bucket per whole stat value, so stat quantiles are exact
+
+PREFIX = "examhunters"
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum"""
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def merge(self, other):
+        """Add another histogram's observations; both must have the same bounds"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.count += other.count
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, fraction):
+        """Upper bound of the first bucket with at least the given fraction of observations at or below it"""
+        target = fraction * self.count
+        for bound, count in self.cumulative():
+            if count >= target:
+                return bound
+        return self.bounds[-1]
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) for every bucket"""
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            yield bound, running
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum_seconds": self.total,
+            "buckets": {format_bound(bound): count for bound, count in self.cumulative()},
+        }
+
+
+def stat_histogram(counts=None):
+    """A Histogram of final stat values, optionally rebuilt from saved per-value counts"""
+    histogram = Histogram(STAT_BOUNDS)
+    if counts is not None:
+        histogram.counts = list(counts)
+        histogram.count = sum(counts)
+    histogram.total = sum(value * count for value, count in enumerate(histogram.counts))
+    return histogram
+
+
+def format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Metrics:
+    """Telemetry shared by any number of games; pass it as Game(metrics=...) to turn it on
+
+    Games without metrics skip all of this behind a single None check.
+    """
+
+    def __init__(self):
+        self.commands = {}   # Command name -> latency Histogram
+        self.events = {}     # Period -> latency Histogram
+        self.end_day = Histogram()
+        self.event_count = 0
+        # Per stat: updates, total gained, total lost, and amount lost to the 0-100 clamp
+        self.stat_updates = [0] * len(STAT_NAMES)
+        self.stat_gain = [0] * len(STAT_NAMES)
+        self.stat_loss = [0] * len(STAT_NAMES)
+        self.stat_clamped = [0] * len(STAT_NAMES)
+        self.endings = Counter()
+
+    def record_command(self, command, seconds):
+        histogram = self.commands.get(command)
+        if histogram is None:
+            histogram = self.commands[command] = Histogram()
+        histogram.observe(seconds)
+
+    def record_event(self, period, seconds, count):
+        histogram = self.events.get(period)
+        if histogram is None:
+            histogram = self.events[period] = Histogram()
+        histogram.observe(seconds)
+        self.event_count += count
+
+    def record_end_day(self, seconds):
+        self.end_day.observe(seconds)
+
+    def record_stat(self, index, requested, applied):
+        """Record one stat change: the delta asked for and the change after clamping"""
+        self.stat_updates[index] += 1
+        if applied > 0:
+            self.stat_gain[index] += applied
+        else:
+            self.stat_loss[index] -= applied
+        self.stat_clamped[index] += abs(requested - applied)
+
+    def record_ending(self, ending):
+        self.endings[ending] += 1
+
+    def snapshot(self):
+        """All metrics as a plain, JSON-ready dict"""
+        return {
+            "commands": {name: histogram.snapshot() for name, histogram in self.commands.items()},
+            "events": {period: histogram.snapshot() for period, histogram in self.events.items()},
+            "events_shown": self.event_count,
+            "end_day": self.end_day.snapshot(),
+            "stats": {
+                stat: {
+                    "updates": self.stat_updates[i],
+                    "gained": self.stat_gain[i],
+                    "lost": self.stat_loss[i],
+                    "clamped": self.stat_clamped[i],
+                }
+                for i, stat in enumerate(STAT_NAMES)
+            },
+            "endings": dict(self.endings),
+        }
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram_family(name, help_text, label, histograms):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} histogram")
+            for value, histogram in histograms.items():
+                labels = f'{label}="{value}",' if label else ""
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{PREFIX}_{name}_bucket{{{labels}le="{format_bound(bound)}"}} {count}')
+                labels = f'{{{labels[:-1]}}}' if label else ""
+                lines.append(f"{PREFIX}_{name}_sum{labels} {histogram.total}")
+                lines.append(f"{PREFIX}_{name}_count{labels} {histogram.count}")
+
+        def counter_family(name, help_text, label, values):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            for key, value in values:
+                lines.append(f'{PREFIX}_{name}{{{label}="{key}"}} {value}')
+
+        histogram_family("command_seconds", "Time to process a player command.", "command", self.commands)
+        histogram_family("event_seconds", "Time to process the events of a period.", "period", self.events)
+        histogram_family("end_day_seconds", "Time to end a day, including the next morning's events.", None,
+                         {None: self.end_day})
+        lines.append(f"# HELP {PREFIX}_events_shown_total Events shown to players.")
+        lines.append(f"# TYPE {PREFIX}_events_shown_total counter")
+        lines.append(f"{PREFIX}_events_shown_total {self.event_count}")
+        counter_family("stat_updates_total", "Stat changes applied.", "stat", zip(STAT_NAMES, self.stat_updates))
+        counter_family("stat_gained_total", "Stat points gained.", "stat", zip(STAT_NAMES, self.stat_gain))
+        counter_family("stat_lost_total", "Stat points lost.", "stat", zip(STAT_NAMES, self.stat_loss))
+        counter_family("stat_clamped_total", "Stat points dropped by the 0-100 limit.", "stat",
+                       zip(STAT_NAMES, self.stat_clamped))
+        counter_family("endings_total", "Games finished, by ending.", "ending", sorted(self.endings.items()))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,67 @@
+# output.py - Output sinks that collect a turn's text and deliver it in one write
+import sys
+
+
+class StreamSink:
+    """Buffer shown lines and send each batch to a write function in a single call"""
+
+    def __init__(self, write, encoding="utf-8"):
+        self.send = write
+        self.encoding = encoding  # None sends str instead of bytes
+        self.lines = []
+
+    def write(self, text):
+        """Queue one line of output"""
+        self.lines.append(text)
+
+    def flush(self, tail=""):
+        """Send everything queued, plus an optional tail such as a prompt, as one write"""
+        lines = self.lines
+        data = "\n".join(lines) + "\n" + tail if lines else tail
+        if data:
+            self.lines = []
+            self.send(data.encode(self.encoding) if self.encoding else data)
+
+
+class TerminalSink(StreamSink):
+    """Batched output to the terminal (or any text stream)"""
+
+    def __init__(self, stream=None):
+        self.stream = sys.stdout if stream is None else stream
+        super().__init__(self.stream.write, encoding=None)
+
+    def flush(self, tail=""):
+        super().flush(tail)
+        self.stream.flush()
+
+
+class MemorySink:
+    """Keep shown lines in a list until they are taken"""
+
+    def __init__(self):
+        self.messages = []
+
+    def write(self, text):
+        self.messages.append(text)
+
+    def flush(self, tail=""):
+        pass
+
+    def take(self):
+        """Return and clear the lines collected so far"""
+        messages = self.messages
+        self.messages = []
+        return messages
+
+
+class NullSink:
+    """Discard all output"""
+
+    def write(self, text):
+        pass
+
+    def flush(self, tail=""):
+        pass
+
+    def take(self):
+        return []
@@ -0,0 +1,54 @@
+# parallel.py - Seeded chunks of work, run on a bounded process pool in order or as they finish
+import hashlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+
+def chunk_seed(seed, key):
+    """Independent seed for one chunk or script, so results do not depend on how many workers ran"""
+    digest = hashlib.blake2b(f"{seed}:{key}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def chunks(items, size):
+    """Group any iterable into lists of at most size, reading only one list ahead"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_tasks(function, tasks, workers=1, ordered=True):
+    """Yield (arguments, result) for every argument tuple in tasks
+
+    One worker runs everything in this process. Otherwise tasks go to a
+    process pool with at most two per worker in flight, so a long or lazy
+    stream of tasks is never all in memory. Results come back in task order,
+    or as soon as each one finishes when ordered is false.
+    """
+    if workers <= 1:
+        for arguments in tasks:
+            yield arguments, function(*arguments)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = {}   # Future -> arguments, in submission order
+        for arguments in tasks:
+            pending[pool.submit(function, *arguments)] = arguments
+            if len(pending) >= workers * 2:
+                yield from take_finished(pending, ordered)
+        while pending:
+            yield from take_finished(pending, ordered)
+
+
+def take_finished(pending, ordered):
+    """Wait for the oldest task, or for any task when unordered, and yield what finished"""
+    if ordered:
+        future = next(iter(pending))
+        yield pending.pop(future), future.result()
+        return
+    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in finished:
+        yield pending.pop(future), future.result()
@@ -1,53 +1,187 @@
 # player.py - Player class for managing stats and state
+from array import array
+from collections.abc import MutableMapping
+from enum import IntEnum
+
+from history import ActionHistory, HISTORY_LIMIT, FLAG_RECOVERY, detect_flags
+
+# Stat names in their fixed order, with the values every player starts with
+STAT_NAMES = ("mental_health", "energy", "social_connections", "academic_readiness")
+INITIAL_STATS = {
+    "mental_health": 70,
+    "energy": 80,
+    "social_connections": 60,
+    "academic_readiness": 40
+}
+
+# Endings in the order check_ending tests them
+ENDING_NAMES = ("Pearl", "Eagle", "Wolf", "Turtle", "Phoenix", "Survivor")
+
+
+class Stat(IntEnum):
+    """Fixed position of each stat in a player's stat array"""
+    MENTAL_HEALTH = 0
+    ENERGY = 1
+    SOCIAL_CONNECTIONS = 2
+    ACADEMIC_READINESS = 3
+
+
+STAT_INDEX = {name: int(Stat[name.upper()]) for name in STAT_NAMES}
+STAT_TITLES = {name: name.replace("_", " ").title() for name in STAT_NAMES}  # e.g. "Mental Health"
+STAT_COUNT = len(STAT_NAMES)
+
+# Stats followed by lowest stats, copied into every new player
+INITIAL_VALUES = array("h", [INITIAL_STATS[name] for name in STAT_NAMES] * 2)
+
+# Interned action names; history stores the small code instead of the string
+ACTION_NAMES = ["study", "rest", "eat", "call", "meet", "exercise", "sleep"]
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+BUILTIN_ACTION_COUNT = len(ACTION_NAMES)  # Codes below this are the same in every process
+
+
+def action_code(action):
+    """Get the interned code for an action name, adding new names as they appear"""
+    code = ACTION_CODES.get(action)
+    if code is None:
+        code = ACTION_CODES[action] = len(ACTION_NAMES)
+        ACTION_NAMES.append(action)
+    return code
+
+
+class StatView(MutableMapping):
+    """Dict-style view of one half of a player's stat array"""
+    __slots__ = ("data", "offset")
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+
+    def __getitem__(self, stat_name):
+        return self.data[self.offset + STAT_INDEX[stat_name]]
+
+    def __setitem__(self, stat_name, value):
+        self.data[self.offset + STAT_INDEX[stat_name]] = value
+
+    def __delitem__(self, stat_name):
+        raise TypeError("Player stats cannot be removed")
+
+    def __iter__(self):
+        return iter(STAT_NAMES)
+
+    def __len__(self):
+        return STAT_COUNT
+
+    def __contains__(self, stat_name):
+        return stat_name in STAT_INDEX
+
+    def items(self):
+        return zip(STAT_NAMES, self.data[self.offset:self.offset + STAT_COUNT])
+
+    def copy(self):
+        """Return the stats as a plain dict"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return repr(self.copy())
+
+
 class Player:
-    def __init__(self, name="Student"):
+    __slots__ = ("name", "values", "effects", "log", "metrics")
+
+    def __init__(self, name="Student", history_limit=HISTORY_LIMIT, on_evict=None):
         self.name = name
-        # Initialize player stats
-        self.stats = {
-            "mental_health": 70,
-            "energy": 80,
-            "social_connections": 60,
-            "academic_readiness": 40
-        }
-        self.status_effects = []
-        self.history = []  # Track player actions and events
-        self.lowest_stats = {  # Track lowest values for Phoenix ending
-            "mental_health": 70,
-            "energy": 80,
-            "social_connections": 60,
-            "academic_readiness": 40
-        }
+        # Stats in STAT_NAMES order, then the lowest values for Phoenix ending
+        self.values = array("h", INITIAL_VALUES)
+        self.effects = None  # effects.StatusEffects, created on first use
+        self.log = ActionHistory(history_limit, on_evict)  # Track recent player actions
+        self.metrics = None  # Optional metrics.Metrics for stat telemetry
+
+    @property
+    def stats(self):
+        """Current stats by name"""
+        return StatView(self.values, 0)
+
+    @property
+    def lowest_stats(self):
+        """Lowest value each stat has reached, for the Phoenix ending"""
+        return StatView(self.values, STAT_COUNT)
+
+    @property
+    def status_effects(self):
+        """Active status effects, as dicts"""
+        return [] if self.effects is None else self.effects.active_effects()
+
+    @property
+    def history(self):
+        """Recent player actions, as a list of dicts"""
+        return list(self.iter_history())
+
+    @property
+    def recovered(self):
+        """Whether any logged action carried the recovery flag"""
+        return self.log.count(FLAG_RECOVERY) > 0
+
+    def iter_history(self):
+        """Stream recent player actions as dicts, oldest first"""
+        for code, _, results in self.log:
+            yield {"action": ACTION_NAMES[code], "results": results}
 
     def update_stat(self, stat_name, value):
         """Update a player stat, ensuring it stays within 0-100 range"""
-        if stat_name in self.stats:
+        i = STAT_INDEX.get(stat_name)
+        if i is not None:
+            values = self.values
+            current = values[i]
             # Track lowest stat values for Phoenix ending
-            if value < 0:
-                self.lowest_stats[stat_name] = min(self.lowest_stats[stat_name], self.stats[stat_name] + value)
+            if value < 0 and current + value < values[i + STAT_COUNT]:
+                values[i + STAT_COUNT] = current + value
 
             # Update the stat with bounds checking
-            self.stats[stat_name] = max(0, min(100, self.stats[stat_name] + value))
+            values[i] = max(0, min(100, current + value))
+            if self.metrics is not None:
+                self.metrics.record_stat(i, value, values[i] - current)
             return True
         return False
 
-    def apply_status_effect(self, effect):
-        """Apply a status effect to the player"""
-        self.status_effects.append(effect)
+    def apply_deltas(self, deltas):
+        """Apply one delta per stat, in STAT_NAMES order, with update_stat's rules"""
+        values = self.values
+        metrics = self.metrics
+        for i, value in enumerate(deltas):
+            if value:
+                current = values[i]
+                if value < 0 and current + value < values[i + STAT_COUNT]:
+                    values[i + STAT_COUNT] = current + value
+                values[i] = max(0, min(100, current + value))
+                if metrics is not None:
+                    metrics.record_stat(i, value, values[i] - current)
+
+    def enable_status_effects(self):
+        """Turn on status effects for this player"""
+        if self.effects is None:
+            from effects import StatusEffects  # effects builds on this module
+            self.effects = StatusEffects()
+        return self.effects
+
+    def apply_status_effect(self, effect_name):
+        """Apply a status effect by name, returning its start message if it just began"""
+        return self.enable_status_effects().apply(effect_name)
 
     def remove_status_effect(self, effect_name):
         """Remove a status effect from the player"""
-        self.status_effects = [e for e in self.status_effects if e["name"] != effect_name]
+        if self.effects is not None:
+            self.effects.remove(effect_name)
 
-    def log_action(self, action, results):
-        """Log an action and its results to player history"""
-        self.history.append({
-            "action": action,
-            "results": results
-        })
+    def log_action(self, action, results, flags=None, stamp=0):
+        """Log an action and its results to player history, with the game time it happened at"""
+        if flags is None:
+            flags = detect_flags(action, results)
+        self.log.append(action_code(action), flags, results, stamp)
 
     def get_stat(self, stat_name):
         """Get the current value of a stat"""
-        return self.stats.get(stat_name, 0)
+        i = STAT_INDEX.get(stat_name)
+        return 0 if i is None else self.values[i]
 
     def get_all_stats(self):
         """Get all player stats"""
@@ -55,33 +189,34 @@ class Player:
 
     def check_ending(self):
         """Determine which ending the player has achieved based on stats"""
-        stats = self.stats
+        mental_health, energy, social_connections, academic_readiness = self.values[:STAT_COUNT]
 
         # Pearl: The Balanced Achiever
-        if all(stat >= 60 for stat in stats.values()):
+        if min(mental_health, energy, social_connections, academic_readiness) >= 60:
             return "Pearl"
 
         # Eagle: The High Flyer
-        if stats["academic_readiness"] >= 85:
+        if academic_readiness >= 85:
             return "Eagle"
 
         # Wolf: The Social Leader
-        if stats["social_connections"] >= 85:
+        if social_connections >= 85:
             return "Wolf"
 
         # Turtle: The Steady Survivor
-        if stats["mental_health"] >= 75 and stats["energy"] >= 75:
+        if mental_health >= 75 and energy >= 75:
             return "Turtle"
 
         # Phoenix: The Comeback Story
         # Check if any stat dropped below 30 but is now above 70
-        for stat_name, current_value in stats.items():
-            if self.lowest_stats[stat_name] <= 30 and current_value >= 70:
+        values = self.values
+        for i in range(STAT_COUNT):
+            if values[i + STAT_COUNT] <= 30 and values[i] >= 70:
                 return "Phoenix"
 
         # Also check for recovery flag in history
-        if any("recovery" in action.get("results", {}) for action in self.history):
+        if self.recovered:
             return "Phoenix"
 
         # Default ending if no conditions are met
-        return "Survivor"
\ No newline at end of file
+        return "Survivor"
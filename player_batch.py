@@ -0,0 +1,81 @@
+# player_batch.py - Struct-of-arrays stats for scoring many players at once
+import numpy as np
+
+from player import STAT_NAMES, STAT_INDEX, INITIAL_STATS, ENDING_NAMES
+
+
+class PlayerBatch:
+    """Stats for N players as NumPy columns, with Player's update and ending rules"""
+
+    def __init__(self, size):
+        self.size = size
+        initial = np.array([INITIAL_STATS[name] for name in STAT_NAMES], dtype=np.int16)
+        # One row per stat, one column per player
+        self.stats = np.repeat(initial[:, None], size, axis=1)
+        self.lowest_stats = self.stats.copy()  # Track lowest values for Phoenix ending
+        self.recovered = np.zeros(size, dtype=bool)  # Recovery flag from history
+
+    @classmethod
+    def from_players(cls, players):
+        """Build a batch holding the current state of existing Player objects"""
+        batch = cls(len(players))
+        for j, player in enumerate(players):
+            for name, i in STAT_INDEX.items():
+                batch.stats[i, j] = player.stats[name]
+                batch.lowest_stats[i, j] = player.lowest_stats[name]
+            batch.recovered[j] = player.recovered
+        return batch
+
+    def column(self, stat_name):
+        """Get the values of one stat for every player"""
+        return self.stats[STAT_INDEX[stat_name]]
+
+    def update_stat(self, stat_name, value, mask=None):
+        """Add a scalar or per-player value to a stat, clamped to 0-100 like Player.update_stat"""
+        if stat_name not in STAT_INDEX:
+            return False
+        i = STAT_INDEX[stat_name]
+        value = np.asarray(value, dtype=np.int16)
+        if mask is not None:
+            value = np.where(mask, value, 0)
+
+        raw = self.stats[i] + value
+        # Like Player, the lowest value is tracked before clamping and only on losses
+        np.minimum(self.lowest_stats[i], np.where(value < 0, raw, self.lowest_stats[i]), out=self.lowest_stats[i])
+        np.clip(raw, 0, 100, out=self.stats[i])
+        return True
+
+    def apply_deltas(self, deltas, mask=None):
+        """Apply a delta per stat (shape 4, or 4 x N) in STAT_NAMES order"""
+        deltas = np.asarray(deltas, dtype=np.int16)
+        for i, name in enumerate(STAT_NAMES):
+            self.update_stat(name, deltas[i], mask)
+
+    def mark_recovery(self, mask):
+        """Set the recovery flag that rest's Rejuvenation effect records"""
+        self.recovered |= mask
+
+    def check_endings(self):
+        """Return each player's ending as an index into ENDING_NAMES"""
+        mental, energy, social, academic = self.stats
+        phoenix = ((self.lowest_stats <= 30) & (self.stats >= 70)).any(axis=0) | self.recovered
+
+        # np.select takes the first matching condition, the same precedence as check_ending
+        conditions = [
+            (self.stats >= 60).all(axis=0),
+            academic >= 85,
+            social >= 85,
+            (mental >= 75) & (energy >= 75),
+            phoenix,
+        ]
+        choices = range(len(conditions))
+        return np.select(conditions, choices, default=ENDING_NAMES.index("Survivor")).astype(np.uint8)
+
+    def ending_names(self):
+        """Return each player's ending name"""
+        return np.array(ENDING_NAMES)[self.check_endings()]
+
+    def ending_counts(self):
+        """Count players per ending"""
+        counts = np.bincount(self.check_endings(), minlength=len(ENDING_NAMES))
+        return dict(zip(ENDING_NAMES, counts.tolist()))
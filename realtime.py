@@ -0,0 +1,257 @@
+# realtime.py - Real-time mode: periods advance on the wall clock, driven by one shared timer wheel
+import argparse
+import heapq
+import random
+import time
+
+from engine import HeadlessGame
+
+PERIOD_SECONDS = 120.0   # Default length of a Morning or a Day
+TICK_SECONDS = 0.05      # Timer resolution
+TIME_UP_TEXT = "\nTime's up for today. You head home to sleep."
+
+WHEEL_BITS = 8           # 256 slots per level
+WHEEL_LEVELS = 4         # Covers 2**32 ticks, over six years at 50 ms
+
+
+def time_up(game):
+    """End a game's period because its time ran out, skipping any event choices left unanswered"""
+    # Like an empty answer in Engine.send_command, so the next line is not taken as an old choice
+    game.pending.clear()
+    game.end_period(TIME_UP_TEXT)
+
+
+class TimerWheel:
+    """Hierarchical timing wheel keyed by whole ticks
+
+    Scheduling is O(1), an idle tick is O(1), and everything due in a tick
+    comes back as one batch. Each level has 256 slots, each 256 times as
+    long as the level below; timers move down a level as their time nears.
+    """
+
+    def __init__(self, now=0, bits=WHEEL_BITS, levels=WHEEL_LEVELS):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self.now = now
+        self.overdue = []   # Timers scheduled at or before now, returned by the next advance
+        self.count = 0
+
+    def schedule(self, tick, item):
+        """Add an item to come due at a tick"""
+        self.count += 1
+        self.place(tick, item)
+
+    def place(self, tick, item):
+        delta = tick - self.now
+        if delta <= 0:
+            self.overdue.append(item)
+            return
+        level = 0
+        while delta >> (self.bits * (level + 1)) and level < len(self.levels) - 1:
+            level += 1
+        self.levels[level][(tick >> (self.bits * level)) & self.mask].append((tick, item))
+
+    def advance(self, tick):
+        """Move time forward to a tick and return every item that came due, in order"""
+        due = self.overdue
+        self.overdue = []
+        bits, mask, levels = self.bits, self.mask, self.levels
+        while self.now < tick:
+            self.now += 1
+            now = self.now
+            slot = now & mask
+            if not slot:
+                # A lower level wrapped around: pull the next bucket down from each level above
+                top = 1
+                while top < len(levels) - 1 and not (now >> (bits * top)) & mask:
+                    top += 1
+                for level in range(top, 0, -1):
+                    bucket = levels[level][(now >> (bits * level)) & mask]
+                    if bucket:
+                        levels[level][(now >> (bits * level)) & mask] = []
+                        for entry in bucket:
+                            self.place(*entry)
+                due.extend(self.overdue)
+                self.overdue = []
+            bucket = levels[0][slot]
+            if bucket:
+                levels[0][slot] = []
+                due.extend(item for _, item in bucket)
+        self.count -= len(due)
+        return due
+
+    def __len__(self):
+        return self.count
+
+
+class RealtimeClock:
+    """Advances the periods of many games on wall-clock time from one timer wheel
+
+    Each game gets period_seconds per Morning and per Day. When a period
+    runs out, tick() calls Game.end_period for the game, which starts the
+    Day (and its events) or sleeps through to the next morning. A game that
+    moves on early by using up its actions gets a fresh deadline from
+    touch(). Replaced deadlines are skipped when they come up.
+    """
+
+    def __init__(self, period_seconds=PERIOD_SECONDS, tick_seconds=TICK_SECONDS, clock=time.monotonic):
+        self.period_ticks = max(1, round(period_seconds / tick_seconds))
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self.origin = clock()
+        self.wheel = TimerWheel()
+        self.games = {}      # Key -> [game, generation, (day, period) the deadline is for]
+        self.fired = 0
+
+    def current_tick(self, now=None):
+        return int(((self.clock() if now is None else now) - self.origin) / self.tick_seconds)
+
+    def add(self, key, game, now=None):
+        """Start timing a game's periods from now"""
+        self.games[key] = [game, 0, None]
+        self.reschedule(key, now)
+
+    def remove(self, key):
+        self.games.pop(key, None)
+
+    def reschedule(self, key, now=None):
+        entry = self.games[key]
+        game = entry[0]
+        if game.game_over:
+            del self.games[key]
+            return
+        entry[1] += 1
+        entry[2] = (game.day, game.period)
+        self.wheel.schedule(max(self.current_tick(now), self.wheel.now) + self.period_ticks, (key, entry[1]))
+
+    def touch(self, key, now=None):
+        """Call after a game handles a command; restarts the timer if the game moved to a new period"""
+        entry = self.games.get(key)
+        if entry is not None and (entry[0].game_over or entry[2] != (entry[0].day, entry[0].period)):
+            self.reschedule(key, now)
+
+    def tick(self, now=None):
+        """End the period of every game whose time ran out; returns the keys of games that changed"""
+        changed = []
+        for key, generation in self.wheel.advance(self.current_tick(now)):
+            entry = self.games.get(key)
+            if entry is None or entry[1] != generation:
+                continue  # Finished, removed or rescheduled since
+            time_up(entry[0])
+            self.fired += 1
+            changed.append(key)
+            self.reschedule(key, now)
+        return changed
+
+    def __len__(self):
+        return len(self.games)
+
+
+class ScanClock:
+    """The simple alternative for comparison: a deadline per game, checked for every game each tick"""
+
+    def __init__(self, period_seconds=PERIOD_SECONDS, clock=time.monotonic):
+        self.period_seconds = period_seconds
+        self.clock = clock
+        self.deadlines = {}
+
+    def add(self, key, game, now=None):
+        self.deadlines[key] = [game, (self.clock() if now is None else now) + self.period_seconds]
+
+    def tick(self, now=None):
+        now = self.clock() if now is None else now
+        changed = []
+        for key, entry in self.deadlines.items():
+            if entry[1] <= now and not entry[0].game_over:
+                time_up(entry[0])
+                entry[1] = now + self.period_seconds
+                changed.append(key)
+        return changed
+
+
+def bench_ticks(sessions, period_seconds=60.0, tick_seconds=TICK_SECONDS, seconds=30.0, seed=0):
+    """Simulate idle sessions joining over one period and time every tick of the wheel and of a full scan"""
+    rng = random.Random(seed)
+    games = [HeadlessGame(seed=rng.getrandbits(64)) for _ in range(sessions)]
+    for game in games:
+        game.begin()
+        game.total_days = 10 ** 6   # Keep idle games running for the whole benchmark
+    joins = sorted(rng.uniform(0, period_seconds) for _ in range(sessions))
+
+    results = {}
+    for name, make in (("wheel", lambda: RealtimeClock(period_seconds, tick_seconds, clock=lambda: 0.0)),
+                       ("scan", lambda: ScanClock(period_seconds, clock=lambda: 0.0))):
+        clock = make()
+        for i, join in enumerate(joins):
+            clock.add(i, games[i], join)
+        ticks = int(seconds / tick_seconds)
+        fired = 0
+        times = []
+        now = period_seconds   # Every session has joined; deadlines are spread over the next period
+        for _ in range(ticks):
+            now += tick_seconds
+            start = time.perf_counter()
+            fired += len(clock.tick(now))
+            times.append(time.perf_counter() - start)
+        times.sort()
+        results[name] = {
+            "tick_us": sum(times) / ticks * 1e6,
+            "p99_tick_us": times[int(ticks * 0.99)] * 1e6,
+            "fired": fired,
+            "per_fire_us": sum(times) / max(fired, 1) * 1e6,
+        }
+    return results
+
+
+def bench_idle_ticks(timers, ticks=100000):
+    """Microseconds per wheel tick with many timers scheduled but none due"""
+    wheel = TimerWheel()
+    for i in range(timers):
+        wheel.schedule(ticks + 1 + i, i)
+    start = time.perf_counter()
+    wheel.advance(ticks)
+    return (time.perf_counter() - start) / ticks * 1e6
+
+
+def check_wheel(timers=20000, seed=0):
+    """Compare the wheel's firing order with a heap over random timers; True if they agree"""
+    rng = random.Random(seed)
+    wheel = TimerWheel()
+    heap = []
+    for i in range(timers):
+        tick = rng.randrange(1, 1 << 20)
+        wheel.schedule(tick, i)
+        heapq.heappush(heap, (tick, i))
+    now = 0
+    while heap:
+        now += rng.randrange(1, 5000)
+        expected = []
+        while heap and heap[0][0] <= now:
+            expected.append(heapq.heappop(heap)[1])
+        if sorted(wheel.advance(now)) != sorted(expected):
+            return False
+    return len(wheel) == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark real-time period ticks as sessions grow")
+    parser.add_argument("--sessions", default="1000,10000,50000", help="session counts to try, comma-separated")
+    parser.add_argument("--period", type=float, default=60.0, help="seconds per period")
+    parser.add_argument("--seconds", type=float, default=30.0, help="simulated seconds to tick through")
+    args = parser.parse_args()
+
+    print(f"Timer wheel matches a heap on random timers: {check_wheel()}")
+    print(f"Idle tick with 100,000 timers pending: {bench_idle_ticks(100000):.2f} us")
+    print(f"\n{args.seconds:.0f}s of {TICK_SECONDS * 1000:.0f} ms ticks, {args.period:.0f}s periods "
+          f"(tick cost in us; per fire includes end_period)")
+    print(f"  {'sessions':>9} {'fired':>7} {'wheel tick':>11} {'p99':>8} {'per fire':>9} {'scan tick':>10} {'p99':>8}")
+    for sessions in (int(count) for count in args.sessions.split(",")):
+        results = bench_ticks(sessions, args.period, seconds=args.seconds)
+        wheel, scan = results["wheel"], results["scan"]
+        print(f"  {sessions:>9,} {wheel['fired']:>7,} {wheel['tick_us']:>11.1f} {wheel['p99_tick_us']:>8.1f} "
+              f"{wheel['per_fire_us']:>9.1f} {scan['tick_us']:>10.1f} {scan['p99_tick_us']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
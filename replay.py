@@ -0,0 +1,81 @@
+# replay.py - Deterministic replay of recorded games, singly or in bulk
+import argparse
+import json
+import time
+
+from campaign import campaign_for
+from engine import Engine
+from parallel import chunks, run_tasks
+
+
+def replay(recording):
+    """Re-run a recording headlessly with the same settings and check that stats and ending match"""
+    engine = Engine(seed=recording["seed"], campaign=campaign_for(recording.get("campaign")), record=False,
+                    status_effects=recording.get("status_effects"))
+    for kind, value in recording["inputs"]:
+        if kind == "command":
+            engine.send_command(value)
+        elif kind == "choice":
+            engine.send_choice(value)
+        else:
+            raise ValueError(f"Unknown input kind '{kind}'")
+
+    game = engine.game
+    stats = game.player.stats.copy()
+    return {
+        "ok": stats == recording["stats"] and game.ending == recording["ending"],
+        "stats": stats,
+        "ending": game.ending,
+        "expected_stats": recording["stats"],
+        "expected_ending": recording["ending"],
+    }
+
+
+def replay_lines(lines):
+    """Replay JSON-lines recordings, returning (line number, result) for each mismatch"""
+    failures = []
+    count = 0
+    for number, line in lines:
+        if not line.strip():
+            continue
+        count += 1
+        result = replay(json.loads(line))
+        if not result["ok"]:
+            failures.append((number, result))
+    return count, failures
+
+
+def replay_corpus(paths, workers=1, chunk_size=1000):
+    """Replay every recording in some JSON-lines files; returns (games, failures)"""
+    games = 0
+    failures = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            # Numbered lines go out a chunk at a time, so big files are never fully in memory
+            tasks = ((chunk,) for chunk in chunks(enumerate(f, 1), chunk_size))
+            for _, (count, failed) in run_tasks(replay_lines, tasks, workers):
+                games += count
+                failures.extend((path, number, result) for number, result in failed)
+    return games, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Exam Hunters games and check their outcomes")
+    parser.add_argument("corpus", nargs="+", help="JSON-lines files of recordings from Engine.recording()")
+    parser.add_argument("--workers", type=int, default=1, help="processes to replay with")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    games, failures = replay_corpus(args.corpus, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for path, number, result in failures:
+        print(f"{path}:{number}: expected {result['expected_ending']} {result['expected_stats']}, "
+              f"got {result['ending']} {result['stats']}")
+    print(f"Replayed {games:,} games in {elapsed:.2f}s ({games / max(elapsed, 1e-9):,.0f}/sec), "
+          f"{len(failures)} mismatched")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
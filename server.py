@@ -0,0 +1,201 @@
+# server.py - Asyncio TCP server hosting one game session per connection
+import argparse
+import asyncio
+import functools
+import json
+
+from engine import HeadlessGame
+from game import CHOICE_PROMPT, COMMAND_PROMPT
+from leaderboard import Leaderboard
+from metrics import Metrics
+from output import StreamSink
+from realtime import RealtimeClock
+from sessions import play_line
+from world import World
+
+NAME_PROMPT = "Your name (one word, so friends can call you): "
+
+
+class Session:
+    """One connected player's game, fed line by line"""
+
+    def __init__(self, write, metrics=None, leaderboard=None):
+        # Output for a turn is buffered and sent to write() in one call
+        self.game = HeadlessGame(output=StreamSink(write), metrics=metrics, leaderboard=leaderboard)
+        self.game.begin()
+
+    def handle_line(self, line):
+        """Answer a pending event choice or run a command"""
+        play_line(self.game, line)
+
+    def flush(self):
+        """Send everything the game showed since the last flush, plus the next prompt"""
+        game = self.game
+        if game.game_over:
+            game.output.flush()
+        else:
+            game.output.flush(CHOICE_PROMPT if game.pending else COMMAND_PROMPT)
+
+
+async def handle_connection(reader, writer, metrics=None, leaderboard=None, realtime=None):
+    """Run a session for one client until the game ends or they disconnect"""
+    session = Session(writer.write, metrics, leaderboard)
+    key = (session, writer)
+    if realtime is not None:
+        realtime.add(key, session.game)
+    try:
+        # Each turn's output goes out as a single buffered write
+        session.flush()
+        await writer.drain()
+
+        while not session.game.game_over:
+            line = await reader.readline()
+            if not line:
+                break
+            session.handle_line(line.decode(errors="replace").strip())
+            if realtime is not None:
+                realtime.touch(key)
+            session.flush()
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        if realtime is not None:
+            realtime.remove(key)
+        writer.close()
+
+
+async def handle_world_connection(world, writers, reader, writer):
+    """Run one player in a shared world; their shard passes calls and meets on to the players they name"""
+    name = None
+    try:
+        while name is None:
+            writer.write(NAME_PROMPT.encode())
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                return
+            text = line.decode(errors="replace").strip().lower()
+            opening = await world.join(text) if text.isalnum() else None
+            if opening is None:
+                writer.write(b"That name is taken or not a single word.\n")
+            else:
+                name = text
+                writers[name] = writer
+                writer.write(opening.encode())
+                await writer.drain()
+
+        game_over = False
+        while not game_over:
+            line = await reader.readline()
+            if not line:
+                break
+            output, game_over = await world.handle(name, line.decode(errors="replace").strip())
+            writer.write(output.encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        if name is not None:
+            writers.pop(name, None)
+            await world.leave(name)
+        writer.close()
+
+
+def world_notifier(writers):
+    """Send a player what their shard showed them when a friend's call or meet arrived"""
+    def notify(name, text):
+        writer = writers.get(name)
+        if writer is not None:
+            writer.write(text.encode())
+    return notify
+
+
+async def run_realtime(clock):
+    """Tick the real-time clock, sending each game whose period ended its new output"""
+    while True:
+        await asyncio.sleep(clock.tick_seconds)
+        for session, writer in clock.tick():
+            session.flush()
+            if session.game.game_over:
+                writer.close()  # The session's readline sees the end and finishes
+
+
+async def handle_metrics(metrics, leaderboard, reader, writer):
+    """Answer one HTTP request with the metrics
+
+    /metrics.json and /leaderboard.json are JSON; anything else gets both as Prometheus text.
+    """
+    try:
+        request = await reader.readline()
+        while (await reader.readline()).strip():
+            pass  # Skip the request headers
+        if b"/metrics.json" in request:
+            body, content_type = json.dumps(metrics.snapshot()), "application/json"
+        elif b"/leaderboard.json" in request:
+            body, content_type = json.dumps(leaderboard.snapshot()), "application/json"
+        else:
+            body, content_type = metrics.prometheus() + leaderboard.prometheus(), "text/plain; version=0.0.4"
+        data = body.encode()
+        writer.write(f"HTTP/1.0 200 OK\r\nContent-Type: {content_type}\r\nContent-Length: {len(data)}\r\n\r\n"
+                     .encode() + data)
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, metrics_port=None, realtime=None, world_shards=None):
+    """Accept connections until cancelled, optionally exposing metrics over HTTP on metrics_port
+
+    With realtime set to a number of seconds, each Morning and Day lasts that
+    long, and periods move on by themselves when time runs out. With
+    world_shards, players share one world split over that many shards.
+    """
+    metrics = Metrics() if metrics_port else None
+    leaderboard = Leaderboard() if metrics_port else None
+    clock = RealtimeClock(realtime) if realtime else None
+    if world_shards:
+        writers = {}
+        world = World(world_shards, world_notifier(writers), metrics, leaderboard)
+        world.start()
+        handler = functools.partial(handle_world_connection, world, writers)
+    else:
+        handler = functools.partial(handle_connection, metrics=metrics, leaderboard=leaderboard, realtime=clock)
+    server = await asyncio.start_server(handler, host, port)
+    async with server:
+        tasks = [server.serve_forever()]
+        if clock is not None:
+            tasks.append(run_realtime(clock))
+        if metrics is None:
+            await asyncio.gather(*tasks)
+        else:
+            metrics_server = await asyncio.start_server(
+                functools.partial(handle_metrics, metrics, leaderboard), host, metrics_port)
+            async with metrics_server:
+                await asyncio.gather(*tasks, metrics_server.serve_forever())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host Exam Hunters sessions over TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--metrics-port", type=int, help="serve metrics over HTTP on this port")
+    parser.add_argument("--realtime", type=float, metavar="SECONDS",
+                        help="give each Morning and Day this many seconds of wall-clock time")
+    parser.add_argument("--world", type=int, metavar="SHARDS",
+                        help="put every player in one shared world, split over this many shards")
+    args = parser.parse_args()
+
+    print(f"Serving Exam Hunters on {args.host}:{args.port}")
+    if args.metrics_port:
+        print(f"Metrics at http://{args.host}:{args.metrics_port}/metrics")
+    try:
+        asyncio.run(serve(args.host, args.port, args.metrics_port, args.realtime, args.world))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
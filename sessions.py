@@ -0,0 +1,231 @@
+# sessions.py - Session manager keeping hot games in memory and spilling idle ones to a snapshot store
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from engine import HeadlessGame
+from game import CHOICE_PROMPT, COMMAND_PROMPT
+from metrics import Histogram
+from snapshot import SnapshotStore, load_game, save_game
+
+# Rough resident size of a session, for the memory budget (see benchmark.py)
+SESSION_BYTES = 4500
+ENTRY_BYTES = 300   # Per history entry
+
+
+def estimate_bytes(game):
+    """Approximate memory held by a live session"""
+    return SESSION_BYTES + len(game.player.log) * ENTRY_BYTES
+
+
+def play_line(game, line):
+    """Feed a line to a headless game: digits answer a pending event, anything else is a command"""
+    if game.pending:
+        event = game.pending.pop(0)
+        if line.isdigit() and 1 <= int(line) <= len(event.options):
+            game.choose_option(event, int(line) - 1)
+    else:
+        game.handle_command(line)
+
+
+def session_output(game):
+    """Everything a captured game showed since last time, plus its next prompt"""
+    text = "\n".join(game.output.take()) + "\n"
+    if game.game_over:
+        return text
+    return text + (CHOICE_PROMPT if game.pending else COMMAND_PROMPT)
+
+
+class SessionManager:
+    """Games by session id, with the least recently used spilled to disk past a budget
+
+    At most max_sessions games (and, if max_bytes is set, about that much
+    memory) stay live. Older ones are saved to a SnapshotStore and restored
+    transparently the next time their session is used.
+    """
+
+    def __init__(self, path, max_sessions=1000, max_bytes=None, metrics=None, slot_size=8192):
+        self.store = SnapshotStore(path, slot_size)
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.metrics = metrics          # Optional metrics.Metrics passed to every game
+        self.live = OrderedDict()       # Session id -> game, least recently used first
+        self.sizes = {}                 # Session id -> estimated bytes
+        self.live_bytes = 0
+        self.hits = self.misses = self.created = self.evictions = self.spill_failures = 0
+        self.resume_latency = Histogram()
+
+    def new_game(self):
+        return HeadlessGame(capture=True, metrics=self.metrics)
+
+    def get(self, session_id):
+        """The live game for a session, restoring it from disk or starting a new one as needed"""
+        game = self.live.get(session_id)
+        if game is not None:
+            self.hits += 1
+            self.live.move_to_end(session_id)
+            return game
+
+        snapshot = self.store.get(session_id)
+        if snapshot is not None:
+            start = time.perf_counter()
+            game = load_game(snapshot, self.new_game())
+            self.store.delete(session_id)
+            self.resume_latency.observe(time.perf_counter() - start)
+            self.misses += 1
+        else:
+            game = self.new_game()
+            game.begin()
+            self.created += 1
+
+        self.live[session_id] = game
+        self.resize(session_id, game)
+        self.evict()
+        return game
+
+    def resize(self, session_id, game):
+        size = estimate_bytes(game)
+        self.live_bytes += size - self.sizes.get(session_id, 0)
+        self.sizes[session_id] = size
+
+    def evict(self):
+        """Spill least recently used sessions until the live set fits the budget
+
+        A game leaves memory only once its snapshot is stored. One that
+        cannot be stored stays live, moved to the back of the queue, so it
+        is never lost and never fails another session's request.
+        """
+        attempts = len(self.live)
+        while attempts > 1 and len(self.live) > 1 and (
+                len(self.live) > self.max_sessions
+                or (self.max_bytes is not None and self.live_bytes > self.max_bytes)):
+            attempts -= 1
+            session_id, game = next(iter(self.live.items()))
+            if self.spill(session_id, game):
+                self.evictions += 1
+            else:
+                self.live.move_to_end(session_id)
+
+    def spill(self, session_id, game):
+        """Store a live game and take it out of memory; False, leaving it live, if it could not be stored"""
+        try:
+            self.store.put(session_id, save_game(game))
+        except (ValueError, OSError):
+            self.spill_failures += 1
+            return False
+        del self.live[session_id]
+        self.live_bytes -= self.sizes.pop(session_id)
+        return True
+
+    def handle(self, session_id, line):
+        """Feed a line to a session, like server.Session, and return its output and next prompt"""
+        game = self.get(session_id)
+        if game.game_over:
+            return "The game is over.\n"
+        play_line(game, line)
+        self.resize(session_id, game)
+        self.evict()
+        return session_output(game)
+
+    def open(self, session_id):
+        """Start or resume a session, returning what it has to show"""
+        return session_output(self.get(session_id))
+
+    def drop(self, session_id):
+        """Forget a session entirely"""
+        if self.live.pop(session_id, None) is not None:
+            self.live_bytes -= self.sizes.pop(session_id)
+        self.store.delete(session_id)
+
+    def __contains__(self, session_id):
+        return session_id in self.live or session_id in self.store
+
+    def stats(self):
+        """Hit/miss/eviction counts and cold-resume latency"""
+        lookups = self.hits + self.misses
+        return {
+            "live": len(self.live),
+            "spilled": len(self.store),
+            "live_bytes_estimate": self.live_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "evictions": self.evictions,
+            "spill_failures": self.spill_failures,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "resume": self.resume_latency.snapshot(),
+        }
+
+    def close(self, persist=True):
+        """Save every live session (unless persist is False) and close the store"""
+        if persist:
+            for session_id, game in self.live.items():
+                self.store.put(session_id, save_game(game))
+        self.live.clear()
+        self.sizes.clear()
+        self.live_bytes = 0
+        self.store.close()
+
+
+def bench_sessions(sessions=20000, hot=1000, commands=100000, skew=1.2, seed=0):
+    """Drive many sessions with skewed popularity and measure hits, evictions and cold resumes"""
+    rng = random.Random(seed)
+    lines = ["study math", "rest", "eat", "call alex", "meet alex", "exercise", "status", "1", "2"]
+    # Zipf-like popularity: a few sessions are busy, most are idle
+    weights = [1 / (rank + 1) ** skew for rank in range(sessions)]
+    picks = rng.choices(range(sessions), weights, k=commands)
+
+    workload = [(f"player-{pick}", rng.choice(lines)) for pick in picks]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Timed run
+        manager = SessionManager(os.path.join(directory, "timed.bin"), max_sessions=hot)
+        start = time.perf_counter()
+        for session_id, line in workload:
+            manager.handle(session_id, line)
+        elapsed = time.perf_counter() - start
+        stats = manager.stats()
+        resume = manager.resume_latency
+        manager.close(persist=False)
+
+        # The same load again with allocation tracing on, which is too slow to time
+        manager = SessionManager(os.path.join(directory, "traced.bin"), max_sessions=hot)
+        tracemalloc.start()
+        for session_id, line in workload:
+            manager.handle(session_id, line)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        manager.close(persist=False)
+
+    stats["commands_per_sec"] = commands / elapsed
+    stats["traced_bytes"] = memory
+    stats["resume_mean_us"] = resume.total / resume.count * 1e6 if resume.count else 0.0
+    stats["resume_p50_us"] = resume.quantile(0.5) * 1e6
+    stats["resume_p99_us"] = resume.quantile(0.99) * 1e6
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the session manager under skewed load")
+    parser.add_argument("--sessions", type=int, default=20000, help="distinct players")
+    parser.add_argument("--hot", type=int, default=1000, help="sessions kept in memory")
+    parser.add_argument("--commands", type=int, default=100000)
+    args = parser.parse_args()
+
+    stats = bench_sessions(args.sessions, args.hot, args.commands)
+    print(f"{args.commands:,} commands over {args.sessions:,} sessions, {args.hot:,} kept live: "
+          f"{stats['commands_per_sec']:,.0f} commands/sec")
+    print(f"hits {stats['hits']:,}, cold resumes {stats['misses']:,}, new {stats['created']:,}, "
+          f"evictions {stats['evictions']:,} (hit rate {stats['hit_rate']:.1%})")
+    print(f"cold resume: mean {stats['resume_mean_us']:.1f} us, p50 <= {stats['resume_p50_us']:.0f} us, "
+          f"p99 <= {stats['resume_p99_us']:.0f} us")
+    print(f"memory in use: {stats['traced_bytes'] / 1e6:.1f} MB "
+          f"(estimate for live sessions {stats['live_bytes_estimate'] / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# snapshot.py - Compact binary snapshots of game sessions and a file-backed store for them
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from actions import ACTIONS
+from campaign import campaign_from_packed
+from game import Game
+from effects import StatusEffects
+from events import EVENT_CATALOG, PERIODS
+from history import ActionHistory, FLAGS
+from player import ACTION_NAMES, BUILTIN_ACTION_COUNT, ENDING_NAMES, STAT_COUNT, STAT_NAMES, action_code
+
+MAGIC = b"EXHS"
+VERSION = 5  # 2 adds the game seed, 3 history time stamps, 4 the campaign, 5 modifier vectors
+OLDEST_VERSION = 3   # Oldest version load_game still reads
+
+PERIOD_NAMES = ("Morning", "Day")  # Game.period values, by period index
+NO_ENDING = 255
+
+# Fixed-size parts, all little-endian
+HEADER = struct.Struct("<4sB")          # magic, format version
+CLOCK = struct.Struct("<HBbHBB")        # day, period, actions remaining, total days, game over, ending
+STATS = struct.Struct(f"<{STAT_COUNT * 2}h")
+MODIFIERS = struct.Struct(f"<{STAT_COUNT}h")   # Status-effect modifiers, in STAT_NAMES order
+SEED = struct.Struct("<Q")
+RNG_STATE = struct.Struct("<625I")      # Mersenne Twister state words
+HISTORY = struct.Struct(f"<HHI{len(FLAGS)}I")  # capacity, entries, total appended, flag counts
+ENTRY = struct.Struct("<BBHB")          # action code, flags, time stamp, detail kind
+SHORT = struct.Struct("<H")
+LONG = struct.Struct("<I")
+DOUBLE = struct.Struct("<d")
+PENDING = struct.Struct("<HBB")         # day, period, event index
+
+# How an entry's details are stored
+DETAILS_TABLE = 0   # Rebuilt from the action table, plus the argument text if any
+DETAILS_JSON = 1    # Anything else, as JSON
+DETAILS_MODIFIED = 2   # As DETAILS_TABLE, then the status-effect modifiers the action was taken under
+
+
+def table_details(code, flags, argument):
+    """The details CommandProcessor logs for an action, rebuilt from the action table"""
+    action = ACTIONS.get(ACTION_NAMES[code])
+    if action is None:
+        return None
+    special = action.special_effect is not None and flags & action.flag
+    details = {}
+    if action.argument:
+        if argument is None:
+            return None
+        details[action.argument] = argument
+    details["results"] = action.special_results if special else action.results
+    if action.special_effect is not None:
+        effect = action.special_effect if special else None
+        if effect and action.argument:
+            effect = effect.replace("{" + action.argument + "}", argument)
+        details["special_effect"] = effect
+    return details
+
+
+def modifier_vector(modifiers):
+    """The modifiers CommandProcessor logs as a tuple for MODIFIERS, or None if they do not fit one"""
+    if list(modifiers) != list(STAT_NAMES):
+        return None
+    vector = tuple(modifiers.values())
+    if not all(type(value) is int and -0x8000 <= value < 0x8000 for value in vector):
+        return None
+    return vector
+
+
+def pack_text(text):
+    data = text.encode("utf-8")
+    return SHORT.pack(len(data)) + data
+
+
+def pack_blob(data):
+    return LONG.pack(len(data)) + data
+
+
+def save_game(game):
+    """Encode a game's state as a versioned binary snapshot"""
+    player = game.player
+    ending = NO_ENDING if game.ending is None else ENDING_NAMES.index(game.ending)
+    parts = [
+        HEADER.pack(MAGIC, VERSION),
+        CLOCK.pack(game.day, PERIOD_NAMES.index(game.period), game.actions_remaining, game.total_days,
+                   game.game_over, ending),
+        SEED.pack(game.seed & 0xFFFFFFFFFFFFFFFF),
+        pack_blob(b"" if game.campaign is None else game.campaign.pack()),
+        pack_text(player.name),
+        STATS.pack(*player.values),
+    ]
+
+    # RNG state, when the game's RNG can report it
+    getstate = getattr(game.rng, "getstate", None)
+    if getstate is None:
+        parts.append(b"\0")
+    else:
+        version, words, gauss_next = getstate()
+        parts.append(b"\1" + RNG_STATE.pack(*words))
+        parts.append(b"\0" if gauss_next is None else b"\1" + DOUBLE.pack(gauss_next))
+
+    parts.append(pack_blob(json.dumps(player.effects.to_dict()).encode("utf-8") if player.effects else b""))
+
+    log = player.log
+    parts.append(HISTORY.pack(log.capacity, len(log), log.total, *log.flag_counts))
+    for stamp, code, flags, details in log.iter_stamped():
+        action = ACTIONS.get(ACTION_NAMES[code])
+        argument = details.get(action.argument) if action is not None and action.argument else None
+        # Actions taken under status effects log their modifiers last, as a fixed vector
+        table, vector = details, None
+        if "modifiers" in details:
+            table = {key: value for key, value in details.items() if key != "modifiers"}
+            vector = modifier_vector(details["modifiers"])
+        # Built-in action codes are stable across processes; other names are stored in full
+        if (code < BUILTIN_ACTION_COUNT and (argument is None or isinstance(argument, str))
+                and (vector is not None or table is details) and table_details(code, flags, argument) == table):
+            parts.append(ENTRY.pack(code, flags, stamp, DETAILS_TABLE if vector is None else DETAILS_MODIFIED)
+                         + (SHORT.pack(0xFFFF) if argument is None else pack_text(argument)))
+            if vector is not None:
+                parts.append(MODIFIERS.pack(*vector))
+        else:
+            parts.append(ENTRY.pack(code, flags, stamp, DETAILS_JSON)
+                         + pack_text(ACTION_NAMES[code]) + pack_blob(json.dumps(details).encode("utf-8")))
+
+    # Event choices still waiting for an answer (headless games)
+    pending = getattr(game, "pending", [])
+    parts.append(bytes([len(pending)]))
+    for event in pending:
+        day, period, index = locate_event(game.events, event)
+        parts.append(PENDING.pack(day, period, index))
+
+    return b"".join(parts)
+
+
+def locate_event(catalog, event):
+    """Find an event's day, period index and position in the catalog or campaign schedule"""
+    for day in range(1, catalog.total_days + 1):
+        for period, name in enumerate(PERIODS):
+            for index, candidate in enumerate(catalog.lookup(day, name)):
+                if candidate is event:
+                    return day, period, index
+    raise ValueError(f"Event not in catalog: {event.text!r}")
+
+
+class Reader:
+    """Sequential reader over snapshot bytes"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def byte(self):
+        self.offset += 1
+        return self.data[self.offset - 1]
+
+    def take(self, size):
+        self.offset += size
+        return bytes(self.data[self.offset - size:self.offset])
+
+    def text(self):
+        (size,) = self.unpack(SHORT)
+        return None if size == 0xFFFF else self.take(size).decode("utf-8")
+
+    def blob(self):
+        (size,) = self.unpack(LONG)
+        return self.take(size)
+
+
+def load_game(data, game=None):
+    """Restore a snapshot into a game (a new Game by default) and return it
+
+    The game takes on the snapshot's campaign, or exam week if it has none.
+    Version 3 snapshots did not record one, so they keep the given game's.
+    """
+    reader = Reader(data)
+    magic, version = reader.unpack(HEADER)
+    if magic != MAGIC:
+        raise ValueError("Not an Exam Hunters snapshot")
+    if not OLDEST_VERSION <= version <= VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+
+    day, period, actions_remaining, total_days, game_over, ending = reader.unpack(CLOCK)
+    (seed,) = reader.unpack(SEED)
+    if version >= 4:
+        packed = reader.blob()
+        if (game is not None and game.campaign is not None and game.campaign.definition is not None
+                and packed == game.campaign.pack()):
+            campaign = game.campaign
+        else:
+            campaign = campaign_from_packed(packed) if packed else None
+    else:
+        campaign = None if game is None else game.campaign
+    if game is None:
+        game = Game(seed, campaign=campaign)
+    elif campaign is not game.campaign or seed != game.seed:
+        game.campaign = campaign
+        game.events = EVENT_CATALOG if campaign is None else campaign.schedule(seed)
+    game.seed = seed
+    game.day = day
+    game.period = PERIOD_NAMES[period]
+    game.actions_remaining = actions_remaining
+    game.total_days = total_days
+    game.game_over = bool(game_over)
+    game.ending = None if ending == NO_ENDING else ENDING_NAMES[ending]
+
+    player = game.player
+    player.name = reader.text()
+    player.values = array("h", reader.unpack(STATS))
+
+    if reader.byte():
+        words = reader.unpack(RNG_STATE)
+        gauss_next = reader.unpack(DOUBLE)[0] if reader.byte() else None
+        if hasattr(game.rng, "setstate"):
+            game.rng.setstate((3, words, gauss_next))
+
+    effects = reader.blob()
+    player.effects = StatusEffects.from_dict(json.loads(effects)) if effects else None
+
+    capacity, count, total, *flag_counts = reader.unpack(HISTORY)
+    log = player.log = ActionHistory(capacity, player.log.on_evict)
+    for _ in range(count):
+        code, flags, stamp, kind = reader.unpack(ENTRY)
+        if kind != DETAILS_JSON:
+            details = table_details(code, flags, reader.text())
+            if kind == DETAILS_MODIFIED:
+                details["modifiers"] = dict(zip(STAT_NAMES, reader.unpack(MODIFIERS)))
+        else:
+            code = action_code(reader.text())
+            details = json.loads(reader.blob())
+        log.append(code, flags, details, stamp)
+    log.total = total
+    log.flag_counts = array("I", flag_counts)
+
+    pending = [game.events.lookup(day, PERIODS[period])[index]
+               for day, period, index in (reader.unpack(PENDING) for _ in range(reader.byte()))]
+    if hasattr(game, "pending"):
+        game.pending = pending
+    if game.timeline is not None:
+        game.timeline.clear()  # Its states belong to the game that was replaced
+
+    return game
+
+
+class SnapshotStore:
+    """Many snapshots in one memory-mapped file of fixed-size slots, with an overflow file for big ones
+
+    Each slot holds a used flag, the session id and either one snapshot or,
+    for a snapshot too big for it, where that snapshot lives in the overflow
+    file next to the store. An id -> slot index is rebuilt when the file is
+    opened, so lookups are O(1); the file doubles in size when every slot
+    is taken. An overflow record is rewritten in place when the new snapshot
+    fits, and appended otherwise; the overflow file is compacted once over
+    half of it is dead space.
+    """
+    FILE_HEADER = struct.Struct("<4sII")   # magic, slot size, slot count
+    SLOT_HEADER = struct.Struct("<BB")     # used (SLOT_INLINE or SLOT_OVERFLOW), id length
+    OVERFLOW = struct.Struct("<QII")       # offset in the overflow file, snapshot size, room reserved there
+    MAX_ID = 64
+    SLOT_INLINE = 1
+    SLOT_OVERFLOW = 2
+    COMPACT_BYTES = 1 << 20   # Dead overflow space tolerated before compacting
+
+    def __init__(self, path, slot_size=8192, capacity=1024):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, self.slot_size, self.capacity = self.FILE_HEADER.unpack(self.file.read(self.FILE_HEADER.size))
+            if magic != b"EXSS":
+                raise ValueError(f"{path} is not a snapshot store")
+        else:
+            self.slot_size, self.capacity = slot_size, capacity
+            self.file.write(self.FILE_HEADER.pack(b"EXSS", slot_size, capacity))
+            self.file.truncate(self.file_size(capacity))
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+        self.index = {}   # Session id -> slot
+        self.free = []
+        self.overflow_live = 0   # Bytes of the overflow file still referenced by a slot
+        for slot in reversed(range(self.capacity)):
+            offset = self.slot_offset(slot)
+            used, id_length = self.SLOT_HEADER.unpack_from(self.map, offset)
+            if used:
+                start = offset + self.SLOT_HEADER.size
+                self.index[bytes(self.map[start:start + id_length]).decode("utf-8")] = slot
+                if used == self.SLOT_OVERFLOW:
+                    self.overflow_live += self.overflow_record(slot)[2]
+            else:
+                self.free.append(slot)
+
+        overflow_path = path + ".overflow"
+        self.overflow = open(overflow_path, "r+b" if os.path.exists(overflow_path) else "w+b")
+        self.overflow.seek(0, os.SEEK_END)
+        self.overflow_size = self.overflow.tell()
+
+    def file_size(self, capacity):
+        return self.FILE_HEADER.size + capacity * self.slot_size
+
+    def slot_offset(self, slot):
+        return self.FILE_HEADER.size + slot * self.slot_size
+
+    def grow(self):
+        """Double the number of slots"""
+        old = self.capacity
+        self.capacity *= 2
+        self.map.close()
+        self.file.truncate(self.file_size(self.capacity))
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.FILE_HEADER.pack_into(self.map, 0, b"EXSS", self.slot_size, self.capacity)
+        self.free.extend(reversed(range(old, self.capacity)))
+
+    def payload_offset(self, slot):
+        return self.slot_offset(slot) + self.SLOT_HEADER.size + self.MAX_ID
+
+    def overflow_record(self, slot):
+        """(offset, size, room) of a slot's snapshot in the overflow file"""
+        return self.OVERFLOW.unpack_from(self.map, self.payload_offset(slot))
+
+    def write_overflow(self, offset, snapshot):
+        self.overflow.seek(offset)
+        self.overflow.write(snapshot)
+
+    def put(self, session_id, snapshot):
+        """Store a snapshot (bytes, or a Game to save) of any size under a session id"""
+        if isinstance(snapshot, Game):
+            snapshot = save_game(snapshot)
+        key = session_id.encode("utf-8")
+        if len(key) > self.MAX_ID:
+            raise ValueError(f"Session id longer than {self.MAX_ID} bytes")
+
+        slot = self.index.get(session_id)
+        old = None
+        if slot is None:
+            if not self.free:
+                self.grow()
+            slot = self.free.pop()
+        elif self.map[self.slot_offset(slot)] == self.SLOT_OVERFLOW:
+            old = self.overflow_record(slot)
+
+        start = self.payload_offset(slot)
+        if len(snapshot) <= self.slot_size - self.SLOT_HEADER.size - self.MAX_ID - LONG.size:
+            LONG.pack_into(self.map, start, len(snapshot))
+            start += LONG.size
+            self.map[start:start + len(snapshot)] = snapshot
+            used = self.SLOT_INLINE
+            if old is not None:
+                self.overflow_live -= old[2]
+        else:
+            if old is not None and len(snapshot) <= old[2]:
+                offset, room = old[0], old[2]
+            else:
+                # Leave some headroom, as a game's snapshot usually grows
+                offset, room = self.overflow_size, len(snapshot) + len(snapshot) // 4
+                self.overflow_size += room
+                self.overflow_live += room - (old[2] if old is not None else 0)
+            self.write_overflow(offset, snapshot)
+            if offset + room == self.overflow_size:
+                self.overflow.truncate(self.overflow_size)   # Reserve the headroom, so a reopened store appends past it
+            self.OVERFLOW.pack_into(self.map, start, offset, len(snapshot), room)
+            used = self.SLOT_OVERFLOW
+
+        # The slot is marked used last, so a failed write never leaves a half-stored session
+        self.SLOT_HEADER.pack_into(self.map, self.slot_offset(slot), used, len(key))
+        start = self.slot_offset(slot) + self.SLOT_HEADER.size
+        self.map[start:start + len(key)] = key
+        self.index[session_id] = slot
+        if self.overflow_size - self.overflow_live > max(self.overflow_live, self.COMPACT_BYTES):
+            self.compact()
+
+    def get(self, session_id):
+        """Return the snapshot bytes for a session id, or None"""
+        slot = self.index.get(session_id)
+        if slot is None:
+            return None
+        if self.map[self.slot_offset(slot)] == self.SLOT_OVERFLOW:
+            offset, size, _ = self.overflow_record(slot)
+            self.overflow.seek(offset)
+            return self.overflow.read(size)
+        start = self.payload_offset(slot)
+        (size,) = LONG.unpack_from(self.map, start)
+        start += LONG.size
+        return bytes(self.map[start:start + size])
+
+    def compact(self):
+        """Rewrite the overflow file with only the snapshots still in use"""
+        temporary = self.path + ".overflow.tmp"
+        offset = 0
+        with open(temporary, "wb") as f:
+            for slot in self.index.values():
+                if self.map[self.slot_offset(slot)] != self.SLOT_OVERFLOW:
+                    continue
+                old_offset, size, room = self.overflow_record(slot)
+                self.overflow.seek(old_offset)
+                f.write(self.overflow.read(size).ljust(room, b"\0"))
+                self.OVERFLOW.pack_into(self.map, self.payload_offset(slot), offset, size, room)
+                offset += room
+        self.map.flush()
+        self.overflow.close()
+        os.replace(temporary, self.path + ".overflow")
+        self.overflow = open(self.path + ".overflow", "r+b")
+        self.overflow_size = self.overflow_live = offset
+
+    def load(self, session_id, game=None):
+        """Restore a stored session into a game, or return None if there is none"""
+        snapshot = self.get(session_id)
+        return None if snapshot is None else load_game(snapshot, game)
+
+    def delete(self, session_id):
+        """Remove a session's snapshot"""
+        slot = self.index.pop(session_id, None)
+        if slot is not None:
+            if self.map[self.slot_offset(slot)] == self.SLOT_OVERFLOW:
+                self.overflow_live -= self.overflow_record(slot)[2]
+            self.map[self.slot_offset(slot)] = 0
+            self.free.append(slot)
+
+    def __contains__(self, session_id):
+        return session_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def flush(self):
+        self.overflow.flush()
+        self.map.flush()
+
+    def close(self):
+        self.overflow.close()
+        self.map.flush()
+        self.map.close()
+        self.file.close()
@@ -0,0 +1,312 @@
+# solver.py - Exhaustive strategy solver over the game's state space
+import argparse
+import time
+
+import numpy as np
+
+from actions import ACTIONS
+from events import EVENT_CATALOG, PERIODS
+from player import STAT_NAMES, STAT_COUNT, INITIAL_STATS, ENDING_NAMES
+
+# Arguments used when a plan step needs one, so plans can be replayed as commands
+PLAN_ARGUMENTS = {"subject": "math", "friend": "alex"}
+
+# Move for leaving an event choice unanswered (like pressing Enter)
+SKIP = -1
+
+ENDING_COUNT = len(ENDING_NAMES)
+SURVIVOR = ENDING_NAMES.index("Survivor")
+
+
+class Solver:
+    """Best achievable chance of each ending, by dynamic programming over game states
+
+    A state is a clock (day, period, actions remaining and which event choice,
+    if any, is pending) plus the stats, a bitmask of stats whose lowest value
+    reached 30 or less (all the Phoenix ending needs from lowest_stats) and the
+    recovery flag. Stat tuples are interned, so within a clock a state is the
+    int stats_id * 32 + flags, with the dipped mask in the low 4 bits and
+    recovery in bit 4. Duplicate states collapse to one entry per clock.
+
+    Timing never depends on stats, so the clocks form a small DAG that is
+    solved layer by layer: a forward pass finds every reachable state with
+    NumPy, and a backward pass takes the expectation over chance outcomes
+    (random special effects) and the maximum over decisions (commands and
+    event choices), separately for every ending.
+    """
+
+    def __init__(self, actions=ACTIONS, catalog=EVENT_CATALOG, total_days=3, stats=None, lowest_stats=None,
+                 recovered=False):
+        self.actions = actions
+        self.catalog = catalog
+        self.total_days = total_days
+        self.sleep = actions["sleep"]
+
+        # Each action's outcomes as (probability, deltas, sets recovery)
+        self.outcomes = {}
+        for name, action in actions.items():
+            outcomes = [(1.0 - action.chance, action.deltas, False)]
+            if action.special_effect is not None and action.chance > 0:
+                outcomes.append((action.chance, action.special_deltas, "recovery" in action.special_results))
+            self.outcomes[name] = [outcome for outcome in outcomes if outcome[0] > 0]
+
+        stats = dict(INITIAL_STATS, **(stats or {}))
+        lowest_stats = dict(stats, **(lowest_stats or {}))
+        self.start_stats = tuple(stats[name] for name in STAT_NAMES)
+        self.start_dipped = sum(1 << i for i, name in enumerate(STAT_NAMES) if lowest_stats[name] <= 30)
+        self.start_recovered = recovered
+
+        self.clocks = []        # Clock tuples by id
+        self.clock_ids = {}
+        self.clock_moves = []   # Per clock id: [(move, [(probability, delta ids, sets recovery, next clock id)])]
+        self.stats = []         # Stat tuples by id
+        self.stats_ids = {}
+        self.deltas = []        # Delta tuples by id
+        self.deltas_ids = {}
+        self.transitions = {}   # Delta id -> (new stats id, dipped bits) arrays indexed by stats id
+        self.states = {}        # Clock id -> sorted array of reachable states
+        self.values = {}        # Clock id -> best chance of each ending, one row per state
+        self.start_clock = self.fire_events(1, 0)
+        self.explore_clocks()
+
+    # Clocks: the timing part of a state, following Game.handle_command
+
+    def intern_clock(self, clock):
+        clock_id = self.clock_ids.get(clock)
+        if clock_id is None:
+            clock_id = self.clock_ids[clock] = len(self.clocks)
+            self.clocks.append(clock)
+        return clock_id
+
+    def choices(self, day, period):
+        """Events with options at a day and period"""
+        return [event for event in self.catalog.lookup(day, PERIODS[period]) if event.options]
+
+    def fire_events(self, day, period):
+        """Clock id after a period's events fire: waiting on the first choice, if any"""
+        return self.intern_clock((day, period, 3, 0 if self.choices(day, period) else None))
+
+    def explore_clocks(self):
+        """Work out the moves from every reachable clock"""
+        while len(self.clock_moves) < len(self.clocks):
+            self.clock_moves.append(self.moves_from(self.clocks[len(self.clock_moves)]))
+
+    def moves_from(self, clock):
+        """Moves from a clock; the next clock (None once the game ends) never depends on stats"""
+        day, period, actions, pending = clock
+        moves = []
+
+        if pending is not None:
+            # Answer (or skip) the pending event choice
+            events = self.choices(day, period)
+            following = self.intern_clock((day, period, actions, pending + 1 if pending + 1 < len(events) else None))
+            moves.append((SKIP, [(1.0, (), False, following)]))
+            for i, option in enumerate(events[pending].options):
+                moves.append((i, [(1.0, (self.intern_deltas(option.deltas),), False, following)]))
+            return moves
+
+        for name, action in self.actions.items():
+            chain = ()
+            if action.ends_day:
+                # sleep: end_day fires the next morning's events before the end check
+                following = self.fire_events(day + 1, 0) if day + 1 <= self.total_days else None
+            elif actions - action.cost > 0:
+                following = self.intern_clock((day, period, actions - action.cost, None))
+            elif period == 0:
+                following = self.fire_events(day, 1)
+            else:
+                # Auto-sleep at end of day
+                chain = (self.intern_deltas(self.sleep.deltas),)
+                following = self.fire_events(day + 1, 0) if day + 1 <= self.total_days else None
+
+            branches = [(probability, (self.intern_deltas(deltas),) + chain, sets_recovery, following)
+                        for probability, deltas, sets_recovery in self.outcomes[name]]
+            moves.append((name, branches))
+        return moves
+
+    def clock_order(self):
+        """Clock ids in the order time passes: every move leads to a later clock"""
+        def rank(clock_id):
+            day, period, actions, pending = self.clocks[clock_id]
+            return (day, period, -actions, pending is None, pending or 0)
+        return sorted(range(len(self.clocks)), key=rank)
+
+    # Stats: interned tuples with vectorised transitions
+
+    def intern_stats(self, stats):
+        stats_id = self.stats_ids.get(stats)
+        if stats_id is None:
+            stats_id = self.stats_ids[stats] = len(self.stats)
+            self.stats.append(stats)
+        return stats_id
+
+    def intern_deltas(self, deltas):
+        deltas_id = self.deltas_ids.get(deltas)
+        if deltas_id is None:
+            deltas_id = self.deltas_ids[deltas] = len(self.deltas)
+            self.deltas.append(deltas)
+        return deltas_id
+
+    def step(self, stats_ids, deltas_id):
+        """Apply a delta vector to many stats ids at once: (new stats ids, dipped bits)"""
+        table, bits = self.transitions.get(deltas_id, (np.empty(0, np.int64), np.empty(0, np.int64)))
+        if len(table) <= stats_ids.max(initial=-1):
+            # Extend the table to cover stats ids seen since it was built
+            deltas = self.deltas[deltas_id]
+            extra = [apply(self.stats[i], 0, deltas) for i in range(len(table), len(self.stats))]
+            table = np.concatenate([table, [self.intern_stats(stats) for stats, _ in extra]]).astype(np.int64)
+            bits = np.concatenate([bits, [dipped for _, dipped in extra]]).astype(np.int64)
+            self.transitions[deltas_id] = table, bits
+        return table[stats_ids], bits[stats_ids]
+
+    def follow(self, states, branch):
+        """Apply one outcome of a move to an array of states"""
+        _, chain, sets_recovery, _ = branch
+        stats_ids, flags = states >> 5, states & 31
+        for deltas_id in chain:
+            stats_ids, bits = self.step(stats_ids, deltas_id)
+            flags = flags | bits
+        if sets_recovery:
+            flags = flags | 16
+        # Once recovered, Phoenix no longer depends on which stats dipped
+        flags = np.where(flags & 16, 16, flags)
+        return stats_ids << 5 | flags
+
+    def endings(self, states):
+        """Index of the ending Player.check_ending would give, for an array of states"""
+        stats = np.array(self.stats, dtype=np.int64)[states >> 5]
+        flags = states & 31
+        mental_health, energy, social_connections, academic_readiness = stats.T
+        dipped = (flags[:, None] >> np.arange(STAT_COUNT)) & 1
+        phoenix = (flags >= 16) | ((dipped == 1) & (stats >= 70)).any(axis=1)
+        conditions = [
+            stats.min(axis=1) >= 60,
+            academic_readiness >= 85,
+            social_connections >= 85,
+            (mental_health >= 75) & (energy >= 75),
+            phoenix,
+        ]
+        return np.select(conditions, range(len(conditions)), default=SURVIVOR)
+
+    # Solving
+
+    def initial_state(self):
+        """The packed state right after the game begins (day 1 morning events fired)"""
+        stats_id = self.intern_stats(self.start_stats)
+        return stats_id << 5 | (16 if self.start_recovered else self.start_dipped)
+
+    def solve(self):
+        """Return each ending's best achievable probability from the start"""
+        order = self.clock_order()
+
+        # Forward: collect the reachable states of each clock, in time order
+        incoming = {self.start_clock: [np.array([self.initial_state()], dtype=np.int64)]}
+        for clock_id in order:
+            states = np.unique(np.concatenate(incoming.pop(clock_id, [np.empty(0, np.int64)])))
+            self.states[clock_id] = states
+            if len(states) == 0:
+                continue
+            for _, branches in self.clock_moves[clock_id]:
+                for branch in branches:
+                    following = branch[3]
+                    if following is not None:
+                        incoming.setdefault(following, []).append(self.follow(states, branch))
+
+        # Backward: expectation over chance outcomes, maximum over decisions
+        for clock_id in reversed(order):
+            states = self.states[clock_id]
+            best = np.zeros((len(states), ENDING_COUNT))
+            for _, branches in self.clock_moves[clock_id]:
+                best = np.maximum(best, self.expected(states, branches))
+            self.values[clock_id] = best
+
+        return dict(zip(ENDING_NAMES, self.lookup(self.start_clock, self.initial_state()).tolist()))
+
+    def expected(self, states, branches):
+        """Chance of each ending for each state after taking a move"""
+        total = np.zeros((len(states), ENDING_COUNT))
+        for branch in branches:
+            probability, following = branch[0], branch[3]
+            after = self.follow(states, branch)
+            if following is None:
+                total += probability * ENDING_EYE[self.endings(after)]
+            else:
+                positions = np.searchsorted(self.states[following], after)
+                total += probability * self.values[following][positions]
+        return total
+
+    def state_count(self):
+        """Distinct states after collapsing duplicates"""
+        return sum(len(states) for states in self.states.values())
+
+    def lookup(self, clock_id, state):
+        """Solved values of one state"""
+        states = self.states[clock_id]
+        return self.values[clock_id][np.searchsorted(states, state)]
+
+    def best_move(self, clock_id, state, ending):
+        """The move that maximises the chance of an ending from a state"""
+        e = ENDING_NAMES.index(ending)
+        states = np.array([state], dtype=np.int64)
+        moves = self.clock_moves[clock_id]
+        return max(moves, key=lambda move: self.expected(states, move[1])[0, e])[0]
+
+    def plan(self, ending):
+        """Input lines for the best play towards an ending, assuming the likeliest chance outcomes"""
+        lines = []
+        clock_id, state = self.start_clock, self.initial_state()
+        while clock_id is not None:
+            move = self.best_move(clock_id, state, ending)
+            if self.clocks[clock_id][3] is not None:
+                lines.append("" if move == SKIP else str(move + 1))
+            else:
+                argument = self.actions[move].argument
+                lines.append(f"{move} {PLAN_ARGUMENTS[argument]}" if argument else move)
+            branches = dict(self.clock_moves[clock_id])[move]
+            likeliest = max(branches, key=lambda branch: branch[0])
+            state = int(self.follow(np.array([state], dtype=np.int64), likeliest)[0])
+            clock_id = likeliest[3]
+        return lines
+
+
+# One-hot value rows for finished games
+ENDING_EYE = np.eye(ENDING_COUNT)
+
+
+def apply(stats, dipped, deltas):
+    """Apply a delta vector with Player.update_stat's clamping and lowest-value rules"""
+    new = list(stats)
+    for i in range(STAT_COUNT):
+        value = deltas[i]
+        if value:
+            raw = new[i] + value
+            if value < 0 and raw <= 30:
+                dipped |= 1 << i
+            new[i] = 0 if raw < 0 else 100 if raw > 100 else raw
+    return tuple(new), dipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the best strategy for each Exam Hunters ending")
+    parser.add_argument("--days", type=int, default=3, help="total days in the game")
+    for name in STAT_NAMES:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=INITIAL_STATS[name],
+                            help=f"starting {name.replace('_', ' ')}")
+    args = parser.parse_args()
+
+    stats = {name: getattr(args, name) for name in STAT_NAMES}
+    solver = Solver(total_days=args.days, stats=stats)
+    start = time.perf_counter()
+    results = solver.solve()
+    elapsed = time.perf_counter() - start
+    print(f"Solved {solver.state_count():,} states in {elapsed:.2f}s\n")
+
+    for ending, probability in results.items():
+        if probability > 0:
+            print(f"{ending:9} best chance {probability:7.2%}: {', '.join(repr(line) for line in solver.plan(ending))}")
+        else:
+            print(f"{ending:9} unreachable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# sweep.py - Balance parameter sweeps over the action table, using common random numbers
+import argparse
+import copy
+import itertools
+import json
+import os
+import random
+import time
+from array import array
+
+from actions import compile_actions, load_action_table
+from analyzer import POLICIES, Tally
+from commands import CommandProcessor
+from engine import Engine
+from parallel import chunk_seed, run_tasks
+from player import ENDING_NAMES, STAT_INDEX
+
+STREAM_LENGTH = 128   # Draws per stream per game; a longer game wraps around to the start
+STREAMS = 3           # Special effects, policy, event choices
+
+
+class Draws:
+    """Precomputed uniform draws replayed in order, standing in for random.Random"""
+    __slots__ = ("values", "position")
+
+    def __init__(self, values):
+        self.values = values
+        self.position = 0
+
+    def random(self):
+        value = self.values[self.position % len(self.values)]
+        self.position += 1
+        return value
+
+    def randrange(self, n):
+        return int(self.random() * n)
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+
+def parameter_path(name):
+    """Where a parameter lives in the action table
+
+    "study.energy" is a stat delta, "study.chance" the special effect's
+    chance and "study.bonus.academic_readiness" its bonus; anything else is
+    a literal key path such as "meet.cost".
+    """
+    parts = name.split(".")
+    if len(parts) == 2 and parts[1] in STAT_INDEX:
+        return (parts[0], "deltas", parts[1])
+    if len(parts) == 2 and parts[1] == "chance":
+        return (parts[0], "special", "chance")
+    if len(parts) == 3 and parts[1] == "bonus":
+        return (parts[0], "special", "bonus", parts[2])
+    return tuple(parts)
+
+
+def apply_parameters(table, parameters):
+    """Return a copy of an action table with {parameter name: value} set"""
+    table = copy.deepcopy(table)
+    for name, value in parameters.items():
+        path = parameter_path(name)
+        target = table
+        for key in path[:-1]:
+            if not isinstance(target, dict) or key not in target:
+                raise ValueError(f"Unknown balance parameter '{name}'")
+            target = target[key]
+        if path[-1] not in target and path[-2] not in ("deltas", "bonus"):
+            raise ValueError(f"Unknown balance parameter '{name}'")
+        if path[-2] in ("deltas", "bonus") and path[-1] not in STAT_INDEX:
+            raise ValueError(f"Unknown stat in balance parameter '{name}'")
+        target[path[-1]] = value
+    return table
+
+
+def parse_values(text):
+    """Values for one parameter: "10,15,20" or an inclusive range "10:20:5" (start:stop:step)"""
+    number = float if any(c in text for c in ".e") else int
+    if ":" in text:
+        start, stop, step = (number(part) for part in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) if number is float else start + i * step for i in range(count)]
+    return [number(part) for part in text.split(",")]
+
+
+def grid(ranges):
+    """Every combination of {parameter name: values}, as a list of {name: value}"""
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[name] for name in names))]
+
+
+def make_draws(seed, games):
+    """The random numbers for a chunk of games: STREAMS arrays of STREAM_LENGTH per game"""
+    rng = random.Random(seed)
+    return [[array("d", (rng.random() for _ in range(STREAM_LENGTH))) for _ in range(STREAMS)]
+            for _ in range(games)]
+
+
+def play_game(actions, help_text, policy, draws):
+    """Play one game to the end with compiled actions, taking every random number from draws"""
+    specials, choices, options = (Draws(values) for values in draws)
+    engine = Engine(seed=0, record=False)
+    game = engine.game
+    game.rng = specials
+    game.commands = CommandProcessor(game, actions, help_text)
+    while not game.game_over:
+        if game.pending:
+            engine.send_choice(options.randrange(len(game.pending[0].options)))
+        else:
+            engine.send_command(policy(game, choices))
+    return game
+
+
+def run_chunk(table, configurations, policy_name, seed, games, common=True):
+    """Play a chunk of games under every configuration; returns one Tally dict per configuration
+
+    With common random numbers the chunk's draws are made once and replayed
+    for every configuration, so their results differ only by the parameters.
+    """
+    policy = POLICIES[policy_name]
+    shared = make_draws(seed, games) if common else None
+    results = []
+    for n, parameters in enumerate(configurations):
+        actions, help_text = compile_actions(apply_parameters(table, parameters))
+        draws = shared if common else make_draws(chunk_seed(seed, n), games)
+        tally = Tally()
+        for game_draws in draws:
+            tally.add(play_game(actions, help_text, policy, game_draws))
+        results.append(tally.to_dict())
+    return results
+
+
+def sweep(ranges, games=2000, policy="random", seed=0, workers=None, chunk_size=500, common=True, table=None):
+    """Run every configuration in the grid over the same games; returns [(parameters, Tally)]
+
+    Games are split into chunks with their own seeds, and each chunk runs
+    every configuration in one worker, so the draws are generated once per
+    chunk whatever the grid size.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy '{policy}'")
+    table = load_action_table() if table is None else table
+    configurations = grid(ranges)
+    for parameters in configurations:
+        apply_parameters(table, parameters)  # Fail early on a bad parameter
+
+    chunk_count = -(-games // chunk_size)
+    counts = [min(chunk_size, games - index * chunk_size) for index in range(chunk_count)]
+    tallies = [Tally() for _ in configurations]
+
+    workers = workers or os.cpu_count() or 1
+    tasks = ((table, configurations, policy, chunk_seed(seed, index), counts[index], common)
+             for index in range(chunk_count))
+    for _, results in run_tasks(run_chunk, tasks, workers):
+        for tally, result in zip(tallies, results):
+            tally.merge(Tally.from_dict(result))
+    return list(zip(configurations, tallies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep balance parameters and compare ending rates")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUES",
+                        help="parameter and values, e.g. study.academic_readiness=10,15,20 or study.chance=0.1:0.3:0.1")
+    parser.add_argument("--games", type=int, default=2000, help="games per configuration")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="processes to use (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="games per task sent to a worker")
+    parser.add_argument("--independent", action="store_true",
+                        help="draw fresh random numbers for each configuration, for comparison")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    ranges = {}
+    for setting in args.set:
+        name, _, values = setting.partition("=")
+        ranges[name] = parse_values(values)
+    if not ranges:
+        ranges = {"study.academic_readiness": [10, 15, 20], "study.chance": [0.1, 0.2, 0.3]}
+
+    start = time.perf_counter()
+    results = sweep(ranges, args.games, args.policy, args.seed, args.workers, args.chunk_size, not args.independent)
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} configurations x {args.games:,} games ({args.policy} policy) in {elapsed:.1f}s")
+
+    names = list(ranges)
+    widths = [max(len(name), 6) for name in names]
+    print("  ".join(name.rjust(width) for name, width in zip(names, widths)) + "  "
+          + "  ".join(f"{ending:>8}" for ending in ENDING_NAMES))
+    for parameters, tally in results:
+        rates = (tally.endings.get(ending, 0) / max(tally.games, 1) for ending in ENDING_NAMES)
+        print("  ".join(str(parameters[name]).rjust(width) for name, width in zip(names, widths)) + "  "
+              + "  ".join(f"{rate:8.2%}" for rate in rates))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([{"parameters": parameters, **tally.to_dict()} for parameters, tally in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
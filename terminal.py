@@ -1,42 +1,65 @@
 # terminal.py - Terminal interface for text display
+from functools import lru_cache
+
+from output import TerminalSink
+from player import STAT_TITLES
+
+BAR_LENGTH = 50
+
+# Every stat bar and label, built once instead of on each render
+BARS = tuple("█" * (value // 2) + "░" * (BAR_LENGTH - value // 2) for value in range(101))
+STAT_LABELS = {stat: f"{title:20}" for stat, title in STAT_TITLES.items()}
+
+
+def stat_bar(value):
+    """Bar for a stat value, clamped to 0-100"""
+    return BARS[max(0, min(100, value))]
+
+
+@lru_cache(maxsize=None)
+def decorations(width):
+    """Divider, rule and section titles for a width, shared by every Terminal"""
+    return "-" * width, "=" * width, "STATS:".center(width), "EVENT:".center(width)
+
+
 class Terminal:
-    def __init__(self):
-        self.width = 80
+    __slots__ = ("output", "width", "divider", "rule", "stats_title", "event_title")
+
+    def __init__(self, output=None, width=80):
+        self.output = TerminalSink() if output is None else output
+        self.width = width
+        self.divider, self.rule, self.stats_title, self.event_title = decorations(width)
 
     def clear(self):
         """Clear the terminal screen"""
-        print("\n" * 50)
+        self.output.write("\n" * 50)
 
     def print_header(self, text):
         """Print a header with decoration"""
-        print("=" * self.width)
-        print(text.center(self.width))
-        print("=" * self.width)
+        self.output.write(f"{self.rule}\n{text.center(self.width)}\n{self.rule}")
 
     def print_divider(self):
         """Print a divider line"""
-        print("-" * self.width)
+        self.output.write(self.divider)
 
     def print_stats(self, stats):
         """Print player stats in a formatted way"""
-        self.print_divider()
-        print("STATS:".center(self.width))
-
+        lines = [self.divider, self.stats_title]
         for stat, value in stats.items():
-            stat_name = stat.replace("_", " ").title()
-            bar_length = int(value / 2)  # Scale to fit in terminal
-            bar = "█" * bar_length + "░" * (50 - bar_length)
-            print(f"{stat_name:20} [{bar}] {value}/100")
-
-        self.print_divider()
+            label = STAT_LABELS.get(stat) or f"{stat.replace('_', ' ').title():20}"
+            lines.append(f"{label} [{stat_bar(value)}] {value}/100")
+        lines.append(self.divider)
+        self.output.write("\n".join(lines))
 
     def print_event(self, event_text):
         """Print an event with formatting"""
-        self.print_divider()
-        print("EVENT:".center(self.width))
-        print(event_text)
-        self.print_divider()
+        self.output.write(f"{self.divider}\n{self.event_title}\n{event_text}\n{self.divider}")
+
+    def read(self, prompt):
+        """Send any pending output, then read a line of input"""
+        self.output.flush()
+        return input(prompt)
 
     def get_input(self, prompt="What would you like to do?"):
         """Get input from the user with a prompt"""
-        return input(f"{prompt}\n> ")
+        return self.read(f"{prompt}\n> ")
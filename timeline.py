@@ -0,0 +1,187 @@
+# timeline.py - Frozen game states for undo, rewind and cheap forks, sharing history between versions
+import argparse
+import copy
+import random
+import time
+from collections import deque
+
+from commands import CommandProcessor
+from engine import HeadlessGame
+
+UNDO_LIMIT = 10   # States a game keeps for undo; each holds a copy of the RNG state (about 25 kB)
+ACTION_ENTRIES = 2   # Most history entries one action logs: itself and the automatic sleep after it
+
+
+class GameState:
+    """A frozen picture of a game that can be restored into it or forked into a new one
+
+    The action history is shared copy-on-write, and events, action details
+    and the RNG state are shared outright, so taking, restoring or forking a
+    state costs the same however long the game has run. A state taken with
+    by_position only marks where the history was, and can only be restored
+    into its own game, before older entries are evicted.
+    """
+    __slots__ = ("label", "seed", "day", "period", "actions_remaining", "total_days", "game_over", "ending",
+                 "name", "values", "rng", "effects", "history", "mark", "pending")
+
+    def __init__(self, game, label=None, by_position=False):
+        player = game.player
+        self.label = label   # What was done next, e.g. the action name, for messages
+        self.seed = game.seed
+        self.day = game.day
+        self.period = game.period
+        self.actions_remaining = game.actions_remaining
+        self.total_days = game.total_days
+        self.game_over = game.game_over
+        self.ending = game.ending
+        self.name = player.name
+        self.values = player.values[:]
+        getstate = getattr(game.rng, "getstate", None)
+        self.rng = None if getstate is None else getstate()
+        self.effects = None if player.effects is None else player.effects.copy()
+        # Sharing makes the game's next action copy its history, so undo states avoid it
+        self.history = None if by_position else player.log.share()
+        self.mark = player.log.mark() if by_position else None
+        self.pending = tuple(getattr(game, "pending", ()))
+
+    def restore(self, game):
+        """Put a game back in this state; the state itself is left unchanged"""
+        player = game.player
+        game.seed = self.seed
+        game.day = self.day
+        game.period = self.period
+        game.actions_remaining = self.actions_remaining
+        game.total_days = self.total_days
+        game.game_over = self.game_over
+        game.ending = self.ending
+        player.name = self.name
+        player.values = self.values[:]
+        if self.rng is not None:
+            game.rng.setstate(self.rng)
+        player.effects = None if self.effects is None else self.effects.copy()
+        if self.history is None:
+            player.log.rewind(self.mark)
+        else:
+            player.log = self.history.share()
+        if hasattr(game, "pending"):
+            game.pending = list(self.pending)
+
+    def keep_history(self, game):
+        """Take a copy of the history a by_position state points into, before it can be overwritten"""
+        if self.history is None:
+            self.history = game.player.log.copy_to_mark(self.mark)
+            self.mark = None
+
+    def fork(self, game, capture=False):
+        """A new headless game in this state, sharing the schedule, actions and telemetry of game"""
+        other = HeadlessGame(capture, self.seed, metrics=game.metrics, leaderboard=game.leaderboard)
+        other.campaign = game.campaign
+        other.events = game.events
+        other.commands = CommandProcessor(other, game.commands.actions, game.commands.help_text)
+        self.restore(other)
+        return other
+
+
+def fork(game, capture=False):
+    """A headless copy of a game's current state, which can then be played independently"""
+    return GameState(game).fork(game, capture)
+
+
+class Timeline:
+    """A game's recent states, oldest first, for undo"""
+
+    def __init__(self, limit=UNDO_LIMIT):
+        self.states = deque(maxlen=limit)
+
+    def record(self, game, label=None):
+        """Keep the state from before an action
+
+        While the history has room, states only mark its position, so the
+        action that follows appends without copying it. Once the next action
+        could evict old entries, the states marked so far take copies, and
+        new ones share the history: each action then copies its columns, at
+        most the history limit of entries.
+        """
+        log = game.player.log
+        if log.capacity - len(log) >= ACTION_ENTRIES:
+            self.states.append(GameState(game, label, by_position=True))
+            return
+        for state in self.states:
+            state.keep_history(game)
+        self.states.append(GameState(game, label))
+
+    def undo(self, game):
+        """Restore the latest state and return it, or None if there is nothing to undo"""
+        if not self.states:
+            return None
+        state = self.states.pop()
+        state.restore(game)
+        return state
+
+    def clear(self):
+        self.states.clear()
+
+    def __len__(self):
+        return len(self.states)
+
+
+def game_with_history(actions, seed=0):
+    """A game that has run for the given number of actions, with a history long enough to keep them"""
+    from analyzer import random_policy
+    from player import Player
+
+    game = HeadlessGame(seed=seed)
+    game.player = Player(history_limit=max(actions, 1))
+    game.total_days = 10 ** 6
+    rng = random.Random(seed)
+    while game.player.log.total < actions:
+        if game.pending:
+            game.pending.clear()
+        game.handle_command(random_policy(game, rng))
+    return game
+
+
+def bench_fork(sizes=(10, 100, 1000), calls=200):
+    """Microseconds to fork a game and to deepcopy it, by history length"""
+    results = {}
+    for size in sizes:
+        game = game_with_history(size)
+        state = GameState(game)
+
+        def run_fork():
+            state.fork(game).handle_command("eat")
+
+        def run_deepcopy():
+            copy.deepcopy(game).handle_command("eat")
+
+        def run_rewind():
+            game.handle_command("eat")
+            state.restore(game)
+
+        row = {}
+        for name, function in (("capture", lambda: GameState(game)), ("fork", run_fork),
+                               ("rewind", run_rewind), ("deepcopy", run_deepcopy)):
+            start = time.perf_counter()
+            for _ in range(calls):
+                function()
+            row[name] = (time.perf_counter() - start) / calls * 1e6
+        results[size] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare forking a game through GameState with copy.deepcopy")
+    parser.add_argument("--sizes", default="10,100,1000", help="history lengths to try, comma-separated")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    results = bench_fork([int(size) for size in args.sizes.split(",")], args.calls)
+    print("Microseconds per call (fork, rewind and deepcopy each play one action on the copy):")
+    print(f"  {'history':>8} {'capture':>9} {'fork':>9} {'rewind':>9} {'deepcopy':>10} {'speedup':>8}")
+    for size, row in results.items():
+        print(f"  {size:>8,} {row['capture']:9.1f} {row['fork']:9.1f} {row['rewind']:9.1f} {row['deepcopy']:10.1f} "
+              f"{row['deepcopy'] / row['fork']:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# vecenv.py - Vectorized environment stepping many headless games in lockstep for agent training
+import argparse
+import random
+import time
+
+import numpy as np
+
+from actions import ACTIONS
+from engine import Engine
+from events import EVENT_CATALOG
+from player import ACTION_NAMES, BUILTIN_ACTION_COUNT, ENDING_NAMES, STAT_COUNT
+
+# Arguments used for actions that need one
+DEFAULT_ARGUMENTS = {"subject": ["math"], "friend": ["alex"]}
+
+
+def most_options(catalog):
+    """The most options any event of an EventCatalog or Campaign offers"""
+    groups = [events for day in catalog.slots for events in day] + list(getattr(catalog, "pool", ()))
+    return max((len(event.options) for events in groups for event in events), default=0)
+
+
+def action_labels(max_options):
+    return [action.name for action in COMMAND_ACTIONS] + [f"option {k + 1}" for k in range(max_options)]
+
+
+# Action codes: the built-in actions in ACTION_NAMES order, then "choose event option k" for
+# as many options as the events can offer (exam week's here; a campaign's in VecEnv)
+COMMAND_ACTIONS = [ACTIONS[name] for name in ACTION_NAMES[:BUILTIN_ACTION_COUNT]]
+MAX_OPTIONS = most_options(EVENT_CATALOG)
+ACTION_LABELS = action_labels(MAX_OPTIONS)
+# The command each action code sends, like a player typing it
+COMMAND_TEXTS = [" ".join([action.name] + DEFAULT_ARGUMENTS.get(action.argument, [])) for action in COMMAND_ACTIONS]
+ACTION_COUNT = len(ACTION_LABELS)
+OPTION_BASE = len(COMMAND_ACTIONS)
+
+# Observation columns, all scaled to roughly 0-1
+OBSERVATION_FIELDS = (
+    "mental_health", "energy", "social_connections", "academic_readiness",
+    "lowest_mental_health", "lowest_energy", "lowest_social_connections", "lowest_academic_readiness",
+    "day", "period", "actions_remaining", "pending_event", "recovered",
+)
+OBSERVATION_SIZE = len(OBSERVATION_FIELDS)
+
+
+class VecEnv:
+    """N independent games stepped together with integer actions
+
+    Call reset() first. step() takes one action code per game and returns
+    (observations, rewards, dones, infos). A game that ends is reset at
+    once; its final observation and ending are in infos. Actions that
+    action_masks() rules out leave the game unchanged. Games run through
+    Engine like any other headless player, so a shared metrics.Metrics
+    sees every step. With a campaign, action_count and action_labels cover
+    the most options any of its events offers.
+    """
+
+    def __init__(self, count, seed=0, rewards=None, metrics=None, campaign=None):
+        self.count = count
+        self.rng = random.Random(seed)
+        self.metrics = metrics
+        self.campaign = campaign
+        self.max_options = MAX_OPTIONS if campaign is None else most_options(campaign)
+        self.action_labels = ACTION_LABELS if campaign is None else action_labels(self.max_options)
+        self.action_count = len(self.action_labels)
+        # Reward for each ending when a game finishes; every other step earns 0
+        self.rewards = {"Pearl": 1.0} if rewards is None else rewards
+        self.ending_rewards = np.array([self.rewards.get(name, 0.0) for name in ENDING_NAMES], dtype=np.float32)
+        self.engines = []
+        self.games = []
+        self.observations = np.zeros((count, OBSERVATION_SIZE), dtype=np.float32)
+
+    def new_engine(self):
+        return Engine(seed=self.rng.getrandbits(64), metrics=self.metrics, record=False, campaign=self.campaign)
+
+    def reset(self):
+        """Start every game over and return their observations"""
+        self.engines = [self.new_engine() for _ in range(self.count)]
+        self.games = [engine.game for engine in self.engines]
+        for i, game in enumerate(self.games):
+            self.observe(i, game)
+        return self.observations.copy()
+
+    def observe(self, i, game):
+        """Write one game's observation row"""
+        row = self.observations[i]
+        row[:2 * STAT_COUNT] = game.player.values
+        row[:2 * STAT_COUNT] *= 0.01
+        row[8] = game.day / game.total_days
+        row[9] = game.period != "Morning"
+        row[10] = game.actions_remaining / 3
+        row[11] = bool(game.pending)
+        row[12] = game.player.recovered
+
+    def action_masks(self):
+        """(count, action_count) booleans marking the actions each game can take"""
+        masks = np.zeros((self.count, self.action_count), dtype=bool)
+        for i, game in enumerate(self.games):
+            if game.pending:
+                masks[i, OPTION_BASE:OPTION_BASE + len(game.pending[0].options)] = True
+            else:
+                remaining = game.actions_remaining
+                for code, action in enumerate(COMMAND_ACTIONS):
+                    masks[i, code] = action.ends_day or action.cost <= remaining
+        return masks
+
+    def step_game(self, engine, code):
+        """Apply one action code to a game; returns False if it was not allowed"""
+        game = engine.game
+        if game.pending:
+            option = code - OPTION_BASE
+            if not 0 <= option < len(game.pending[0].options):
+                return False
+            engine.send_choice(option)
+            return True
+
+        if not 0 <= code < OPTION_BASE:
+            return False
+        action = COMMAND_ACTIONS[code]
+        if not action.ends_day and action.cost > game.actions_remaining:
+            return False
+        engine.send_command(COMMAND_TEXTS[code])
+        return True
+
+    def step(self, actions):
+        """Step every game with its action code"""
+        rewards = np.zeros(self.count, dtype=np.float32)
+        dones = np.zeros(self.count, dtype=bool)
+        endings = np.full(self.count, -1, dtype=np.int8)
+        invalid = np.zeros(self.count, dtype=bool)
+        final = {}
+
+        for i, code in enumerate(actions):
+            game = self.games[i]
+            invalid[i] = not self.step_game(self.engines[i], int(code))
+            if game.game_over:
+                ending = ENDING_NAMES.index(game.ending)
+                rewards[i] = self.ending_rewards[ending]
+                dones[i] = True
+                endings[i] = ending
+                self.observe(i, game)
+                final[i] = self.observations[i].copy()
+                self.engines[i] = self.new_engine()
+                game = self.games[i] = self.engines[i].game
+            self.observe(i, game)
+
+        infos = {"ending": endings, "invalid": invalid, "final_observation": final}
+        return self.observations.copy(), rewards, dones, infos
+
+
+def measure(count=64, steps=2000, seed=0):
+    """Steps per second with random valid actions"""
+    env = VecEnv(count, seed)
+    env.reset()
+    rng = np.random.default_rng(seed)
+    finished = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = env.action_masks()
+        # A random allowed action for every game
+        scores = rng.random(masks.shape) * masks
+        _, _, dones, _ = env.step(scores.argmax(axis=1))
+        finished += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    return count * steps / elapsed, finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure vectorized environment throughput")
+    parser.add_argument("--envs", type=int, default=64, help="games stepped together")
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    rate, finished = measure(args.envs, args.steps)
+    print(f"{args.envs} envs: {rate:,.0f} steps/sec, {finished:,} games finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# world.py - Shared-world multiplayer: call and meet reach real players, whose state is split across shards
+import argparse
+import asyncio
+import multiprocessing
+import queue
+import random
+import time
+import zlib
+
+from actions import delta_vector, preformat
+from engine import HeadlessGame
+from sessions import play_line, session_output
+
+# What a call or meet does to the player on the other end, shown to them when it arrives
+INTERACTION_TABLE = {
+    "call": {
+        "deltas": {"social_connections": 10, "mental_health": 5},
+        "text": "\n{friend} calls you for a chat. Social Connections {social_connections:+d}, "
+                "Mental Health {mental_health:+d}.",
+    },
+    "meet": {
+        "deltas": {"social_connections": 15, "mental_health": 5, "energy": -5},
+        "text": "\n{friend} meets up with you. Social Connections {social_connections:+d}, "
+                "Mental Health {mental_health:+d}, Energy {energy:+d}.",
+    },
+}
+
+# Action name -> (delta vector, message with the stat changes filled in)
+INTERACTIONS = {name: (delta_vector(spec["deltas"]), preformat(spec["text"], spec["deltas"]))
+                for name, spec in INTERACTION_TABLE.items()}
+
+
+def shard_of(name, shards):
+    """The shard a player lives on, the same in every process"""
+    return zlib.crc32(name.encode("utf-8")) % shards
+
+
+class Shard:
+    """One partition of the world's players, changed only by its owner
+
+    Commands run against local players right away. A call or meet aimed at
+    another player becomes a message in the outbox of that player's shard,
+    sent on as one batch per shard by take_batches() and applied there by
+    deliver(). Messages to names nobody is playing are dropped, so those
+    friends stay imaginary.
+    """
+
+    def __init__(self, index, shards, metrics=None, leaderboard=None):
+        self.index = index
+        self.shards = shards
+        self.metrics = metrics
+        self.leaderboard = leaderboard
+        self.players = {}   # Lower-case name -> game
+        self.outbox = {}    # Shard index -> [(target, sender, action)]
+        self.sent = 0
+        self.received = 0
+
+    def join(self, name, game=None):
+        """Add a player, starting a new game for them unless one is given"""
+        if game is None:
+            game = HeadlessGame(capture=True, metrics=self.metrics, leaderboard=self.leaderboard)
+            game.begin()
+        self.players[name] = game
+        return game
+
+    def leave(self, name):
+        self.players.pop(name, None)
+
+    def handle(self, name, line):
+        """Run a line for a local player, queueing any interaction it starts; returns their output"""
+        game = self.players[name]
+        if game.game_over:
+            return "The game is over.\n"
+        before = game.player.log.total
+        play_line(game, line)
+
+        words = line.split()
+        if len(words) > 1 and game.player.log.total > before:
+            action, target = words[0].lower(), words[1].lower()
+            if action in INTERACTIONS and target != name:
+                self.outbox.setdefault(shard_of(target, self.shards), []).append((target, name, action))
+                self.sent += 1
+        return session_output(game)
+
+    def take_batches(self):
+        """Outgoing messages grouped by destination shard, emptying the outbox"""
+        batches, self.outbox = self.outbox, {}
+        return batches
+
+    def deliver(self, messages):
+        """Apply a batch of interactions to local players; returns the names of those affected"""
+        changed = []
+        players = self.players
+        for target, sender, action in messages:
+            game = players.get(target)
+            if game is None or game.game_over:
+                continue
+            vector, text = INTERACTIONS[action]
+            game.player.apply_deltas(vector)
+            game.show(text.replace("{friend}", sender.capitalize()))
+            changed.append(target)
+        self.received += len(changed)
+        return changed
+
+
+class ShardTask:
+    """A shard run as its own asyncio task, the only code that touches its players
+
+    Requests from connections and batches from other shards share one
+    inbox. Whatever has queued up is handled in one go, then the
+    interactions it started go to each other shard as a single batch.
+    """
+
+    def __init__(self, shard, world):
+        self.shard = shard
+        self.world = world
+        self.inbox = asyncio.Queue()
+
+    async def run(self):
+        shard = self.shard
+        while True:
+            requests = [await self.inbox.get()]
+            while not self.inbox.empty():
+                requests.append(self.inbox.get_nowait())
+            for kind, name, value, future in requests:
+                if kind == "deliver":
+                    for target in shard.deliver(value):
+                        self.world.notify(target, session_output(shard.players[target]))
+                    continue
+                if kind == "join":
+                    result = None if name in shard.players else session_output(shard.join(name))
+                elif kind == "line":
+                    result = (shard.handle(name, value), shard.players[name].game_over)
+                else:
+                    result = shard.leave(name)
+                if not future.done():
+                    future.set_result(result)
+            for index, messages in shard.take_batches().items():
+                self.world.tasks[index].inbox.put_nowait(("deliver", None, messages, None))
+
+
+class World:
+    """A shared world for an asyncio server, each shard running as its own single-writer task
+
+    Connections only ever send requests to the shard that owns their
+    player; notify(name, text) is called with what a player was shown
+    when someone else's call or meet reached them.
+    """
+
+    def __init__(self, shards=4, notify=None, metrics=None, leaderboard=None):
+        self.tasks = [ShardTask(Shard(i, shards, metrics, leaderboard), self) for i in range(shards)]
+        self.notify = notify or (lambda name, text: None)
+        self.running = []
+
+    def start(self):
+        """Start the shard tasks on the running event loop"""
+        self.running = [asyncio.ensure_future(task.run()) for task in self.tasks]
+
+    def stop(self):
+        for running in self.running:
+            running.cancel()
+        self.running = []
+
+    async def request(self, kind, name, value=None):
+        future = asyncio.get_running_loop().create_future()
+        self.tasks[shard_of(name, len(self.tasks))].inbox.put_nowait((kind, name, value, future))
+        return await future
+
+    async def join(self, name):
+        """Add a player and return their opening output, or None if the name is taken"""
+        return await self.request("join", name)
+
+    async def handle(self, name, line):
+        """Run a player's line; returns their output and whether their game is over"""
+        return await self.request("line", name, line)
+
+    async def leave(self, name):
+        await self.request("leave", name)
+
+
+def run_shard(index, shards, names, rounds, seed, inboxes, results):
+    """Host one shard in its own process, playing every local player one interaction per round
+
+    After each round the shard sends one batch to every other shard and
+    waits for theirs, so a shard is never more than a round ahead.
+    """
+    shard = Shard(index, shards)
+    local = [name for name in names if shard_of(name, shards) == index]
+    for name in local:
+        game = shard.join(name, HeadlessGame(capture=True, seed=zlib.crc32(name.encode())))
+        game.begin()
+        game.total_days = 10 ** 6   # Keep everyone playing for the whole run
+    rng = random.Random(seed * 1000 + index)
+    inbox = inboxes[index]
+    early = {}   # Round -> batches that arrived before this shard finished the round before
+
+    start = time.perf_counter()
+    for round_number in range(rounds):
+        for name in local:
+            game = shard.players[name]
+            game.pending.clear()
+            shard.handle(name, f"{rng.choice(('call', 'call', 'meet'))} {rng.choice(names)}")
+
+        batches = shard.take_batches()
+        shard.deliver(batches.pop(index, ()))
+        for other in range(shards):
+            if other != index:
+                inboxes[other].put((round_number, batches.get(other, [])))
+
+        waiting = shards - 1
+        for messages in early.pop(round_number, ()):
+            shard.deliver(messages)
+            waiting -= 1
+        while waiting:
+            number, messages = inbox.get()
+            if number != round_number:
+                early.setdefault(number, []).append(messages)
+                continue
+            shard.deliver(messages)
+            waiting -= 1
+    results.put((index, shard.sent, shard.received, time.perf_counter() - start))
+
+
+def bench_world(shards, players=4000, rounds=20, seed=0):
+    """Interactions delivered per second with the players split over a number of shard processes"""
+    names = [f"player{i}" for i in range(players)]
+    context = multiprocessing.get_context("spawn")
+    inboxes = [context.Queue() for _ in range(shards)]
+    results = context.Queue()
+    processes = [context.Process(target=run_shard, args=(i, shards, names, rounds, seed, inboxes, results))
+                 for i in range(shards)]
+    for process in processes:
+        process.start()
+    reports = []
+    try:
+        for _ in range(shards):
+            reports.append(results.get(timeout=600))
+    except queue.Empty:
+        raise RuntimeError("A shard process stopped without reporting") from None
+    finally:
+        for process in processes:
+            process.join()
+    received = sum(report[2] for report in reports)
+    elapsed = max(report[3] for report in reports)
+    return {
+        "shards": shards,
+        "sent": sum(report[1] for report in reports),
+        "received": received,
+        "seconds": elapsed,
+        "interactions_per_sec": received / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared-world interactions as shards are added")
+    parser.add_argument("--shards", default="1,2,4", help="shard counts to try, comma-separated")
+    parser.add_argument("--players", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=20, help="interactions each player starts")
+    args = parser.parse_args()
+
+    print(f"{args.players:,} players, {args.rounds} interactions each, {multiprocessing.cpu_count()} CPU(s)")
+    print(f"  {'shards':>6} {'delivered':>10} {'seconds':>8} {'interactions/sec':>17}")
+    for shards in (int(count) for count in args.shards.split(",")):
+        result = bench_world(shards, args.players, args.rounds)
+        print(f"  {shards:>6} {result['received']:>10,} {result['seconds']:>8.2f} "
+              f"{result['interactions_per_sec']:>17,.0f}")
+
+
+if __name__ == "__main__":
+    main()